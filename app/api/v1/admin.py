@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.core.logging import logging_stats, set_log_level
+from app.db.session import get_db, get_pool_status
 from app.db.models.credential import Credential
-from app.schemas.admin import AdminLoginRequest, AdminLoginResponse, AdminInfo
+from app.schemas.admin import AdminLoginRequest, AdminLoginResponse, AdminInfo, LogLevelUpdate
 from app.schemas.token import Token
 from app.services.admin import admin_login, get_admin_by_id, verify_admin_access
+from app.services.nearby_cache import nearby_hospital_cache
+from app.services.socket import connection_admission, token_cache
+from app.middleware.compression import compression_stats
 from app.middleware.auth import get_current_user
+from app.utils.deps import require_admin
 
 router = APIRouter(
     prefix="/admin",
@@ -122,4 +127,80 @@ def verify_admin_status(
         "email": current_user.email,
         "role": current_user.role,
         "message": "Admin access verified"
-    } 
\ No newline at end of file
+    } 
+
+
+@router.get("/db/pool", response_model=dict, dependencies=[Depends(require_admin)])
+def get_db_pool_status():
+    """
+    Connection pool statistics for the primary database.
+
+    Returns:
+        Pool size, checked-out and overflow connections, acquisition wait times,
+        and connections held longer than DB_LEAK_THRESHOLD_SECONDS with the
+        stack that acquired them.
+    """
+    return get_pool_status()
+
+
+@router.get("/cache/nearby-hospitals", response_model=dict, dependencies=[Depends(require_admin)])
+def get_nearby_hospital_cache_stats():
+    """
+    Nearby-hospital response cache statistics.
+
+    Returns:
+        Entry count, hits, misses and hit rate, evictions, and how many times
+        the cache was dropped because hospitals changed.
+    """
+    return nearby_hospital_cache.stats()
+
+
+@router.get("/compression", response_model=dict, dependencies=[Depends(require_admin)])
+def get_compression_stats():
+    """
+    Response compression statistics, for tuning COMPRESSION_MINIMUM_SIZE and levels.
+
+    Returns:
+        Per encoding and response size bucket: bytes in/out, their ratio and
+        the CPU time spent compressing; and responses sent uncompressed, by reason.
+    """
+    return compression_stats.stats()
+
+
+@router.get("/logging", response_model=dict, dependencies=[Depends(require_admin)])
+def get_logging_status():
+    """
+    Logging status for this worker.
+
+    Returns:
+        Output format, current levels, queue fill and dropped records, and the
+        sampling of chatty events (one record kept in N).
+    """
+    return logging_stats()
+
+
+@router.put("/logging/level", response_model=dict, dependencies=[Depends(require_admin)])
+def update_log_level(payload: LogLevelUpdate):
+    """
+    Change the level of the app logger, or of one module (e.g. app.services.socket),
+    in this worker until it restarts.
+
+    Raises:
+        400: Unknown level, or a logger outside the app
+    """
+    try:
+        return {"levels": set_log_level(payload.level, payload.logger)}
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/sockets/admission", response_model=dict, dependencies=[Depends(require_admin)])
+def get_socket_admission_stats():
+    """
+    Socket.IO connect admission statistics for this worker.
+
+    Returns:
+        Handshakes in flight (current and peak), admitted and refused
+        connections by reason, and decoded-token cache hits and misses.
+    """
+    return {"admission": connection_admission.stats(), "token_cache": token_cache.stats()}
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.schemas.ambulance import AmbulanceCreate, AmbulanceOut, AmbulanceLogin, PasswordChangeRequest, PasswordChangeVerify, AmbulanceUpdate
 from app.services import ambulance as ambulance_service
@@ -10,6 +10,7 @@ from app.core.security import verify_password
 from app.utils.jwt import create_access_token
 from app.middleware.auth import get_current_user
 from app.db.models.credential import Credential
+from app.services.catalog import catalog_store
 
 router = APIRouter(
     prefix="/ambulances",
@@ -40,6 +41,7 @@ def update_my_ambulance_profile(
         setattr(ambulance, field, value)
     db.commit()
     db.refresh(ambulance)
+    catalog_store.bump("ambulances")
     return ambulance
 
 @router.post("/", response_model=AmbulanceOut, status_code=status.HTTP_201_CREATED)
@@ -55,8 +57,18 @@ def create_ambulance(
     return ambulance_service.create_ambulance(db, ambulance_in, current_user)
 
 @router.get("/", response_model=List[AmbulanceOut])
-def get_all_ambulances(db: Session = Depends(get_db)):
-    return ambulance_service.get_all_ambulances(db)
+def get_all_ambulances(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    All ambulances, in id order. Supports If-None-Match (ETag), limit/cursor
+    pagination (X-Next-Cursor header) and ?fields= projection.
+    """
+    return catalog_store.page(db, "ambulances", limit=limit, cursor=cursor, fields=fields).to_response(request)
 
 @router.get("/{ambulance_id}", response_model=AmbulanceOut)
 def get_ambulance_by_id(ambulance_id: int, db: Session = Depends(get_db)):
@@ -66,8 +78,18 @@ def get_ambulance_by_id(ambulance_id: int, db: Session = Depends(get_db)):
     return ambulance
 
 @router.get("/hospital/{hospital_id}", response_model=List[AmbulanceOut])
-def get_ambulances_by_hospital(hospital_id: int, db: Session = Depends(get_db)):
-    return ambulance_service.get_ambulances_by_hospital(db, hospital_id)
+def get_ambulances_by_hospital(
+    hospital_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    db: Session = Depends(get_db)
+):
+    """Ambulances of a hospital; same caching and pagination as GET /ambulances/."""
+    return catalog_store.page(
+        db, "ambulances", scope_id=hospital_id, limit=limit, cursor=cursor, fields=fields
+    ).to_response(request)
 
 @router.get("/{ambulance_id}/status")
 def get_ambulance_status(ambulance_id: int, db: Session = Depends(get_db)):
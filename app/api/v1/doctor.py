@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.schemas.doctor import DoctorCreate, DoctorOut, DoctorLogin, PasswordChangeRequest, PasswordChangeVerify, DoctorUpdate
 from app.db.session import get_db
@@ -11,6 +11,7 @@ from app.utils.jwt import create_access_token
 from app.db.models.credential import Credential
 from app.services.doctor import create_doctor
 from app.middleware.auth import get_current_user
+from app.services.catalog import catalog_store
 
 
 router = APIRouter(
@@ -42,6 +43,7 @@ def update_my_doctor_profile(
         setattr(doctor, field, value)
     db.commit()
     db.refresh(doctor)
+    catalog_store.bump("doctors")
     return doctor
 
 @router.post("/", response_model=DoctorOut, status_code=status.HTTP_201_CREATED)
@@ -74,8 +76,18 @@ def login_doctor(data: DoctorLogin, db: Session = Depends(get_db)):
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/", response_model=List[DoctorOut])
-def get_all_doctors(db: Session = Depends(get_db)):
-    return doctor_service.get_all_doctors(db)
+def get_all_doctors(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    All doctors, in id order. Supports If-None-Match (ETag), limit/cursor
+    pagination (X-Next-Cursor header) and ?fields= projection.
+    """
+    return catalog_store.page(db, "doctors", limit=limit, cursor=cursor, fields=fields).to_response(request)
 
 @router.get("/{doctor_id}", response_model=DoctorOut)
 def get_doctor_by_id(doctor_id: int, db: Session = Depends(get_db)):
@@ -85,8 +97,18 @@ def get_doctor_by_id(doctor_id: int, db: Session = Depends(get_db)):
     return doctor
 
 @router.get("/hospital/{hospital_id}", response_model=List[DoctorOut])
-def get_doctors_by_hospital(hospital_id: int, db: Session = Depends(get_db)):
-    return doctor_service.get_doctors_by_hospital(db, hospital_id)
+def get_doctors_by_hospital(
+    hospital_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    db: Session = Depends(get_db)
+):
+    """Doctors of a hospital; same caching and pagination as GET /doctors/."""
+    return catalog_store.page(
+        db, "doctors", scope_id=hospital_id, limit=limit, cursor=cursor, fields=fields
+    ).to_response(request)
 
 @router.get("/{doctor_id}/status")
 def get_doctor_status(doctor_id: int, db: Session = Depends(get_db)):
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
+from typing import Optional
+import logging
 import time
 
 from app.schemas.token import Token
@@ -10,7 +12,6 @@ from app.db.models.credential import Credential as User
 from app.db.models.hospital import Hospital
 from app.services.hospital import (
     create_hospital_with_credentials,
-    get_all_hospitals,
     get_hospital_by_id,
     update_hospital,
     hospital_login,
@@ -18,9 +19,13 @@ from app.services.hospital import (
     get_hospitals_within_20km,
 )
 
+from app.services.geo import HospitalFilter, parse_departments
+from app.services.catalog import catalog_store
 from app.middleware.auth import get_current_user
 from app.utils.deps import require_admin
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     # prefix="/hospitals",
     tags=["Hospitals"]
@@ -40,7 +45,7 @@ def timed_endpoint_sync(func):
         start = time.perf_counter()
         result = func(*args, **kwargs)
         duration = (time.perf_counter() - start) * 1000
-        print(f"⏱️ {func.__name__} took {duration:.2f}ms")
+        logger.debug("%s took %.2fms", func.__name__, duration)
         return result
     return wrapper
 
@@ -81,8 +86,18 @@ def get_my_hospital(
 
 # ✅ Public: Get all hospitals
 @router.get("/all", response_model=list[HospitalOut])
-def fetch_all_hospitals(db: Session = Depends(get_db)):
-    return get_all_hospitals(db)
+def fetch_all_hospitals(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    All hospitals, in id order. Supports If-None-Match (ETag), limit/cursor
+    pagination (X-Next-Cursor header) and ?fields= projection.
+    """
+    return catalog_store.page(db, "hospitals", limit=limit, cursor=cursor, fields=fields).to_response(request)
 
 
 # ✅ Public: Get hospital by ID
@@ -101,11 +116,28 @@ def update_hospital_info(
     return update_hospital(db, hospital_id, updates)
 
 
+def hospital_filter_params(
+    departments: Optional[str] = Query(None, description="Comma-separated departments; hospitals must have all of them"),
+    emergency_available: Optional[bool] = None,
+    available_24_7: Optional[bool] = None,
+    approved: Optional[bool] = None,
+    hospital_type: Optional[str] = Query(None, pattern="^(government|private)$"),
+) -> HospitalFilter:
+    return HospitalFilter(
+        departments=parse_departments(departments),
+        emergency_available=emergency_available,
+        available_24_7=available_24_7,
+        approved=approved,
+        hospital_type=hospital_type,
+    )
+
+
 # ✅ Public: Get hospitals within 10km radius
 @router.get("/nearby/10km")
 def get_hospitals_10km(
     latitude: float,
     longitude: float,
+    hospital_filter: HospitalFilter = Depends(hospital_filter_params),
     db: Session = Depends(get_db)
 ):
     """
@@ -114,6 +146,7 @@ def get_hospitals_10km(
     Args:
         latitude: User's latitude coordinate
         longitude: User's longitude coordinate
+        hospital_filter: departments / emergency_available / available_24_7 / approved / hospital_type
         db: Database session
     
     Returns:
@@ -124,7 +157,7 @@ def get_hospitals_10km(
     if not (-180 <= longitude <= 180):
         raise HTTPException(status_code=400, detail="Longitude must be between -180 and 180")
     
-    hospitals = get_hospitals_within_10km(db, latitude, longitude)
+    hospitals = get_hospitals_within_10km(db, latitude, longitude, hospital_filter)
     return {
         "hospitals": hospitals,
         "count": len(hospitals),
@@ -138,6 +171,7 @@ def get_hospitals_10km(
 def get_hospitals_20km(
     latitude: float,
     longitude: float,
+    hospital_filter: HospitalFilter = Depends(hospital_filter_params),
     db: Session = Depends(get_db)
 ):
     """
@@ -146,6 +180,7 @@ def get_hospitals_20km(
     Args:
         latitude: User's latitude coordinate
         longitude: User's longitude coordinate
+        hospital_filter: departments / emergency_available / available_24_7 / approved / hospital_type
         db: Database session
     
     Returns:
@@ -156,7 +191,7 @@ def get_hospitals_20km(
     if not (-180 <= longitude <= 180):
         raise HTTPException(status_code=400, detail="Longitude must be between -180 and 180")
     
-    hospitals = get_hospitals_within_20km(db, latitude, longitude)
+    hospitals = get_hospitals_within_20km(db, latitude, longitude, hospital_filter)
     return {
         "hospitals": hospitals,
         "count": len(hospitals),
@@ -1,20 +1,25 @@
 # app/api/v1/patient_assignment.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+import logging
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from app.db.session import get_db
+from app.core.serialization import model_list_response
+from app.db.session import get_db, get_read_db
 from app.utils.deps import get_current_user
 from app.db.models.credential import Credential
 from app.schemas.patient_assignment import (
     PatientAssignmentCreate,
     PatientAssignmentOut,
     PatientAssignmentUpdate,
-    AssignmentStatusUpdate
+    AssignmentStatusUpdate,
+    PatientAssignmentBatchCreate,
+    PatientAssignmentBatchResult
 )
 from app.services.patient_assignment import (
     create_patient_assignment,
+    create_patient_assignments_batch,
     get_patient_assignment_by_id,
     get_patient_assignments,
     get_doctor_assignments,
@@ -24,14 +29,29 @@ from app.services.patient_assignment import (
     update_assignment_status,
     complete_assignment,
     get_assignment_statistics,
-    get_assignment_with_context
+    get_assignment_with_context,
+    encode_assignment_cursor
 )
 from app.services.doctor import get_doctor_by_credential_id
 from app.services.ambulance import get_ambulance_by_credential_id
+from app.services.socket import notify_batch_assignments
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _assignment_page(assignments: list, limit: int) -> Response:
+    """
+    A full page may have more rows after it: expose the cursor for the next
+    page in the X-Next-Cursor header.
+    """
+    headers = {}
+    if len(assignments) == limit and assignments[-1].created_at is not None:
+        headers["X-Next-Cursor"] = encode_assignment_cursor(assignments[-1])
+    return model_list_response(PatientAssignmentOut, assignments, headers=headers)
+
+
 @router.post("/assign", response_model=PatientAssignmentOut)
 def assign_patient_to_resources(
     assignment: PatientAssignmentCreate,
@@ -88,16 +108,72 @@ def assign_patient_to_resources(
         return result
     except Exception as e:
         # Log the error for debugging
-        print(f"Error creating patient assignment: {e}")
+        logger.error("Error creating patient assignment: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to create assignment: {str(e)}")
 
 
+@router.post("/assign/batch", response_model=PatientAssignmentBatchResult)
+def assign_patients_batch(
+    batch: PatientAssignmentBatchCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: Credential = Depends(get_current_user)
+):
+    """
+    Hospital assigns many patients at once (e.g. mass-casualty incidents).
+    Invalid items are reported individually; valid ones are created together.
+    """
+    if current_user.role != "hospital":
+        raise HTTPException(status_code=403, detail="Access denied. Hospital users only.")
+    
+    user_hospital_id = current_user.hospital.id if hasattr(current_user, 'hospital') and current_user.hospital else None
+    
+    if not user_hospital_id:
+        raise HTTPException(status_code=404, detail="Hospital not found for current user")
+    
+    try:
+        results = create_patient_assignments_batch(db, user_hospital_id, batch.assignments)
+    except Exception as e:
+        logger.error("Error creating batch patient assignments: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to create assignments: {str(e)}")
+    
+    # Realtime notifications go out after the response, in one fan-out
+    notifications = []
+    for result in results:
+        if not result["success"]:
+            continue
+        assignment = result["assignment"]
+        notifications.append({
+            "assignment": {
+                "assignment_id": assignment.id,
+                "patient_id": assignment.patient_id,
+                "hospital_id": assignment.hospital_id,
+                "doctor_id": assignment.doctor_id,
+                "ambulance_id": assignment.ambulance_id,
+                "case_details": {
+                    "priority_level": assignment.priority_level,
+                    "emergency_reason": assignment.emergency_reason,
+                    "symptoms": assignment.symptoms,
+                },
+                "status": assignment.status,
+            },
+            "doctor_credential_id": result["doctor_credential_id"],
+            "ambulance_credential_id": result["ambulance_credential_id"],
+        })
+    if notifications:
+        background_tasks.add_task(notify_batch_assignments, notifications)
+    
+    created = len(notifications)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
 @router.get("/me/assigned-patients", response_model=List[PatientAssignmentOut])
 def get_my_assigned_patients_api(
     status: Optional[str] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces offset"),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -108,15 +184,15 @@ def get_my_assigned_patients_api(
     """
     if current_user.role == "doctor":
         doctor = get_doctor_by_credential_id(db, current_user.id)
-        return get_doctor_assignments(db, doctor.id, status, limit, offset)
+        return _assignment_page(get_doctor_assignments(db, doctor.id, status, limit, offset, cursor), limit)
     elif current_user.role == "ambulance":
         ambulance = get_ambulance_by_credential_id(db, current_user.id)
-        return get_ambulance_assignments(db, ambulance.id, status, limit, offset)
+        return _assignment_page(get_ambulance_assignments(db, ambulance.id, status, limit, offset, cursor), limit)
     elif current_user.role == "hospital":
         user_hospital_id = current_user.hospital.id if hasattr(current_user, 'hospital') and current_user.hospital else None
         if not user_hospital_id:
             raise HTTPException(status_code=404, detail="Hospital not found for current user")
-        return get_hospital_assignments(db, user_hospital_id, status, limit, offset)
+        return _assignment_page(get_hospital_assignments(db, user_hospital_id, status, limit, offset, cursor), limit)
     else:
         raise HTTPException(status_code=403, detail="Access denied for this role.")
 
@@ -127,7 +203,8 @@ def get_patient_assignments_api(
     status: Optional[str] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces offset"),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -143,22 +220,24 @@ def get_patient_assignments_api(
         if not user_hospital_id:
             raise HTTPException(status_code=404, detail="Hospital not found for current user")
         
-        # Check if assignment belongs to their hospital
-        assignments = get_patient_assignments(db, patient_id, status, limit, offset)
-        hospital_assignments = [a for a in assignments if a.hospital_id == user_hospital_id]
-        return hospital_assignments
+        # Only assignments that belong to their hospital (filtered in SQL so pages stay full)
+        assignments = get_patient_assignments(
+            db, patient_id, status, limit, offset, cursor, hospital_id=user_hospital_id
+        )
     
     elif current_user.role == "doctor":
         # Doctor users can see assignments where they are assigned
-        assignments = get_patient_assignments(db, patient_id, status, limit, offset)
-        doctor_assignments = [a for a in assignments if a.doctor_id == current_user.id]
-        return doctor_assignments
+        assignments = get_patient_assignments(
+            db, patient_id, status, limit, offset, cursor, doctor_id=current_user.id
+        )
     
     elif current_user.role == "ambulance":
         # Ambulance users can see assignments where they are assigned
-        assignments = get_patient_assignments(db, patient_id, status, limit, offset)
-        ambulance_assignments = [a for a in assignments if a.ambulance_id == current_user.id]
-        return ambulance_assignments
+        assignments = get_patient_assignments(
+            db, patient_id, status, limit, offset, cursor, ambulance_id=current_user.id
+        )
+    
+    return _assignment_page(assignments, limit)
 
 
 @router.get("/doctor/{doctor_id}", response_model=List[PatientAssignmentOut])
@@ -167,7 +246,8 @@ def get_doctor_assignments_api(
     status: Optional[str] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces offset"),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -193,7 +273,7 @@ def get_doctor_assignments_api(
         if not doctor or doctor.hospital_id != user_hospital_id:
             raise HTTPException(status_code=403, detail="Access denied. Can only view assignments for doctors in your hospital.")
     
-    return get_doctor_assignments(db, doctor_id, status, limit, offset)
+    return _assignment_page(get_doctor_assignments(db, doctor_id, status, limit, offset, cursor), limit)
 
 
 @router.get("/ambulance/{ambulance_id}", response_model=List[PatientAssignmentOut])
@@ -202,7 +282,8 @@ def get_ambulance_assignments_api(
     status: Optional[str] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces offset"),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -228,7 +309,7 @@ def get_ambulance_assignments_api(
         if not ambulance or ambulance.hospital_id != user_hospital_id:
             raise HTTPException(status_code=403, detail="Access denied. Can only view assignments for doctors in your hospital.")
     
-    return get_ambulance_assignments(db, ambulance_id, status, limit, offset)
+    return _assignment_page(get_ambulance_assignments(db, ambulance_id, status, limit, offset, cursor), limit)
 
 
 @router.get("/hospital/{hospital_id}", response_model=List[PatientAssignmentOut])
@@ -237,7 +318,8 @@ def get_hospital_assignments_api(
     status: Optional[str] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces offset"),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -255,7 +337,7 @@ def get_hospital_assignments_api(
     if hospital_id != user_hospital_id:
         raise HTTPException(status_code=403, detail="Access denied. Can only view assignments for your own hospital.")
     
-    return get_hospital_assignments(db, hospital_id, status, limit, offset)
+    return _assignment_page(get_hospital_assignments(db, hospital_id, status, limit, offset, cursor), limit)
 
 
 @router.get("/active", response_model=List[PatientAssignmentOut])
@@ -263,7 +345,8 @@ def get_active_assignments_api(
     hospital_id: Optional[int] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces offset"),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -279,7 +362,7 @@ def get_active_assignments_api(
             raise HTTPException(status_code=404, detail="Hospital not found for current user")
         hospital_id = user_hospital_id
     
-    return get_active_assignments(db, hospital_id, limit, offset)
+    return _assignment_page(get_active_assignments(db, hospital_id, limit, offset, cursor), limit)
 
 
 @router.put("/{assignment_id}/status", response_model=PatientAssignmentOut)
@@ -363,7 +446,7 @@ def complete_assignment_api(
 @router.get("/{assignment_id}/context")
 def get_assignment_with_context_api(
     assignment_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -403,11 +486,12 @@ def get_assignment_statistics_api(
     hospital_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    bucket: Optional[str] = Query(None, pattern="^(hour|day)$"),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
-    Get assignment statistics
+    Get assignment statistics, optionally with an hourly or daily series
     """
     if current_user.role not in ["hospital", "admin"]:
         raise HTTPException(status_code=403, detail="Access denied. Hospital or Admin users only.")
@@ -420,7 +504,7 @@ def get_assignment_statistics_api(
         hospital_id = user_hospital_id
     
     try:
-        result = get_assignment_statistics(db, hospital_id, start_date, end_date)
+        result = get_assignment_statistics(db, hospital_id, start_date, end_date, bucket)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get statistics: {str(e)}")
@@ -1,12 +1,14 @@
 # app/api/v1/socket_log.py
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy import and_, func
 
-from app.db.session import get_db
-from app.utils.deps import get_current_user
+from app.core.serialization import model_list_response
+from app.db.session import get_db, get_read_db
+from app.utils.deps import get_current_user, require_admin
 from app.db.models.credential import Credential
 from app.db.models.socket_log import SocketLog
 from app.schemas.socket_log import (
@@ -33,30 +35,36 @@ from app.services.socket_log import (
     get_sos_statistics,
     get_sos_requests_by_hospital,
     get_pending_sos_requests,
-    get_hospital_sos_statistics
+    get_hospital_sos_statistics,
+    iter_socket_logs_ndjson,
+    select_socket_log_fields
 )
 from app.services.ambulance import get_ambulances_by_hospital
 
 router = APIRouter()
 
 
+def socket_log_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated SocketLogOut fields to return"),
+    exclude_payloads: bool = Query(False, description="Leave out event_data, request_data and response_data"),
+) -> Optional[Tuple[str, ...]]:
+    return select_socket_log_fields(fields, exclude_payloads)
+
+
 @router.get("/my-logs", response_model=List[SocketLogOut])
 def get_my_socket_logs(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     event_type: Optional[str] = None,
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
     Get socket logs for the current user
     """
-    logs = get_socket_logs_by_user(db, str(current_user.id), limit, offset)
-    
-    if event_type:
-        logs = [log for log in logs if log.event_type == event_type]
-    
-    return logs
+    logs = get_socket_logs_by_user(db, str(current_user.id), limit, offset, fields=fields, event_type=event_type)
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 @router.get("/ambulance-requests", response_model=List[SocketLogOut])
@@ -67,15 +75,17 @@ def get_ambulance_request_logs(
     end_date: Optional[datetime] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
     Get ambulance request logs (Authenticated users only)
     """
-    return get_ambulance_requests(
-        db, hospital_id, status, start_date, end_date, limit, offset
+    logs = get_ambulance_requests(
+        db, hospital_id, status, start_date, end_date, limit, offset, fields=fields
     )
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 # ============================================================================
@@ -172,7 +182,8 @@ def get_sos_requests_by_status_api(
     end_date: Optional[datetime] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -182,16 +193,17 @@ def get_sos_requests_by_status_api(
     if sos_status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid SOS status. Must be one of: {valid_statuses}")
     
-    return get_sos_requests_by_status(
-        db, sos_status, hospital_id, start_date, end_date, limit, offset
+    logs = get_sos_requests_by_status(
+        db, sos_status, hospital_id, start_date, end_date, limit, offset, fields=fields
     )
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 @router.get("/sos/statistics")
 def get_sos_statistics_api(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -208,28 +220,32 @@ def get_sos_requests_by_hospital_api(
     end_date: Optional[datetime] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
     Get SOS requests for a specific hospital (Authenticated users only)
     """
-    return get_sos_requests_by_hospital(
-        db, hospital_id, sos_status, start_date, end_date, limit, offset
+    logs = get_sos_requests_by_hospital(
+        db, hospital_id, sos_status, start_date, end_date, limit, offset, fields=fields
     )
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 @router.get("/sos/pending", response_model=List[SocketLogOut])
 def get_pending_sos_requests_api(
     hospital_id: Optional[int] = None,
     limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
     Get pending SOS requests that need attention (Authenticated users only)
     """
-    return get_pending_sos_requests(db, hospital_id, limit)
+    logs = get_pending_sos_requests(db, hospital_id, limit, fields=fields)
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 @router.get("/sos/my-hospital", response_model=List[SocketLogOut])
@@ -239,7 +255,8 @@ def get_my_hospital_sos_requests(
     end_date: Optional[datetime] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -254,15 +271,17 @@ def get_my_hospital_sos_requests(
     if not user_hospital_id:
         raise HTTPException(status_code=404, detail="Hospital not found for current user")
     
-    return get_sos_requests_by_hospital(
-        db, user_hospital_id, sos_status, start_date, end_date, limit, offset
+    logs = get_sos_requests_by_hospital(
+        db, user_hospital_id, sos_status, start_date, end_date, limit, offset, fields=fields
     )
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 @router.get("/sos/my-hospital/pending", response_model=List[SocketLogOut])
 def get_my_hospital_pending_sos_requests(
     limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -277,12 +296,13 @@ def get_my_hospital_pending_sos_requests(
     if not user_hospital_id:
         raise HTTPException(status_code=404, detail="Hospital not found for current user")
     
-    return get_pending_sos_requests(db, user_hospital_id, limit)
+    logs = get_pending_sos_requests(db, user_hospital_id, limit, fields=fields)
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 @router.get("/sos/dashboard")
 def get_sos_dashboard_data(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -462,7 +482,7 @@ def get_hospital_sos_statistics(
 
 @router.get("/comprehensive-dashboard")
 def get_comprehensive_dashboard_data(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -584,15 +604,17 @@ def get_hospital_response_logs(
     end_date: Optional[datetime] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
     Get hospital response logs (Authenticated users only)
     """
-    return get_hospital_responses(
-        db, hospital_id, status, start_date, end_date, limit, offset
+    logs = get_hospital_responses(
+        db, hospital_id, status, start_date, end_date, limit, offset, fields=fields
     )
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 @router.get("/by-event-type/{event_type}", response_model=List[SocketLogOut])
@@ -600,13 +622,15 @@ def get_logs_by_event_type(
     event_type: str,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
     Get socket logs by event type (Authenticated users only)
     """
-    return get_socket_logs_by_event_type(db, event_type, limit, offset)
+    logs = get_socket_logs_by_event_type(db, event_type, limit, offset, fields=fields)
+    return model_list_response(SocketLogOut, logs, fields=fields)
 
 
 @router.get("/by-time-range", response_model=List[SocketLogOut])
@@ -617,14 +641,35 @@ def get_logs_by_time_range(
     user_roles: Optional[List[str]] = Query(None),
     limit: int = Query(1000, ge=1, le=5000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
     Get socket logs within a time range (Authenticated users only)
     """
-    return get_socket_logs_by_time_range(
-        db, start_date, end_date, event_types, user_roles, limit, offset
+    logs = get_socket_logs_by_time_range(
+        db, start_date, end_date, event_types, user_roles, limit, offset, fields=fields
+    )
+    return model_list_response(SocketLogOut, logs, fields=fields)
+
+
+@router.get("/export")
+def export_socket_logs(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    event_types: Optional[List[str]] = Query(None),
+    user_roles: Optional[List[str]] = Query(None),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    current_user: Credential = Depends(require_admin)
+):
+    """
+    Stream socket logs as NDJSON (one SocketLogOut per line), oldest first (Admin only)
+    """
+    return StreamingResponse(
+        iter_socket_logs_ndjson(start_date, end_date, event_types, user_roles, fields),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="socket_logs.ndjson"'}
     )
 
 
@@ -632,7 +677,7 @@ def get_logs_by_time_range(
 def get_socket_statistics_api(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -644,7 +689,7 @@ def get_socket_statistics_api(
 @router.get("/recent-activity")
 def get_recent_activity(
     hours: int = Query(24, ge=1, le=168),  # Default 24 hours, max 1 week
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -699,7 +744,8 @@ def get_my_hospital_ambulance_requests(
     end_date: Optional[datetime] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    fields: Optional[Tuple[str, ...]] = Depends(socket_log_fields),
+    db: Session = Depends(get_read_db),
     current_user: Credential = Depends(get_current_user)
 ):
     """
@@ -715,6 +761,7 @@ def get_my_hospital_ambulance_requests(
     if not hospital_id:
         raise HTTPException(status_code=404, detail="Hospital not found for current user")
     
-    return get_ambulance_requests(
-        db, hospital_id, status, start_date, end_date, limit, offset
-    ) 
\ No newline at end of file
+    logs = get_ambulance_requests(
+        db, hospital_id, status, start_date, end_date, limit, offset, fields=fields
+    )
+    return model_list_response(SocketLogOut, logs, fields=fields)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -12,6 +13,126 @@ class Settings(BaseSettings):
     db_port: int
     db_name: str
 
+    # Connection pool (ignored for SQLite URLs)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT_SECONDS: int = 10
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    # Sessions holding a connection longer than this are reported as leaks
+    DB_LEAK_THRESHOLD_SECONDS: int = 30
+    DB_LEAK_CAPTURE_STACK: bool = True
+
+    # Optional read replica for read-only routes (see get_read_db)
+    REPLICA_DATABASE_URL: Optional[str] = None
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 5.0
+
+    # Pending SOS in-memory queue is rebuilt from the DB at this interval
+    SOS_QUEUE_RECONCILE_INTERVAL_SECONDS: int = 30
+
+    # At-least-once delivery of critical socket events (acked with Socket.IO callbacks)
+    SOCKET_ACK_TIMEOUT_SECONDS: float = 5.0
+    SOCKET_DELIVERY_MAX_ATTEMPTS: int = 4
+    SOCKET_DELIVERY_BACKOFF_SECONDS: float = 1.0
+    SOCKET_DELIVERY_MAX_BACKOFF_SECONDS: float = 15.0
+    # Unacked events are redelivered on reconnect until they are this old
+    SOCKET_DELIVERY_TTL_SECONDS: int = 300
+    # How often expired entries are dropped when nothing else is being sent
+    SOCKET_DELIVERY_EXPIRE_INTERVAL_SECONDS: float = 30.0
+
+    # Socket.IO connect admission: token buckets per client IP and per user, and a cap on
+    # handshakes in progress. Refused clients get retry_after_seconds (jittered when busy).
+    # Decoded JWTs are cached by token hash until their exp (at most the max TTL)
+    SOCKET_CONNECT_RATE_PER_IP: float = 5.0
+    SOCKET_CONNECT_BURST_PER_IP: int = 50
+    SOCKET_CONNECT_RATE_PER_USER: float = 0.2
+    SOCKET_CONNECT_BURST_PER_USER: int = 5
+    SOCKET_MAX_CONCURRENT_HANDSHAKES: int = 200
+    SOCKET_BUSY_RETRY_SECONDS: float = 2.0
+    # Proxies in front of the app that append to X-Forwarded-For (1 for Render's proxy, whose
+    # address REMOTE_ADDR would be for every client); the client IP is the entry this many
+    # from the right. 0 uses REMOTE_ADDR, for direct deployments
+    SOCKET_TRUSTED_PROXY_HOPS: int = 1
+    TOKEN_CACHE_MAX_ENTRIES: int = 50000
+    TOKEN_CACHE_MAX_TTL_SECONDS: float = 3600.0
+
+    # Live patient/ambulance positions: fixes kept per device, and idle time before a device is dropped
+    LOCATION_HISTORY_SIZE: int = 32
+    LOCATION_IDLE_TTL_SECONDS: int = 3600
+    # Patient fixes closer than this to the previous one, and sooner, are dropped (not stored or logged)
+    LOCATION_DEDUP_DISTANCE_M: float = 10.0
+    LOCATION_DEDUP_INTERVAL_SECONDS: float = 15.0
+    # Per-socket token bucket for location pings, and the flush interval of batched acks
+    LOCATION_RATE_PER_SECOND: float = 1.0
+    LOCATION_RATE_BURST: int = 5
+    LOCATION_ACK_BATCH_SECONDS: float = 5.0
+
+    # Live ambulance tracking: broadcast tick, downsampling of persisted points, ETA fallback speed
+    AMBULANCE_TRACKING_TICK_SECONDS: float = 1.0
+    AMBULANCE_TRACKING_PERSIST_INTERVAL_SECONDS: float = 30.0
+    AMBULANCE_TRACKING_PERSIST_MIN_DISTANCE_M: float = 50.0
+    AMBULANCE_DEFAULT_SPEED_KMH: float = 35.0
+    AMBULANCE_ASSIGNMENT_CACHE_SECONDS: float = 60.0
+
+    # In-process hospital geo index is rebuilt after this long (and right after hospital writes)
+    GEO_INDEX_REFRESH_SECONDS: float = 60.0
+    # Nearby-hospital cache: geohash precision of the caller's cell per radius (km), and LRU size
+    NEARBY_CACHE_PRECISION_BY_RADIUS: Dict[float, int] = {10.0: 6, 20.0: 5}
+    NEARBY_CACHE_DEFAULT_PRECISION: int = 6
+    NEARBY_CACHE_MAX_ENTRIES: int = 10000
+
+    # Road-network ETAs from an offline graph (.npz, see app/services/routing.py); straight-line
+    # distance at the fallback speed when unset. Dispatch ranks this many nearest hospitals by ETA
+    ROAD_GRAPH_PATH: Optional[str] = None
+    ROUTING_FALLBACK_SPEED_KMH: float = 30.0
+    ROUTING_MAX_SECONDS: float = 3600.0
+    ROUTING_CELL_DEGREES: float = 0.005
+    ROUTING_CACHE_SIZE: int = 256
+    ROUTING_MAX_SNAP_KM: float = 2.0
+    ROUTING_CANDIDATE_HOSPITALS: int = 5
+
+    # Hospital/doctor/ambulance catalog snapshots (ETag'd); rebuilt on writes or after max age
+    CATALOG_SNAPSHOT_MAX_AGE_SECONDS: float = 60.0
+    CATALOG_MAX_SNAPSHOTS: int = 1000
+    CATALOG_MAX_PAGES_PER_SNAPSHOT: int = 32
+
+    # Response compression: bodies below the minimum size, already-encoded bodies and streaming
+    # responses (except the listed media types, e.g. NDJSON exports) are sent as is.
+    # br/zstd are used only when the brotli/zstandard packages are installed
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_ENCODINGS: List[str] = ["br", "zstd", "gzip"]
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_EXCLUDED_PATHS: List[str] = ["/socket.io"]
+    COMPRESSION_STREAM_MEDIA_TYPES: List[str] = ["application/x-ndjson"]
+
+    # Logging (app/core/logging.py): "text" or "json" lines on stdout, written by a background
+    # thread from a bounded queue (records are dropped when it is full). Chatty events are kept
+    # at these rates below WARNING; levels can also be changed at runtime via /admin/logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATES: Dict[str, float] = {
+        "location_update": 0.01,
+        "ambulance_location": 0.01,
+        "socket_data": 0.1,
+        "connect_refused": 0.01,
+    }
+
+    # Offline inbox: events for disconnected users, flushed on their next connect
+    INBOX_MAX_MESSAGES_PER_USER: int = 50
+    INBOX_TTL_SECONDS: int = 3600
+    INBOX_MAX_USERS: int = 10000
+
+    # Shared state backend (verification codes, offline inbox); in-memory when unset
+    REDIS_URL: Optional[str] = None
+    VERIFICATION_CODE_TTL_SECONDS: int = 600
+
     class Config:
         env_file = ".env"
         extra = "forbid"
@@ -0,0 +1,190 @@
+# app/core/logging.py
+import atexit
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+from app.core.config import settings
+
+# Every module logs under this logger with logging.getLogger(__name__)
+APP_LOGGER = "app"
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+_traceback_formatter = logging.Formatter()
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in round(1 / rate) records of each chatty event, identified by
+    extra={"event": ...}. Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.every = {event: 0 if rate <= 0 else max(1, round(1 / rate)) for event, rate in rates.items()}
+        self._seen = {event: itertools.count() for event in self.every}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        every = self.every.get(event)
+        if every is None or record.levelno >= logging.WARNING:
+            return True
+        if every == 0 or next(self._seen[event]) % every:
+            return False
+        record.sampled_1_in = every
+        return True
+
+
+# Immutable argument types the listener thread can still format safely later
+_SCALAR_ARGS = (str, bytes, int, float, bool, type(None))
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread with scalar arguments as they are, so
+    their formatting happens there, not on the event loop. Messages with other
+    arguments (dicts, lists, objects the event loop may still change) and
+    tracebacks are rendered here, as logged. Records are dropped, and
+    counted, when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and (isinstance(args, dict) or not all(isinstance(arg, _SCALAR_ARGS) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingState:
+    """The running listener and its handler, for stats and shutdown."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.queue_handler: Optional[NonBlockingQueueHandler] = None
+        self.format = "text"
+
+
+_state = LoggingState()
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    log_format: Optional[str] = None,
+    queue_size: Optional[int] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+) -> None:
+    """
+    Route the app's loggers through a bounded queue to a background thread
+    that formats and writes them to stdout. Safe to call more than once.
+    """
+    with _state.lock:
+        if _state.listener is not None:
+            return
+        log_format = log_format or settings.LOG_FORMAT
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size or settings.LOG_QUEUE_SIZE)
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES if sample_rates is None else sample_rates))
+
+        app_logger = logging.getLogger(APP_LOGGER)
+        app_logger.handlers = [queue_handler]
+        app_logger.setLevel((level or settings.LOG_LEVEL).upper())
+        app_logger.propagate = False
+
+        _state.listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _state.listener.start()
+        _state.queue_handler = queue_handler
+        _state.format = log_format
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write out everything still queued and stop the listener thread."""
+    with _state.lock:
+        if _state.listener is not None:
+            _state.listener.stop()
+            _state.listener = None
+
+
+def set_log_level(level: str, logger_name: str = APP_LOGGER) -> Dict[str, str]:
+    """Change a level at runtime (this process only); returns the current levels."""
+    level = level.upper()
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level {level}; use one of {', '.join(LEVELS)}")
+    if logger_name != APP_LOGGER and not logger_name.startswith(APP_LOGGER + "."):
+        raise ValueError(f"Only the {APP_LOGGER} logger and its children can be changed")
+    logging.getLogger(logger_name).setLevel(level)
+    return log_levels()
+
+
+def log_levels() -> Dict[str, str]:
+    """Levels explicitly set on the app logger and its children."""
+    levels = {APP_LOGGER: logging.getLevelName(logging.getLogger(APP_LOGGER).level)}
+    for name, logger in sorted(logging.root.manager.loggerDict.items()):
+        if name.startswith(APP_LOGGER + ".") and isinstance(logger, logging.Logger) and logger.level:
+            levels[name] = logging.getLevelName(logger.level)
+    return levels
+
+
+def logging_stats() -> Dict:
+    handler = _state.queue_handler
+    sampling = next((f for f in handler.filters if isinstance(f, SamplingFilter)), None) if handler else None
+    return {
+        "format": _state.format,
+        "levels": log_levels(),
+        "queued": handler.queue.qsize() if handler else 0,
+        "queue_size": handler.queue.maxsize if handler else 0,
+        "dropped": handler.dropped if handler else 0,
+        "sampling_1_in": sampling.every if sampling else {},
+    }
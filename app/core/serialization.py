@@ -0,0 +1,66 @@
+# app/core/serialization.py
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, TypeAdapter, create_model
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter for List[schema], built (and its core schema compiled) once per schema."""
+    return TypeAdapter(List[schema])
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """?fields=a,b projection, validated against the response schema."""
+    if not fields:
+        return None
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in schema.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return requested or None
+
+
+@lru_cache(maxsize=256)
+def projection_model(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Model with only these fields of schema (same types and defaults), built once per projection."""
+    return create_model(
+        f"{schema.__name__}Fields",
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    )
+
+
+def dump_list_json(schema: Type[BaseModel], rows: Iterable[Any]) -> bytes:
+    """
+    Validate ORM rows (or dicts) against schema and encode them to JSON bytes
+    in pydantic-core, without going through per-row dicts and jsonable_encoder.
+    """
+    adapter = list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def dump_list(schema: Type[BaseModel], rows: Iterable[Any],
+              fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+    """JSON-ready dicts of ORM rows (or dicts) validated against schema, or only its fields."""
+    if fields:
+        schema = projection_model(schema, fields)
+    adapter = list_adapter(schema)
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+
+def model_list_response(schema: Type[BaseModel], rows: Iterable[Any],
+                        headers: Optional[Dict[str, str]] = None,
+                        fields: Optional[Tuple[str, ...]] = None) -> Response:
+    """
+    Response for list endpoints returning many rows. Keep response_model on
+    the route for the OpenAPI schema; this bypasses its (slower) serialization.
+    With fields, only those attributes are read from the rows and returned.
+    """
+    if fields:
+        schema = projection_model(schema, fields)
+    return Response(content=dump_list_json(schema, rows), media_type="application/json", headers=headers)
@@ -29,7 +29,7 @@ class SocketLog(Base):
     distance_km = Column(String, nullable=True)
     
     # Status and outcome
-    status = Column(String, nullable=False, default='pending')  # 'pending', 'success', 'failed', 'timeout'
+    status = Column(String, nullable=False, default='pending')  # 'pending', 'success', 'failed', 'timeout', 'queued'
     error_message = Column(Text, nullable=True)
     processed = Column(Boolean, default=False)                   # Whether the event was processed successfully
     
@@ -42,6 +42,12 @@ class SocketLog(Base):
     accepted_by_hospital_name = Column(String, nullable=True)
     rejection_reason = Column(Text, nullable=True)              # Reason for rejection if applicable
     
+    # Acknowledged delivery of the event sent for this log (see ReliableDelivery)
+    delivery_status = Column(String, nullable=True, index=True)  # 'pending', 'delivered', 'retrying', 'waiting_reconnect', 'failed', 'expired'
+    delivery_attempts = Column(Integer, nullable=True)
+    delivery_latency_ms = Column(Integer, nullable=True)         # From first send to client ack
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    
     # Timing
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     processed_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,135 @@
+# app/db/pool_monitor.py
+import logging
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+def _acquiring_stack() -> traceback.StackSummary:
+    """Caller stack without the SQLAlchemy/monitor frames that sit on top of it."""
+    frames = [
+        frame for frame in traceback.extract_stack(limit=40)[:-2]
+        if "sqlalchemy" not in frame.filename
+    ]
+    return traceback.StackSummary.from_list(frames[-15:])
+
+
+class PoolMonitor:
+    """
+    Tracks connection checkouts for an engine: how long callers wait for a
+    connection, and which connections have been held for too long (leaks),
+    together with the stack that acquired them.
+    """
+
+    def __init__(self, leak_threshold_seconds: float, capture_stack: bool = True):
+        self.leak_threshold_seconds = leak_threshold_seconds
+        self.capture_stack = capture_stack
+        self._lock = threading.Lock()
+        # id(connection record) -> (checkout monotonic time, acquiring stack)
+        self._checked_out: Dict[int, Tuple[float, Optional[traceback.StackSummary]]] = {}
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._slow_checkins = 0
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._wait_count += 1
+            self._wait_total += seconds
+            if seconds > self._wait_max:
+                self._wait_max = seconds
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        stack = _acquiring_stack() if self.capture_stack else None
+        with self._lock:
+            self._checked_out[id(connection_record)] = (time.monotonic(), stack)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            entry = self._checked_out.pop(id(connection_record), None)
+        if entry is None:
+            return
+        held = time.monotonic() - entry[0]
+        if held > self.leak_threshold_seconds:
+            with self._lock:
+                self._slow_checkins += 1
+            logger.warning("DB connection held for %.1fs (threshold %ss)", held, self.leak_threshold_seconds)
+
+    def find_leaks(self, threshold_seconds: Optional[float] = None) -> List[Dict]:
+        """
+        Connections currently checked out for longer than the threshold,
+        oldest first.
+        """
+        threshold = self.leak_threshold_seconds if threshold_seconds is None else threshold_seconds
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._checked_out.values())
+
+        leaks = []
+        for checked_out_at, stack in sorted(entries, key=lambda e: e[0]):
+            held = now - checked_out_at
+            if held <= threshold:
+                break
+            leaks.append({
+                "held_seconds": round(held, 3),
+                "stack": "".join(stack.format()) if stack else None,
+            })
+        return leaks
+
+    def stats(self, engine: Engine) -> Dict:
+        pool = engine.pool
+        with self._lock:
+            wait_count = self._wait_count
+            wait_total = self._wait_total
+            wait_max = self._wait_max
+            slow_checkins = self._slow_checkins
+            tracked = len(self._checked_out)
+
+        pool_stats = {"pool_class": type(pool).__name__, "tracked_checked_out": tracked}
+        if isinstance(pool, QueuePool):
+            pool_stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+
+        return {
+            **pool_stats,
+            "wait": {
+                "count": wait_count,
+                "avg_ms": round(wait_total / wait_count * 1000, 3) if wait_count else 0.0,
+                "max_ms": round(wait_max * 1000, 3),
+            },
+            "leak_threshold_seconds": self.leak_threshold_seconds,
+            "slow_checkins": slow_checkins,
+            "leaks": self.find_leaks(),
+        }
+
+
+def monitored_queue_pool(monitor: PoolMonitor):
+    """
+    QueuePool subclass that reports how long each connection acquisition
+    waited (including overflow connects) to the monitor.
+    """
+
+    class MonitoredQueuePool(QueuePool):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                monitor.record_wait(time.perf_counter() - start)
+
+    return MonitoredQueuePool
@@ -1,10 +1,129 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 from app.db.base_class import Base
+from app.db.pool_monitor import PoolMonitor, monitored_queue_pool
+
+logger = logging.getLogger(__name__)
+
+pool_monitor = PoolMonitor(
+    leak_threshold_seconds=settings.DB_LEAK_THRESHOLD_SECONDS,
+    capture_stack=settings.DB_LEAK_CAPTURE_STACK,
+)
+replica_pool_monitor = PoolMonitor(
+    leak_threshold_seconds=settings.DB_LEAK_THRESHOLD_SECONDS,
+    capture_stack=settings.DB_LEAK_CAPTURE_STACK,
+)
+
+
+def _engine_options(url: str, monitor: PoolMonitor) -> dict:
+    # SQLite (local scripts/tests) keeps SQLAlchemy's defaults
+    if url.startswith("sqlite"):
+        return {}
+
+    connect_args = {"connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+
+    return {
+        "poolclass": monitored_queue_pool(monitor),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL, pool_monitor))
+pool_monitor.attach(engine)
+
+replica_engine: Optional[Engine] = None
+if settings.REPLICA_DATABASE_URL:
+    replica_engine = create_engine(
+        settings.REPLICA_DATABASE_URL,
+        **_engine_options(settings.REPLICA_DATABASE_URL, replica_pool_monitor)
+    )
+    replica_pool_monitor.attach(replica_engine)
+
+
+class ReplicaHealth:
+    """
+    Caches whether the replica is reachable and within REPLICA_MAX_LAG_SECONDS
+    of the primary, re-checking at most once per interval.
+    """
+
+    # Zero when the replica has replayed everything it received, so an idle
+    # primary doesn't look like replication lag
+    _POSTGRES_LAG_SQL = text(
+        "SELECT CASE "
+        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+        "END"
+    )
+
+    def __init__(self, replica: Optional[Engine], max_lag_seconds: float, check_interval_seconds: float):
+        self.replica = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._usable = False
+        self.last_lag_seconds: Optional[float] = None
+
+    def _measure_lag(self) -> Optional[float]:
+        try:
+            with self.replica.connect() as conn:
+                if self.replica.dialect.name != "postgresql":
+                    conn.execute(text("SELECT 1"))
+                    return 0.0
+                return float(conn.execute(self._POSTGRES_LAG_SQL).scalar() or 0)
+        except Exception as e:
+            logger.warning("Read replica unavailable, using primary: %s", e)
+            return None
+
+    def is_usable(self) -> bool:
+        if self.replica is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval_seconds:
+                return self._usable
+            self._checked_at = now
+        lag = self._measure_lag()
+        self.last_lag_seconds = lag
+        self._usable = lag is not None and lag <= self.max_lag_seconds
+        return self._usable
+
+
+replica_health = ReplicaHealth(
+    replica_engine,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval_seconds=settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+)
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to the replica when the session was opened with
+    info["use_replica"] set; flushes and everything else go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("use_replica") and replica_engine is not None and not self._flushing:
+            return replica_engine
+        return engine
+
 
-engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession)
 
 def get_db():
     db = SessionLocal()
@@ -12,3 +131,48 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """
+    Session for read-only routes: served by the replica when one is configured
+    and healthy, otherwise by the primary.
+    """
+    db = ReadSessionLocal(info={"use_replica": replica_health.is_usable()})
+    try:
+        yield db
+    finally:
+        db.close()
+
+@contextmanager
+def session_scope():
+    """
+    Session for code running outside a request (socket handlers, background jobs).
+    Always returns the connection to the pool on exit.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@contextmanager
+def read_session_scope():
+    """
+    Read-only counterpart of session_scope (replica when usable), for reads
+    that outlive the request, such as streamed responses.
+    """
+    db = ReadSessionLocal(info={"use_replica": replica_health.is_usable()})
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_pool_status() -> dict:
+    status = pool_monitor.stats(engine)
+    if replica_engine is not None:
+        status["replica"] = {
+            **replica_pool_monitor.stats(replica_engine),
+            "usable": replica_health.is_usable(),
+            "lag_seconds": replica_health.last_lag_seconds,
+        }
+    return status
@@ -1,4 +1,10 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from app.core.logging import setup_logging
+
+# Before the routers and services are imported, so what they log at import time is kept
+setup_logging()
+
 from app.api.v1 import (
     credential,
     medical_record,
@@ -12,11 +18,19 @@ from app.api.v1 import (
     user_settings
 )
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import logging
 import socketio
-from app.services.socket import sio
+from app.core.config import settings
+from app.middleware.compression import CompressionMiddleware, compression_stats
+from app.db.session import session_scope
+from app.services.socket import sio, ambulance_tracker, location_ack_batcher, reliable_delivery
+from app.services.sos_queue import load_pending_sos_queue, run_pending_sos_reconciliation
 import os
 
-app = FastAPI(title="Healiora API", version="1.0.0" , debug=True)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Healiora API", version="1.0.0" , debug=True, default_response_class=ORJSONResponse)
 
 sio_asgi_app = socketio.ASGIApp(socketio_server=sio, other_asgi_app=app)
 
@@ -27,7 +41,20 @@ app.add_middleware(
     allow_credentials=False,  # Must be False when using "*"
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],  # Cursor pagination; catalog ETags
 )
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        encodings=settings.COMPRESSION_ENCODINGS,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+        excluded_paths=settings.COMPRESSION_EXCLUDED_PATHS,
+        stream_media_types=settings.COMPRESSION_STREAM_MEDIA_TYPES,
+        stats=compression_stats,
+    )
 
 app.include_router(credential.router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(medical_record.router, prefix="/api/v1/medical-records", tags=["Medical Records"]) 
@@ -40,6 +67,49 @@ app.include_router(admin.router, prefix="/api/v1", tags=["Admin"])
 app.include_router(patient_assignment.router, prefix="/api/v1/patient-assignments", tags=["Patient Assignments"])
 app.include_router(user_settings.router, prefix="/api/v1/user-settings", tags=["User Settings"])
 
+@app.on_event("startup")
+async def start_pending_sos_queue():
+    # Populate the in-memory pending SOS queue, then keep it reconciled with the DB
+    try:
+        with session_scope() as db:
+            loaded = load_pending_sos_queue(db)
+        logger.info("Pending SOS queue loaded: %s requests", loaded['pending'])
+    except Exception as e:
+        logger.error("Error loading pending SOS queue, falling back to DB reads: %s", e)
+    app.state.sos_reconciliation_task = asyncio.create_task(
+        run_pending_sos_reconciliation(settings.SOS_QUEUE_RECONCILE_INTERVAL_SECONDS)
+    )
+
+@app.on_event("startup")
+async def start_ambulance_tracking():
+    app.state.ambulance_tracking_task = asyncio.create_task(ambulance_tracker.run())
+
+@app.on_event("startup")
+async def start_location_ack_batching():
+    app.state.location_ack_task = asyncio.create_task(location_ack_batcher.run())
+
+@app.on_event("startup")
+async def start_delivery_expiry():
+    app.state.delivery_expiry_task = asyncio.create_task(
+        reliable_delivery.run(settings.SOCKET_DELIVERY_EXPIRE_INTERVAL_SECONDS)
+    )
+
+@app.on_event("shutdown")
+async def stop_pending_sos_queue():
+    app.state.sos_reconciliation_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_ambulance_tracking():
+    app.state.ambulance_tracking_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_location_ack_batching():
+    app.state.location_ack_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_delivery_expiry():
+    app.state.delivery_expiry_task.cancel()
+
 @app.get("/")
 def read_root():
     return {"message": "Healiora API is running!"}
@@ -1,3 +1,4 @@
+import logging
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from jose import JWTError
@@ -7,6 +8,8 @@ from app.db.session import get_db
 from app.utils.jwt import verify_token
 from app.db.models.credential import Credential  # ✅ now using Credential model
 
+logger = logging.getLogger(__name__)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 def get_current_user(
@@ -15,7 +18,7 @@ def get_current_user(
 ) -> Credential:
     try:
         payload = verify_token(token)
-        print("✅ Token payload:", payload)
+        logger.debug("Token payload: %s", payload)
         user_id = payload.get("user_id") or payload.get("sub")
         if user_id is None:
             raise HTTPException(
@@ -23,7 +26,7 @@ def get_current_user(
                 detail="Invalid token payload",
             )
     except JWTError as e:
-        print("❌ JWT Error:", e)
+        logger.warning("JWT error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -0,0 +1,338 @@
+# app/middleware/compression.py
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: br is offered only when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is offered only when installed
+    zstandard = None
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings(preferred: Iterable[str]) -> List[str]:
+    """Preferred encodings, in order, whose compressor is installed."""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [encoding for encoding in preferred if installed.get(encoding)]
+
+
+def negotiate_encoding(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """
+    Encoding with the highest q-value in Accept-Encoding; ties go to the
+    earlier entry of encodings. None when the client accepts none of them.
+    """
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    """Text-like media types; images, archives etc. are usually compressed already."""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or any(
+        marker in media_type for marker in ("json", "xml", "javascript")
+    )
+
+
+class CompressionStats:
+    """
+    Compression ratio and CPU time per encoding and response size bucket,
+    plus how many responses were sent uncompressed and why.
+    """
+
+    # Upper bounds (bytes) of the size buckets; the last bucket is open-ended
+    SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (encoding, bucket) -> [responses, bytes_in, bytes_out, cpu_seconds]
+        self._compressed: Dict[tuple, list] = {}
+        # reason -> [responses, bytes] (bytes unknown for streams)
+        self._skipped: Dict[str, list] = {}
+
+    @classmethod
+    def bucket(cls, size: int) -> str:
+        lower = 0
+        for upper in cls.SIZE_BUCKETS:
+            if size < upper:
+                return f"{lower // 1024}-{upper // 1024}KiB"
+            lower = upper
+        return f">={lower // 1024}KiB"
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+        key = (encoding, self.bucket(bytes_in))
+        with self._lock:
+            entry = self._compressed.setdefault(key, [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += bytes_in
+            entry[2] += bytes_out
+            entry[3] += cpu_seconds
+
+    def skip(self, reason: str, size: Optional[int] = None) -> None:
+        with self._lock:
+            entry = self._skipped.setdefault(reason, [0, 0])
+            entry[0] += 1
+            entry[1] += size or 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._compressed.clear()
+            self._skipped.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            compressed = {}
+            for (encoding, bucket), (responses, bytes_in, bytes_out, cpu) in sorted(self._compressed.items()):
+                compressed.setdefault(encoding, {})[bucket] = {
+                    "responses": responses,
+                    "bytes_in": bytes_in,
+                    "bytes_out": bytes_out,
+                    "ratio": round(bytes_out / bytes_in, 4) if bytes_in else None,
+                    "cpu_ms_total": round(cpu * 1000, 3),
+                    "cpu_us_per_kib": round(cpu * 1e6 / (bytes_in / 1024), 2) if bytes_in else None,
+                }
+            skipped = {
+                reason: {"responses": responses, "bytes": size}
+                for reason, (responses, size) in sorted(self._skipped.items())
+            }
+        return {"compressed": compressed, "skipped": skipped}
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """
+    Compresses HTTP responses with the best encoding both sides support.
+
+    Complete bodies are compressed when they reach minimum_size and shrink.
+    Streaming bodies are passed through unless their media type is listed in
+    stream_media_types; those are compressed chunk by chunk, each chunk
+    flushed so clients receive it without waiting for the end.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: Sequence[str] = ("br", "zstd", "gzip"),
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        excluded_paths: Sequence[str] = (),
+        stream_media_types: Sequence[str] = (),
+        stats: Optional[CompressionStats] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings(encodings)
+        self.excluded_paths = tuple(excluded_paths)
+        self.stream_media_types = {media_type.lower() for media_type in stream_media_types}
+        self.stats = stats or compression_stats
+        self._factories = {
+            "gzip": lambda: _GzipCompressor(gzip_level),
+            "br": lambda: _BrotliCompressor(brotli_quality),
+            "zstd": lambda: _ZstdCompressor(zstd_level),
+        }
+
+    def compressor(self, encoding: str):
+        return self._factories[encoding]()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressionResponder(self, encoding, send).send)
+
+
+class _CompressionResponder:
+    """Per-response state: holds the start message until the first body chunk decides."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.mode: Optional[str] = None  # "passthrough" or "stream" once decided
+        self.compressor = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if self.mode == "passthrough":
+            await self._send(message)
+            return
+        if self.mode == "stream":
+            await self._send_stream_chunk(message)
+            return
+        if message["type"] != "http.response.body":
+            await self._pass_through(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = Headers(raw=self.start_message["headers"])
+        reason = self._skip_reason(headers, body, more_body)
+        if reason:
+            self.middleware.stats.skip(reason, None if more_body else len(body))
+            await self._pass_through(message)
+        elif more_body:
+            self.mode = "stream"
+            self.compressor = self.middleware.compressor(self.encoding)
+            self._set_encoding_headers()
+            await self._send(self.start_message)
+            await self._send_stream_chunk(message)
+        else:
+            await self._send_whole(message, body)
+
+    def _skip_reason(self, headers: Headers, body: bytes, more_body: bool) -> Optional[str]:
+        if "content-encoding" in headers:
+            return "already_encoded"
+        if "no-transform" in headers.get("cache-control", "").lower():
+            return "no_transform"
+        if not more_body and len(body) < self.middleware.minimum_size:
+            return "below_minimum_size"
+        content_type = headers.get("content-type", "")
+        if not is_compressible(content_type):
+            return "media_type"
+        if more_body:
+            media_type = content_type.split(";", 1)[0].strip().lower()
+            return None if media_type in self.middleware.stream_media_types else "streaming"
+        return None
+
+    def _set_negotiated_headers(self, headers: MutableHeaders) -> None:
+        """
+        Headers for any response to a request that negotiated an encoding. The
+        body may be encoded (whether it is depends on its size, which a 304
+        doesn't have), so the ETag is weak on every such response: a 304
+        then carries the same validator as the 200 the client cached.
+        """
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def _pass_through(self, message: Message) -> None:
+        self.mode = "passthrough"
+        headers = MutableHeaders(scope=self.start_message)
+        if "content-encoding" not in headers:
+            self._set_negotiated_headers(headers)
+        await self._send(self.start_message)
+        await self._send(message)
+
+    def _set_encoding_headers(self, content_length: Optional[int] = None) -> None:
+        headers = MutableHeaders(scope=self.start_message)
+        headers["Content-Encoding"] = self.encoding
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        self._set_negotiated_headers(headers)
+
+    async def _send_whole(self, message: Message, body: bytes) -> None:
+        started = time.thread_time()
+        compressor = self.middleware.compressor(self.encoding)
+        compressed = compressor.compress(body) + compressor.finish()
+        cpu_seconds = time.thread_time() - started
+        if len(compressed) >= len(body):
+            self.middleware.stats.skip("incompressible", len(body))
+            await self._pass_through(message)
+            return
+        self.middleware.stats.record(self.encoding, len(body), len(compressed), cpu_seconds)
+        self.mode = "passthrough"
+        self._set_encoding_headers(len(compressed))
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    async def _send_stream_chunk(self, message: Message) -> None:
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        started = time.thread_time()
+        chunk = self.compressor.compress(body)
+        chunk += self.compressor.flush() if more_body else self.compressor.finish()
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_in += len(body)
+        self.bytes_out += len(chunk)
+        if not more_body:
+            self.middleware.stats.record(self.encoding, self.bytes_in, self.bytes_out, self.cpu_seconds)
+        if chunk or not more_body:
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
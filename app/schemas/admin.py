@@ -25,4 +25,10 @@ class AdminInfo(BaseModel):
     is_active: bool
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+
+class LogLevelUpdate(BaseModel):
+    """Schema for changing a log level at runtime"""
+    level: str
+    logger: str = "app"
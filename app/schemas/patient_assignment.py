@@ -1,6 +1,6 @@
 # app/schemas/patient_assignment.py
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
@@ -65,6 +65,23 @@ class PatientAssignmentOut(BaseModel):
         from_attributes = True
 
 
+class PatientAssignmentBatchCreate(BaseModel):
+    assignments: List[PatientAssignmentCreate] = Field(..., min_length=1, max_length=200)
+
+
+class PatientAssignmentBatchItemResult(BaseModel):
+    index: int  # Position in the request's assignments list
+    success: bool
+    assignment: Optional[PatientAssignmentOut] = None
+    error: Optional[str] = None
+
+
+class PatientAssignmentBatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[PatientAssignmentBatchItemResult]
+
+
 class AssignmentStatusUpdate(BaseModel):
     status: Optional[str] = None
     doctor_assignment_status: Optional[str] = None
@@ -90,6 +107,12 @@ class PatientAssignmentWithContext(PatientAssignmentOut):
     medical_record_summary: Optional[Dict[str, Any]] = None
 
 
+class AssignmentStatisticsBucket(BaseModel):
+    bucket_start: datetime
+    total: int
+    by_status: Dict[str, int]
+
+
 class AssignmentStatistics(BaseModel):
     total_assignments: int
     active_assignments: int
@@ -100,3 +123,5 @@ class AssignmentStatistics(BaseModel):
     both_assignments: int
     assignments_by_status: Dict[str, int]
     assignments_by_priority: Dict[str, int]
+    bucket: Optional[str] = None  # 'hour' or 'day' when a series was requested
+    series: Optional[List[AssignmentStatisticsBucket]] = None
@@ -59,6 +59,10 @@ class SocketLogOut(SocketLogBase):
     processed_at: Optional[datetime] = None
     response_time_ms: Optional[int] = None
     session_duration: Optional[int] = None
+    delivery_status: Optional[str] = None
+    delivery_attempts: Optional[int] = None
+    delivery_latency_ms: Optional[int] = None
+    delivered_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
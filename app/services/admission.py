@@ -0,0 +1,77 @@
+# app/services/admission.py
+import random
+from typing import Dict, Optional
+
+from app.services.rate_limit import KeyedRateLimiter
+
+
+def client_ip(environ: Dict, trusted_proxy_hops: int = 0) -> str:
+    """
+    Client address of a Socket.IO handshake. Behind trusted_proxy_hops proxies
+    it is that many entries from the right of X-Forwarded-For; entries further
+    left are client-supplied and ignored.
+    """
+    if trusted_proxy_hops > 0:
+        forwarded = [hop.strip() for hop in environ.get("HTTP_X_FORWARDED_FOR", "").split(",") if hop.strip()]
+        if forwarded:
+            return forwarded[-min(trusted_proxy_hops, len(forwarded))]
+    return environ.get("REMOTE_ADDR") or "unknown"
+
+
+class ConnectionAdmission:
+    """
+    Admission control for Socket.IO handshakes: a token bucket per client IP
+    and per user, and a cap on handshakes in progress at once.
+
+    Each check returns None when the connection may proceed, or the seconds
+    the client should wait before retrying. Waits for the global cap are
+    jittered so a reconnect storm spreads out instead of coming back at once.
+    """
+
+    def __init__(self, ip_rate: float, ip_burst: int, user_rate: float, user_burst: int,
+                 max_concurrent: int, busy_retry_seconds: float):
+        self.ip_limiter = KeyedRateLimiter(rate=ip_rate, capacity=ip_burst)
+        self.user_limiter = KeyedRateLimiter(rate=user_rate, capacity=user_burst)
+        self.max_concurrent = max_concurrent
+        self.busy_retry_seconds = busy_retry_seconds
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.refused = {"ip": 0, "user": 0, "busy": 0}
+
+    def check_ip(self, ip: str) -> Optional[float]:
+        if self.ip_limiter.allow(ip):
+            return None
+        self.refused["ip"] += 1
+        return self.ip_limiter.retry_after(ip)
+
+    def check_user(self, user_id) -> Optional[float]:
+        if self.user_limiter.allow(user_id):
+            return None
+        self.refused["user"] += 1
+        return self.user_limiter.retry_after(user_id)
+
+    def acquire(self) -> Optional[float]:
+        """Take a handshake slot; call release() when the handshake ends."""
+        if self.in_flight >= self.max_concurrent:
+            self.refused["busy"] += 1
+            return self.busy_retry_seconds * (1 + random.random())
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return None
+
+    def release(self, admitted: bool = True) -> None:
+        self.in_flight -= 1
+        if admitted:
+            self.admitted += 1
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_concurrent": self.max_concurrent,
+            "admitted": self.admitted,
+            "refused": dict(self.refused),
+            "tracked_ips": len(self.ip_limiter),
+            "tracked_users": len(self.user_limiter),
+        }
@@ -9,11 +9,13 @@ import secrets
 import string
 from fastapi import HTTPException
 import random
-import time
 from app.db.models.patient_assignment import PatientAssignment
+from app.services.availability import ambulance_busy_conditions, get_busy_ambulances, availability_status
+from app.services.verification_code import VerificationCodeStore
+from app.services.catalog import catalog_store
 
-# In-memory storage for verification codes (in production, use Redis or database)
-verification_codes = {}
+# Verification codes live in the shared store (Redis when configured) so they work across workers
+verification_codes = VerificationCodeStore(namespace="ambulance")
 
 def generate_password(length: int = 12) -> str:
     """Generate a secure random password with letters, digits, and symbols."""
@@ -33,29 +35,13 @@ def generate_verification_code() -> str:
 
 def store_verification_code(email: str, code: str, new_password: str = None):
     """Store verification code with expiration (10 minutes)."""
-    verification_codes[email] = {
-        'code': code,
-        'expires_at': time.time() + 600  # 10 minutes
-    }
-    if new_password:
-        verification_codes[email]['new_password'] = new_password
+    new_password_hash = hash_password(new_password) if new_password else None
+    verification_codes.store(email, code, new_password_hash)
 
 def verify_verification_code(email: str, code: str) -> bool:
     """Verify the provided code for the email."""
-    if email not in verification_codes:
-        return False
-    
-    stored_data = verification_codes[email]
-    if time.time() > stored_data['expires_at']:
-        # Code expired, remove it
-        del verification_codes[email]
-        return False
-    
-    if stored_data['code'] == code:
-        # Code verified, but don't delete it yet - we need to retrieve the new password
-        return True
-    
-    return False
+    # Code is not consumed here - we still need to retrieve the new password
+    return verification_codes.verify(email, code)
 
 def create_ambulance(
     db: Session,
@@ -104,6 +90,7 @@ def create_ambulance(
     db.add(ambulance)
     db.commit()
     db.refresh(ambulance)
+    catalog_store.bump("ambulances")
 
     # 4. Email credentials
     send_email(
@@ -146,9 +133,6 @@ def get_ambulance_by_credential_id(
 def get_ambulances_by_hospital(db: Session, hospital_id: int):
     return db.query(Ambulance).filter(Ambulance.hospital_id == hospital_id).all()
 
-def get_all_ambulances(db: Session):
-    return db.query(Ambulance).all()
-
 def authenticate_ambulance(db: Session, email: str, password: str):
     cred = db.query(Credential).filter(Credential.email == email, Credential.role == "ambulance").first()
     if not cred or not verify_password(password, cred.password):
@@ -160,9 +144,7 @@ def is_ambulance_available(db: Session, ambulance_id: int) -> dict:
     active = (
         db.query(PatientAssignment)
         .filter(PatientAssignment.ambulance_id == ambulance_id)
-        .filter(PatientAssignment.status.in_(["active"]))
-        .filter(PatientAssignment.case_status.in_(["open", "in_progress"]))
-        .filter(PatientAssignment.ambulance_assignment_status.in_(["accepted", "en_route"]))
+        .filter(*ambulance_busy_conditions())
         .order_by(PatientAssignment.created_at.desc())
         .first()
     )
@@ -170,11 +152,9 @@ def is_ambulance_available(db: Session, ambulance_id: int) -> dict:
 
 def get_hospital_ambulance_statuses(db: Session, hospital_id: int) -> list:
     ambulances = get_ambulances_by_hospital(db, hospital_id)
-    results = []
-    for amb in ambulances:
-        s = is_ambulance_available(db, amb.id)
-        results.append({"ambulance_id": amb.id, **s})
-    return results
+    # One query for the whole hospital instead of one per ambulance
+    busy = get_busy_ambulances(db, hospital_id)
+    return [{"ambulance_id": amb.id, **availability_status(busy, amb.id)} for amb in ambulances]
 
 def request_password_change(db: Session, email: str, current_password: str, new_password: str):
     """Request password change for ambulance user."""
@@ -238,19 +218,17 @@ def change_password_with_verification(db: Session, email: str, verification_code
     if not verify_verification_code(email, verification_code):
         raise HTTPException(status_code=400, detail="Invalid or expired verification code")
     
-    # Get the stored new password
-    if email not in verification_codes or 'new_password' not in verification_codes[email]:
+    # Get the stored new password (hashed when the request was made)
+    stored_data = verification_codes.get(email)
+    if not stored_data or 'new_password' not in stored_data:
         raise HTTPException(status_code=400, detail="Password change request not found or expired")
     
-    new_password = verification_codes[email]['new_password']
-    
     # Update password
-    credential.password = hash_password(new_password)
+    credential.password = stored_data['new_password']
     db.commit()
     db.refresh(credential)
     
     # Clean up stored data after successful password change
-    if email in verification_codes:
-        del verification_codes[email]
+    verification_codes.discard(email)
     
     return {"message": "Password changed successfully"} 
\ No newline at end of file
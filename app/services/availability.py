@@ -0,0 +1,61 @@
+# app/services/availability.py
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from app.db.models.ambulance import Ambulance
+from app.db.models.doctor import Doctor
+from app.db.models.patient_assignment import PatientAssignment
+
+
+def doctor_busy_conditions():
+    """Assignment conditions under which a doctor is not available."""
+    return [
+        PatientAssignment.status.in_(["active"]),
+        PatientAssignment.case_status.in_(["open", "in_progress"]),
+        PatientAssignment.doctor_assignment_status.in_(["accepted"]),
+    ]
+
+
+def ambulance_busy_conditions():
+    """Assignment conditions under which an ambulance is not available."""
+    return [
+        PatientAssignment.status.in_(["active"]),
+        PatientAssignment.case_status.in_(["open", "in_progress"]),
+        PatientAssignment.ambulance_assignment_status.in_(["accepted", "en_route"]),
+    ]
+
+
+def get_busy_doctors(db: Session, hospital_id: int) -> Dict[int, int]:
+    """
+    Busy doctors of a hospital in one query: {doctor_id: latest active assignment id}.
+    """
+    rows = (
+        db.query(PatientAssignment.doctor_id, PatientAssignment.id)
+        .join(Doctor, Doctor.id == PatientAssignment.doctor_id)
+        .filter(Doctor.hospital_id == hospital_id, *doctor_busy_conditions())
+        .order_by(PatientAssignment.created_at, PatientAssignment.id)
+        .all()
+    )
+    # Ordered oldest first, so the latest assignment wins
+    return {doctor_id: assignment_id for doctor_id, assignment_id in rows}
+
+
+def get_busy_ambulances(db: Session, hospital_id: int) -> Dict[int, int]:
+    """
+    Busy ambulances of a hospital in one query: {ambulance_id: latest active assignment id}.
+    """
+    rows = (
+        db.query(PatientAssignment.ambulance_id, PatientAssignment.id)
+        .join(Ambulance, Ambulance.id == PatientAssignment.ambulance_id)
+        .filter(Ambulance.hospital_id == hospital_id, *ambulance_busy_conditions())
+        .order_by(PatientAssignment.created_at, PatientAssignment.id)
+        .all()
+    )
+    return {ambulance_id: assignment_id for ambulance_id, assignment_id in rows}
+
+
+def availability_status(busy: Dict[int, int], resource_id: int) -> dict:
+    """Availability of one doctor/ambulance from a busy map, in the shape of is_*_available()."""
+    active_assignment_id = busy.get(resource_id)
+    return {"available": active_assignment_id is None, "active_assignment_id": active_assignment_id}
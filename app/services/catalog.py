@@ -0,0 +1,251 @@
+# app/services/catalog.py
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.serialization import parse_fields
+from app.db.models.ambulance import Ambulance
+from app.db.models.doctor import Doctor
+from app.db.models.hospital import Hospital
+from app.schemas.ambulance import AmbulanceOut
+from app.schemas.doctor import DoctorOut
+from app.schemas.hospital import HospitalOut
+
+logger = logging.getLogger(__name__)
+
+# name -> (model, response schema, column of the per-hospital scope)
+CATALOGS = {
+    "hospitals": (Hospital, HospitalOut, None),
+    "doctors": (Doctor, DoctorOut, Doctor.hospital_id),
+    "ambulances": (Ambulance, AmbulanceOut, Ambulance.hospital_id),
+}
+
+
+class CatalogVersionBackend(ABC):
+    """Storage interface for catalog version counters."""
+
+    @abstractmethod
+    def get(self, name: str) -> int:
+        ...
+
+    @abstractmethod
+    def bump(self, name: str) -> int:
+        ...
+
+
+class InMemoryCatalogVersionBackend(CatalogVersionBackend):
+    """
+    Process-local counters. Writes made by other workers are only picked up
+    when snapshots reach CATALOG_SNAPSHOT_MAX_AGE_SECONDS.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def bump(self, name: str) -> int:
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return self._versions[name]
+
+
+class RedisCatalogVersionBackend(CatalogVersionBackend):
+    """Counters shared by all workers."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return f"catalog_version:{name}"
+
+    def get(self, name: str) -> int:
+        return int(self._client.get(self._key(name)) or 0)
+
+    def bump(self, name: str) -> int:
+        return int(self._client.incr(self._key(name)))
+
+
+def _build_default_backend() -> CatalogVersionBackend:
+    if settings.REDIS_URL:
+        return RedisCatalogVersionBackend(settings.REDIS_URL)
+    return InMemoryCatalogVersionBackend()
+
+
+def encode_catalog_cursor(last_id: int) -> str:
+    """Opaque cursor pointing just after this id."""
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_catalog_cursor(cursor: str) -> int:
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _etag(body: bytes) -> str:
+    """Strong ETag: the hash of the exact response bytes."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class CatalogPage:
+    """One serialized page of a catalog, with its ETag and the next cursor."""
+
+    __slots__ = ("body", "etag", "next_cursor")
+
+    def __init__(self, body: bytes, next_cursor: Optional[str]):
+        self.body = body
+        self.etag = _etag(body)
+        self.next_cursor = next_cursor
+
+    def to_response(self, request: Request) -> Response:
+        """200 with the page, or 304 when the client already has it."""
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.next_cursor:
+            headers["X-Next-Cursor"] = self.next_cursor
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+class CatalogSnapshot:
+    """
+    Serialized rows of one catalog (optionally one hospital's part of it) in
+    id order, as of one catalog version. Pages built from it are memoized.
+    """
+
+    def __init__(self, version: int, rows: List[Dict], max_pages: int):
+        self.version = version
+        self.rows = rows
+        self.ids = [row["id"] for row in rows]
+        self.built_at = time.monotonic()
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[Tuple, CatalogPage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def page(self, limit: Optional[int], after_id: Optional[int], fields: Optional[Tuple[str, ...]]) -> CatalogPage:
+        key = (limit, after_id, fields)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                return page
+
+        start = bisect_right(self.ids, after_id) if after_id is not None else 0
+        rows = self.rows[start:start + limit] if limit is not None else self.rows[start:]
+        if fields:
+            rows = [{f: row[f] for f in fields} for row in rows]
+        has_more = limit is not None and start + limit < len(self.rows)
+        next_cursor = encode_catalog_cursor(self.ids[start + limit - 1]) if has_more else None
+        page = CatalogPage(json.dumps(rows, separators=(",", ":")).encode(), next_cursor)
+
+        with self._lock:
+            self._pages[key] = page
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return page
+
+
+class CatalogStore:
+    """
+    Versioned snapshots of the hospital, doctor and ambulance catalogs.
+
+    Writes call bump(); the next read of that catalog rebuilds its snapshot.
+    Snapshots are also rebuilt after max_age_seconds, which bounds staleness
+    for writes from other workers when versions are process-local.
+    """
+
+    def __init__(self, backend: CatalogVersionBackend, max_age_seconds: float,
+                 max_snapshots: int, max_pages_per_snapshot: int):
+        self.backend = backend
+        self.max_age_seconds = max_age_seconds
+        self.max_snapshots = max_snapshots
+        self.max_pages_per_snapshot = max_pages_per_snapshot
+        self._snapshots: "OrderedDict[Tuple[str, Optional[int]], CatalogSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bump(self, *names: str) -> None:
+        for name in names:
+            try:
+                self.backend.bump(name)
+            except Exception as e:
+                logger.error("Error bumping catalog version for %s: %s", name, e)
+                self._drop(name)
+
+    def _drop(self, name: str) -> None:
+        with self._lock:
+            for key in [key for key in self._snapshots if key[0] == name]:
+                del self._snapshots[key]
+
+    def _version(self, name: str) -> int:
+        try:
+            return self.backend.get(name)
+        except Exception as e:
+            # Rebuild rather than serve a snapshot we can't validate
+            logger.error("Error reading catalog version for %s: %s", name, e)
+            return -1
+
+    def snapshot(self, db: Session, name: str, scope_id: Optional[int] = None) -> CatalogSnapshot:
+        model, schema, scope_column = CATALOGS[name]
+        key = (name, scope_id)
+        version = self._version(name)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if (
+                snapshot is not None and version >= 0 and snapshot.version == version
+                and time.monotonic() - snapshot.built_at < self.max_age_seconds
+            ):
+                self._snapshots.move_to_end(key)
+                return snapshot
+
+        query = db.query(model)
+        if scope_id is not None:
+            query = query.filter(scope_column == scope_id)
+        rows = [schema.model_validate(obj, from_attributes=True).model_dump(mode="json") for obj in query.order_by(model.id).all()]
+        snapshot = CatalogSnapshot(version, rows, self.max_pages_per_snapshot)
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def page(self, db: Session, name: str, scope_id: Optional[int] = None, limit: Optional[int] = None,
+             cursor: Optional[str] = None, fields: Optional[str] = None) -> CatalogPage:
+        schema = CATALOGS[name][1]
+        projection = parse_fields(fields, schema)
+        after_id = decode_catalog_cursor(cursor) if cursor else None
+        return self.snapshot(db, name, scope_id).page(limit, after_id, projection)
+
+
+catalog_store = CatalogStore(
+    _build_default_backend(),
+    max_age_seconds=settings.CATALOG_SNAPSHOT_MAX_AGE_SECONDS,
+    max_snapshots=settings.CATALOG_MAX_SNAPSHOTS,
+    max_pages_per_snapshot=settings.CATALOG_MAX_PAGES_PER_SNAPSHOT,
+)
@@ -5,6 +5,8 @@ from app.db.models.hospital import Hospital
 from app.schemas.credential import CredentialCreate
 from app.schemas.hospital import HospitalCreate
 from app.core.security import hash_password
+from app.services.geo import hospital_geo_index
+from app.services.catalog import catalog_store
 from app.schemas.patient import PatientRegisterSchema
 from app.db.models.patient import Patient
 from app.db.models.credential import Credential
@@ -62,6 +64,8 @@ def create_hospital_by_admin(
     db.add(hospital)
     db.commit()
     db.refresh(hospital)
+    hospital_geo_index.invalidate()
+    catalog_store.bump("hospitals")
     return hospital
 
 def get_user_by_email(db: Session, email: str) -> Credential:
@@ -0,0 +1,183 @@
+# app/services/delivery.py
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+
+import socketio
+
+from app.db.models.socket_log import SocketLog
+from app.db.session import session_scope
+
+logger = logging.getLogger(__name__)
+
+
+def _record_delivery(socket_log_id: int, fields: Dict) -> None:
+    with session_scope() as db:
+        db.query(SocketLog).filter(SocketLog.id == socket_log_id).update(fields, synchronize_session=False)
+        db.commit()
+
+
+class ReliableDelivery:
+    """
+    At-least-once delivery for critical socket events.
+
+    Each event is sent with sio.call() and must be acknowledged by the client
+    (Socket.IO callback). Unacked sends are retried with exponential backoff;
+    events for users that are offline, or that ran out of attempts, stay in
+    the pending-ack table and are redelivered when the same user reconnects,
+    until they are older than ttl_seconds (see run() for the expiry job).
+
+    Payloads carry a "delivery_id" so clients can drop duplicates.
+    Outcome, attempts and latency are written to the event's SocketLog row.
+    """
+
+    def __init__(
+        self,
+        sio: socketio.AsyncServer,
+        connected_users: Dict[str, Dict],
+        ack_timeout_seconds: float,
+        max_attempts: int,
+        backoff_seconds: float,
+        max_backoff_seconds: float,
+        ttl_seconds: int,
+    ):
+        self.sio = sio
+        self.connected_users = connected_users
+        self.ack_timeout_seconds = ack_timeout_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.ttl_seconds = ttl_seconds
+        # delivery_id -> pending entry
+        self._pending: Dict[str, Dict] = {}
+        # user_id -> delivery_ids waiting for that user
+        self._by_user: Dict[str, Set[str]] = {}
+
+    def send(self, user_id, event: str, payload: Dict, socket_log_id: Optional[int] = None) -> str:
+        """
+        Queue an event for acknowledged delivery and start sending it in the
+        background. Returns the delivery id.
+        """
+        self._expire_old()
+        delivery_id = uuid.uuid4().hex
+        user_id = str(user_id)
+        self._pending[delivery_id] = {
+            "user_id": user_id,
+            "event": event,
+            "payload": {**payload, "delivery_id": delivery_id},
+            "socket_log_id": socket_log_id,
+            "attempts": 0,        # in the current round (reset on reconnect)
+            "total_attempts": 0,  # across rounds, as recorded on the log
+            "created_at": time.monotonic(),
+            "task": None,
+        }
+        self._by_user.setdefault(user_id, set()).add(delivery_id)
+        self._start(delivery_id)
+        return delivery_id
+
+    def redeliver(self, user_id) -> int:
+        """
+        Resend every unacked event of a user who just (re)connected.
+        Returns the number of events resent.
+        """
+        self._expire_old()
+        resent = 0
+        for delivery_id in list(self._by_user.get(str(user_id), ())):
+            entry = self._pending.get(delivery_id)
+            if entry and (entry["task"] is None or entry["task"].done()):
+                self._start(delivery_id, reset_attempts=True)
+                resent += 1
+        if resent:
+            logger.info("Redelivering %d unacked event(s) to user %s", resent, user_id)
+        return resent
+
+    async def run(self, interval_seconds: float) -> None:
+        """
+        Background job: expire parked entries even when nothing is being sent,
+        so their payloads are freed and their logs marked expired.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                self._expire_old()
+            except Exception as e:
+                logger.error("Error expiring unacked deliveries: %s", e)
+
+    def _start(self, delivery_id: str, reset_attempts: bool = False) -> None:
+        entry = self._pending[delivery_id]
+        if reset_attempts:
+            entry["attempts"] = 0
+        entry["task"] = asyncio.create_task(self._deliver(delivery_id))
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.backoff_seconds * (2 ** (attempt - 1)), self.max_backoff_seconds)
+
+    async def _deliver(self, delivery_id: str) -> None:
+        entry = self._pending.get(delivery_id)
+        while entry is not None and entry["attempts"] < self.max_attempts:
+            user = self.connected_users.get(entry["user_id"])
+            if not user:
+                # Parked until the user reconnects (see redeliver)
+                await self._record(entry, "waiting_reconnect")
+                return
+
+            entry["attempts"] += 1
+            entry["total_attempts"] += 1
+            try:
+                await self.sio.call(
+                    entry["event"], entry["payload"],
+                    to=user["socket_id"], timeout=self.ack_timeout_seconds
+                )
+            except Exception as e:
+                # socketio.exceptions.TimeoutError, or the socket went away mid-call
+                logger.warning(
+                    "%s to user %s not acked (attempt %d/%d): %s", entry['event'], entry['user_id'],
+                    entry['attempts'], self.max_attempts, str(e) or type(e).__name__
+                )
+                if entry["attempts"] < self.max_attempts:
+                    await self._record(entry, "retrying")
+                    await asyncio.sleep(self._backoff(entry["attempts"]))
+                continue
+
+            latency_ms = int((time.monotonic() - entry["created_at"]) * 1000)
+            self._forget(delivery_id)
+            logger.info("%s acked by user %s in %dms", entry['event'], entry['user_id'], latency_ms)
+            await self._record(entry, "delivered", {
+                "delivery_latency_ms": latency_ms,
+                "delivered_at": datetime.now(timezone.utc),
+            })
+            return
+
+        if entry is not None:
+            # Kept in the table so a reconnect can still deliver it
+            await self._record(entry, "failed")
+
+    def _forget(self, delivery_id: str) -> Optional[Dict]:
+        entry = self._pending.pop(delivery_id, None)
+        if entry is not None:
+            ids = self._by_user.get(entry["user_id"])
+            if ids is not None:
+                ids.discard(delivery_id)
+                if not ids:
+                    del self._by_user[entry["user_id"]]
+        return entry
+
+    def _expire_old(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for delivery_id, entry in list(self._pending.items()):
+            if entry["created_at"] < cutoff and (entry["task"] is None or entry["task"].done()):
+                self._forget(delivery_id)
+                if entry["socket_log_id"]:
+                    asyncio.create_task(self._record(entry, "expired"))
+
+    async def _record(self, entry: Dict, delivery_status: str, extra: Optional[Dict] = None) -> None:
+        if not entry["socket_log_id"]:
+            return
+        fields = {"delivery_status": delivery_status, "delivery_attempts": entry["total_attempts"], **(extra or {})}
+        try:
+            await asyncio.to_thread(_record_delivery, entry["socket_log_id"], fields)
+        except Exception as e:
+            logger.error("Error recording delivery for log %s: %s", entry['socket_log_id'], e)
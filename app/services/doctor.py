@@ -11,12 +11,14 @@ from app.middleware.auth import get_current_user
 from app.db.models.hospital import Hospital
 from fastapi import HTTPException
 import random
-import time
 from fastapi import status
 from app.db.models.patient_assignment import PatientAssignment
+from app.services.availability import doctor_busy_conditions, get_busy_doctors, availability_status
+from app.services.verification_code import VerificationCodeStore
+from app.services.catalog import catalog_store
 
-# In-memory storage for verification codes (in production, use Redis or database)
-verification_codes = {}
+# Verification codes live in the shared store (Redis when configured) so they work across workers
+verification_codes = VerificationCodeStore(namespace="doctor")
 
 def generate_password(length: int = 12) -> str:
     """Generate a secure random password with letters, digits, and symbols."""
@@ -37,29 +39,13 @@ def generate_verification_code() -> str:
 
 def store_verification_code(email: str, code: str, new_password: str = None):
     """Store verification code with expiration (10 minutes)."""
-    verification_codes[email] = {
-        'code': code,
-        'expires_at': time.time() + 600  # 10 minutes
-    }
-    if new_password:
-        verification_codes[email]['new_password'] = new_password
+    new_password_hash = hash_password(new_password) if new_password else None
+    verification_codes.store(email, code, new_password_hash)
 
 def verify_verification_code(email: str, code: str) -> bool:
     """Verify the provided code for the email."""
-    if email not in verification_codes:
-        return False
-    
-    stored_data = verification_codes[email]
-    if time.time() > stored_data['expires_at']:
-        # Code expired, remove it
-        del verification_codes[email]
-        return False
-    
-    if stored_data['code'] == code:
-        # Code verified, but don't delete it yet - we need to retrieve the new password
-        return True
-    
-    return False
+    # Code is not consumed here - we still need to retrieve the new password
+    return verification_codes.verify(email, code)
 
 
 def create_doctor(
@@ -106,6 +92,7 @@ def create_doctor(
     db.add(doctor)
     db.commit()
     db.refresh(doctor)
+    catalog_store.bump("doctors")
 
     # 4. Email credentials
     send_email(
@@ -148,17 +135,12 @@ def get_doctor_by_credential_id(
 def get_doctors_by_hospital(db: Session, hospital_id: int):
     return db.query(Doctor).filter(Doctor.hospital_id == hospital_id).all()
 
-def get_all_doctors(db: Session):
-    return db.query(Doctor).all()
-
 def is_doctor_available(db: Session, doctor_id: int) -> dict:
     """Compute doctor availability from active assignments."""
     active = (
         db.query(PatientAssignment)
         .filter(PatientAssignment.doctor_id == doctor_id)
-        .filter(PatientAssignment.status.in_(["active"]))
-        .filter(PatientAssignment.case_status.in_(["open", "in_progress"]))
-        .filter(PatientAssignment.doctor_assignment_status.in_(["accepted"]))
+        .filter(*doctor_busy_conditions())
         .order_by(PatientAssignment.created_at.desc())
         .first()
     )
@@ -166,11 +148,9 @@ def is_doctor_available(db: Session, doctor_id: int) -> dict:
 
 def get_hospital_doctor_statuses(db: Session, hospital_id: int) -> list:
     doctors = get_doctors_by_hospital(db, hospital_id)
-    results = []
-    for doc in doctors:
-        s = is_doctor_available(db, doc.id)
-        results.append({"doctor_id": doc.id, **s})
-    return results
+    # One query for the whole hospital instead of one per doctor
+    busy = get_busy_doctors(db, hospital_id)
+    return [{"doctor_id": doc.id, **availability_status(busy, doc.id)} for doc in doctors]
 
 def request_password_change(db: Session, email: str, current_password: str, new_password: str):
     """Request password change for doctor user."""
@@ -234,19 +214,17 @@ def change_password_with_verification(db: Session, email: str, verification_code
     if not verify_verification_code(email, verification_code):
         raise HTTPException(status_code=400, detail="Invalid or expired verification code")
     
-    # Get the stored new password
-    if email not in verification_codes or 'new_password' not in verification_codes[email]:
+    # Get the stored new password (hashed when the request was made)
+    stored_data = verification_codes.get(email)
+    if not stored_data or 'new_password' not in stored_data:
         raise HTTPException(status_code=400, detail="Password change request not found or expired")
     
-    new_password = verification_codes[email]['new_password']
-    
     # Update password
-    credential.password = hash_password(new_password)
+    credential.password = stored_data['new_password']
     db.commit()
     db.refresh(credential)
     
     # Clean up stored data after successful password change
-    if email in verification_codes:
-        del verification_codes[email]
+    verification_codes.discard(email)
     
     return {"message": "Password changed successfully"}
\ No newline at end of file
@@ -0,0 +1,320 @@
+# app/services/geo.py
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.hospital import Hospital
+
+EARTH_RADIUS_KM = 6371.0
+
+# Columns copied into each index row (what the nearby endpoints return)
+HOSPITAL_ROW_COLUMNS = (
+    "id", "credential_id", "name", "address", "latitude", "longitude", "phone", "email",
+    "admin_name", "hospital_type", "emergency_available", "available_24_7",
+    "registration_number", "departments", "approved",
+)
+
+# Capability bits of HospitalGeoSnapshot.capabilities
+CAPABILITY_BITS = {
+    "emergency_available": 1 << 0,
+    "available_24_7": 1 << 1,
+    "approved": 1 << 2,
+    "government": 1 << 3,
+    "private": 1 << 4,
+}
+HOSPITAL_TYPES = ("government", "private")
+
+
+def normalize_department(name: str) -> str:
+    return " ".join(name.strip().lower().split())
+
+
+def parse_departments(departments: Optional[str]) -> List[str]:
+    """Hospital.departments is a comma-separated string."""
+    if not departments:
+        return []
+    return [d for d in (normalize_department(part) for part in departments.split(",")) if d]
+
+
+class HospitalFilter:
+    """
+    Attribute predicates for hospital searches; None means "don't care".
+    Evaluated as bitmask ANDs over the snapshot's bitsets.
+    """
+
+    __slots__ = ("departments", "emergency_available", "available_24_7", "approved", "hospital_type")
+
+    def __init__(
+        self,
+        departments: Optional[List[str]] = None,
+        emergency_available: Optional[bool] = None,
+        available_24_7: Optional[bool] = None,
+        approved: Optional[bool] = None,
+        hospital_type: Optional[str] = None,
+    ):
+        self.departments = [normalize_department(d) for d in departments or () if d and d.strip()]
+        self.emergency_available = emergency_available
+        self.available_24_7 = available_24_7
+        self.approved = approved
+        self.hospital_type = hospital_type.strip().lower() if hospital_type else None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional["HospitalFilter"]:
+        """From a socket payload, e.g. {"departments": ["cardiology"], "emergency_available": true}."""
+        if not data:
+            return None
+        departments = data.get("departments")
+        if isinstance(departments, str):
+            departments = parse_departments(departments)
+        return cls(
+            departments=departments,
+            emergency_available=data.get("emergency_available"),
+            available_24_7=data.get("available_24_7"),
+            approved=data.get("approved"),
+            hospital_type=data.get("hospital_type"),
+        )
+
+    def is_empty(self) -> bool:
+        return not self.departments and all(
+            value is None for value in
+            (self.emergency_available, self.available_24_7, self.approved, self.hospital_type)
+        )
+
+    def cache_key(self) -> Tuple:
+        return (
+            tuple(sorted(set(self.departments))), self.emergency_available,
+            self.available_24_7, self.approved, self.hospital_type,
+        )
+
+    def capability_masks(self) -> Tuple[int, int]:
+        """(bits that must be set, bits that must be clear)."""
+        required, forbidden = 0, 0
+        for name in ("emergency_available", "available_24_7", "approved"):
+            value = getattr(self, name)
+            if value is True:
+                required |= CAPABILITY_BITS[name]
+            elif value is False:
+                forbidden |= CAPABILITY_BITS[name]
+        if self.hospital_type is not None:
+            # An unknown type sets no bit, so requiring all type bits matches nothing
+            required |= CAPABILITY_BITS.get(self.hospital_type, CAPABILITY_BITS["government"] | CAPABILITY_BITS["private"])
+        return required, forbidden
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points, in kilometers."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_many(lat: float, lon: float, lat_rad: np.ndarray, lon_rad: np.ndarray,
+                      cos_lat: np.ndarray) -> np.ndarray:
+    """
+    Distances in km from one point (degrees) to many points given in radians,
+    with cos(lat) precomputed, in one vectorized pass.
+    """
+    phi = math.radians(lat)
+    sin_dphi = np.sin((lat_rad - phi) * 0.5)
+    sin_dlmb = np.sin((lon_rad - math.radians(lon)) * 0.5)
+    a = sin_dphi * sin_dphi + math.cos(phi) * cos_lat * sin_dlmb * sin_dlmb
+    np.clip(a, 0.0, 1.0, out=a)
+    return (2 * EARTH_RADIUS_KM) * np.arcsin(np.sqrt(a, out=a), out=a)
+
+
+def top_k(values: np.ndarray, k: int, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Indices of the k smallest values (among `candidates` indices, if given),
+    sorted ascending. argpartition keeps this O(n + k log k) instead of a full sort.
+    """
+    if candidates is None:
+        candidates = np.arange(values.shape[0])
+    n = candidates.shape[0]
+    if k <= 0 or n == 0:
+        return candidates[:0]
+    subset = values[candidates]
+    if k < n:
+        part = np.argpartition(subset, k - 1)[:k]
+        return candidates[part[np.argsort(subset[part], kind="stable")]]
+    return candidates[np.argsort(subset, kind="stable")]
+
+
+class HospitalGeoSnapshot:
+    """
+    Immutable view of hospital positions: contiguous float64 arrays in
+    radians (plus cos(lat)) aligned with `rows`, the per-hospital dicts
+    returned to callers. Queries read one snapshot, so a rebuild never
+    changes the arrays under them.
+
+    Attributes are indexed as bitsets: `capabilities` holds CAPABILITY_BITS
+    per hospital, and `department_bits` one bit per known department
+    (64 per uint64 word, department_index maps names to bit positions).
+    """
+
+    __slots__ = (
+        "rows", "ids", "credential_ids", "lat_rad", "lon_rad", "cos_lat", "version", "built_at",
+        "capabilities", "department_index", "department_bits",
+    )
+
+    def __init__(self, rows: List[Dict], version: int):
+        self.rows = rows
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ids = np.fromiter((r["id"] for r in rows), dtype=np.int64, count=len(rows))
+        self.credential_ids = np.fromiter(
+            (r["credential_id"] if r["credential_id"] is not None else -1 for r in rows),
+            dtype=np.int64, count=len(rows),
+        )
+        lat = np.fromiter((r["latitude"] for r in rows), dtype=np.float64, count=len(rows))
+        lon = np.fromiter((r["longitude"] for r in rows), dtype=np.float64, count=len(rows))
+        self.lat_rad = np.ascontiguousarray(np.radians(lat))
+        self.lon_rad = np.ascontiguousarray(np.radians(lon))
+        self.cos_lat = np.cos(self.lat_rad)
+        self._build_attribute_index()
+
+    def _build_attribute_index(self) -> None:
+        n = len(self.rows)
+        self.capabilities = np.zeros(n, dtype=np.uint32)
+        for name in ("emergency_available", "available_24_7", "approved"):
+            flags = np.fromiter((bool(r[name]) for r in self.rows), dtype=bool, count=n)
+            self.capabilities[flags] |= CAPABILITY_BITS[name]
+        for hospital_type in HOSPITAL_TYPES:
+            flags = np.fromiter(
+                ((r["hospital_type"] or "").strip().lower() == hospital_type for r in self.rows), dtype=bool, count=n
+            )
+            self.capabilities[flags] |= CAPABILITY_BITS[hospital_type]
+
+        parsed = [parse_departments(r["departments"]) for r in self.rows]
+        self.department_index: Dict[str, int] = {}
+        for departments in parsed:
+            for department in departments:
+                self.department_index.setdefault(department, len(self.department_index))
+        words = max(1, (len(self.department_index) + 63) // 64)
+        self.department_bits = np.zeros((n, words), dtype=np.uint64)
+        for i, departments in enumerate(parsed):
+            for department in departments:
+                bit = self.department_index[department]
+                self.department_bits[i, bit >> 6] |= np.uint64(1 << (bit & 63))
+
+    def filter_mask(self, hospital_filter: "HospitalFilter") -> np.ndarray:
+        """Boolean mask of the hospitals matching every predicate of the filter."""
+        required, forbidden = hospital_filter.capability_masks()
+        mask = (self.capabilities & required) == required
+        if forbidden:
+            mask &= (self.capabilities & forbidden) == 0
+        if hospital_filter.departments:
+            wanted = np.zeros(self.department_bits.shape[1], dtype=np.uint64)
+            for department in hospital_filter.departments:
+                bit = self.department_index.get(department)
+                if bit is None:
+                    # Nobody has it
+                    return np.zeros(len(self.rows), dtype=bool)
+                wanted[bit >> 6] |= np.uint64(1 << (bit & 63))
+            mask &= np.all((self.department_bits & wanted) == wanted, axis=1)
+        return mask
+
+    def candidates(self, credential_ids=None, hospital_filter: Optional["HospitalFilter"] = None,
+                   within: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Indices passing every restriction (None when unrestricted): a credential
+        id set, an attribute filter, and/or a precomputed mask such as a radius.
+        """
+        mask = within
+        if credential_ids is not None:
+            mask = self.credential_mask(credential_ids) if mask is None else mask & self.credential_mask(credential_ids)
+        if hospital_filter is not None and not hospital_filter.is_empty():
+            mask = self.filter_mask(hospital_filter) if mask is None else mask & self.filter_mask(hospital_filter)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def distances_km(self, lat: float, lon: float) -> np.ndarray:
+        return haversine_km_many(lat, lon, self.lat_rad, self.lon_rad, self.cos_lat)
+
+    def credential_mask(self, credential_ids) -> np.ndarray:
+        """Boolean mask of the hospitals whose credential id is in credential_ids."""
+        wanted = np.fromiter((int(c) for c in credential_ids), dtype=np.int64)
+        return np.isin(self.credential_ids, wanted)
+
+
+class HospitalGeoIndex:
+    """
+    Process-wide spatial index of hospitals with coordinates.
+
+    Built lazily from the database and rebuilt on the next query after
+    invalidate() (called when hospitals are created or updated) or after
+    refresh_seconds, which covers writes made by other workers.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Optional[HospitalGeoSnapshot] = None
+        self._stale = True
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def _is_fresh(self, snapshot: Optional[HospitalGeoSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and not self._stale
+            and time.monotonic() - snapshot.built_at < self.refresh_seconds
+        )
+
+    def snapshot(self, db: Session) -> HospitalGeoSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        with self._lock:
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+            self._stale = False
+            columns = [getattr(Hospital, name) for name in HOSPITAL_ROW_COLUMNS]
+            result = db.query(*columns).filter(
+                Hospital.latitude.isnot(None),
+                Hospital.longitude.isnot(None)
+            ).order_by(Hospital.id).all()
+            rows = [dict(zip(HOSPITAL_ROW_COLUMNS, row)) for row in result]
+            if self._snapshot is not None and rows == self._snapshot.rows:
+                # Nothing changed: keep the version so caches built on it stay valid
+                self._snapshot.built_at = time.monotonic()
+                return self._snapshot
+            self._version += 1
+            self._snapshot = HospitalGeoSnapshot(rows, self._version)
+            return self._snapshot
+
+    def nearest(self, db: Session, lat: float, lon: float, k: int = 1, credential_ids=None,
+                hospital_filter: Optional[HospitalFilter] = None) -> List[Tuple[Dict, float]]:
+        """
+        The k nearest hospitals as (row, distance_km), closest first, optionally
+        restricted to the given credential ids and/or attribute filter.
+        """
+        snapshot = self.snapshot(db)
+        if not len(snapshot):
+            return []
+        distances = snapshot.distances_km(lat, lon)
+        candidates = snapshot.candidates(credential_ids, hospital_filter)
+        return [(snapshot.rows[i], float(distances[i])) for i in top_k(distances, k, candidates)]
+
+    def within_radius(self, db: Session, lat: float, lon: float, radius_km: float, limit: Optional[int] = None,
+                      hospital_filter: Optional[HospitalFilter] = None) -> List[Tuple[Dict, float]]:
+        """Hospitals within radius_km as (row, distance_km), closest first."""
+        snapshot = self.snapshot(db)
+        if not len(snapshot):
+            return []
+        distances = snapshot.distances_km(lat, lon)
+        candidates = snapshot.candidates(hospital_filter=hospital_filter, within=distances <= radius_km)
+        k = candidates.shape[0] if limit is None else limit
+        return [(snapshot.rows[i], float(distances[i])) for i in top_k(distances, k, candidates)]
+
+hospital_geo_index = HospitalGeoIndex(refresh_seconds=settings.GEO_INDEX_REFRESH_SECONDS)
@@ -7,7 +7,16 @@ from app.core.security import hash_password
 from app.utils.jwt import create_access_token
 from app.core.security import verify_password
 from fastapi import status
-import math
+from app.services.geo import HospitalFilter, hospital_geo_index
+from app.services.nearby_cache import nearby_hospital_cache
+from app.services.catalog import catalog_store
+from typing import Optional
+
+# Fields of each hospital in the nearby endpoints (plus distance_km)
+NEARBY_HOSPITAL_FIELDS = (
+    "id", "name", "address", "latitude", "longitude", "phone", "email", "admin_name",
+    "hospital_type", "emergency_available", "available_24_7", "registration_number", "departments",
+)
 
 
 def create_hospital_with_credentials(db: Session, hospital_data: HospitalCreate) -> Hospital:
@@ -45,6 +54,8 @@ def create_hospital_with_credentials(db: Session, hospital_data: HospitalCreate)
     db.add(hospital)
     db.commit()
     db.refresh(hospital)
+    hospital_geo_index.invalidate()
+    catalog_store.bump("hospitals")
 
     return hospital
 
@@ -67,10 +78,6 @@ def hospital_login(email: str, password: str, db: Session) -> str:
     return token
 
 
-def get_all_hospitals(db: Session) -> list[Hospital]:
-    return db.query(Hospital).all()
-
-
 def get_hospital_by_id(db: Session, hospital_id: int) -> Hospital:
     hospital = db.query(Hospital).filter(Hospital.id == hospital_id).first()
     if not hospital:
@@ -88,73 +95,38 @@ def update_hospital(db: Session, hospital_id: int, updates: HospitalUpdate) -> H
 
     db.commit()
     db.refresh(hospital)
+    hospital_geo_index.invalidate()
+    catalog_store.bump("hospitals")
     return hospital
 
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+def get_hospitals_within_radius(
+    db: Session, user_lat: float, user_lon: float, radius_km: float, hospital_filter: Optional[HospitalFilter] = None
+) -> list[dict]:
     """
-    Calculate the distance between two points using the Haversine formula.
-    Returns distance in kilometers.
+    Get hospitals within a specified radius from given coordinates, optionally
+    matching an attribute filter (departments, emergency, 24/7, approved, type).
+    Returns list of hospitals with distance information, closest first.
     """
-    # Convert latitude and longitude from degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    
-    # Radius of earth in kilometers
-    r = 6371
-    
-    return c * r
-
-def get_hospitals_within_radius(db: Session, user_lat: float, user_lon: float, radius_km: float) -> list[dict]:
-    """
-    Get hospitals within a specified radius from given coordinates.
-    Returns list of hospitals with distance information.
-    """
-    hospitals = db.query(Hospital).filter(
-        Hospital.latitude.isnot(None),
-        Hospital.longitude.isnot(None)
-    ).all()
-    
     nearby_hospitals = []
-    
-    for hospital in hospitals:
-        distance = calculate_distance(user_lat, user_lon, hospital.latitude, hospital.longitude)
-        
-        if distance <= radius_km:
-            hospital_dict = {
-                "id": hospital.id,
-                "name": hospital.name,
-                "address": hospital.address,
-                "latitude": hospital.latitude,
-                "longitude": hospital.longitude,
-                "phone": hospital.phone,
-                "email": hospital.email,
-                "admin_name": hospital.admin_name,
-                "distance_km": round(distance, 2),
-                "hospital_type": hospital.hospital_type,
-                "emergency_available": hospital.emergency_available,
-                "available_24_7": hospital.available_24_7,
-                "registration_number": hospital.registration_number,
-                "departments": hospital.departments
-            }
-            nearby_hospitals.append(hospital_dict)
-    
-    # Sort by distance (closest first)
-    nearby_hospitals.sort(key=lambda x: x["distance_km"])
-    
+    for row, distance in nearby_hospital_cache.within_radius(
+        db, user_lat, user_lon, radius_km, hospital_filter=hospital_filter
+    ):
+        hospital_dict = {name: row[name] for name in NEARBY_HOSPITAL_FIELDS}
+        hospital_dict["distance_km"] = round(distance, 2)
+        nearby_hospitals.append(hospital_dict)
     return nearby_hospitals
 
-def get_hospitals_within_10km(db: Session, user_lat: float, user_lon: float) -> list[dict]:
+def get_hospitals_within_10km(
+    db: Session, user_lat: float, user_lon: float, hospital_filter: Optional[HospitalFilter] = None
+) -> list[dict]:
     """Get hospitals within 10km radius"""
-    return get_hospitals_within_radius(db, user_lat, user_lon, 10.0)
+    return get_hospitals_within_radius(db, user_lat, user_lon, 10.0, hospital_filter)
 
-def get_hospitals_within_20km(db: Session, user_lat: float, user_lon: float) -> list[dict]:
+def get_hospitals_within_20km(
+    db: Session, user_lat: float, user_lon: float, hospital_filter: Optional[HospitalFilter] = None
+) -> list[dict]:
     """Get hospitals within 20km radius"""
-    return get_hospitals_within_radius(db, user_lat, user_lon, 20.0)
+    return get_hospitals_within_radius(db, user_lat, user_lon, 20.0, hospital_filter)
 
 
@@ -0,0 +1,144 @@
+# app/services/inbox.py
+import json
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from app.core.config import settings
+
+
+class InboxBackend(ABC):
+    """
+    Storage interface for per-user offline messages.
+    Each message is a dict {event, payload, expires_at}.
+    Calls may block (Redis); async callers run them with asyncio.to_thread.
+    """
+
+    @abstractmethod
+    def push(self, user_id: str, message: Dict, max_messages: int, ttl_seconds: int) -> None:
+        ...
+
+    @abstractmethod
+    def drain(self, user_id: str) -> List[Dict]:
+        """Remove and return the user's messages, oldest first."""
+
+
+class InMemoryInboxBackend(InboxBackend):
+    """
+    Process-local backend. Each inbox is a bounded deque (oldest message is
+    dropped when full), and inboxes are kept in last-write order so expired
+    or excess inboxes are evicted from the front in amortized O(1).
+    Only suitable for single-worker deployments.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._inboxes: "OrderedDict[str, Deque[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._inboxes:
+            user_id, messages = next(iter(self._inboxes.items()))
+            # The newest message of the least recently written inbox has expired,
+            # or there are too many inboxes: drop the whole inbox
+            if messages and messages[-1]["expires_at"] > now and len(self._inboxes) <= self.max_users:
+                break
+            del self._inboxes[user_id]
+
+    def push(self, user_id: str, message: Dict, max_messages: int, ttl_seconds: int) -> None:
+        now = time.time()
+        with self._lock:
+            messages = self._inboxes.pop(user_id, None)
+            if messages is None or messages.maxlen != max_messages:
+                messages = deque(messages or (), maxlen=max_messages)
+            messages.append(message)
+            self._inboxes[user_id] = messages
+            self._evict(now)
+
+    def drain(self, user_id: str) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            messages = self._inboxes.pop(user_id, None)
+            self._evict(now)
+        return [m for m in messages or () if m["expires_at"] > now]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._inboxes)
+
+
+class RedisInboxBackend(InboxBackend):
+    """
+    Redis backend shared by all workers: one capped list per user that
+    expires ttl_seconds after its last write.
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"inbox:{user_id}"
+
+    def push(self, user_id: str, message: Dict, max_messages: int, ttl_seconds: int) -> None:
+        key = self._key(user_id)
+        pipe = self._client.pipeline()
+        pipe.rpush(key, json.dumps(message))
+        pipe.ltrim(key, -max_messages, -1)
+        pipe.expire(key, ttl_seconds)
+        pipe.execute()
+
+    def drain(self, user_id: str) -> List[Dict]:
+        key = self._key(user_id)
+        pipe = self._client.pipeline()
+        pipe.lrange(key, 0, -1)
+        pipe.delete(key)
+        raw_messages, _ = pipe.execute()
+        now = time.time()
+        messages = [json.loads(raw) for raw in raw_messages]
+        return [m for m in messages if m["expires_at"] > now]
+
+
+def _build_default_backend() -> InboxBackend:
+    if settings.REDIS_URL:
+        return RedisInboxBackend(settings.REDIS_URL)
+    return InMemoryInboxBackend(max_users=settings.INBOX_MAX_USERS)
+
+
+class OfflineInbox:
+    """
+    Events for users who are not connected, delivered in order when they
+    next connect. Bounded per user (oldest dropped) and by age.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[InboxBackend] = None,
+        max_messages_per_user: Optional[int] = None,
+        ttl_seconds: Optional[int] = None
+    ):
+        self.backend = backend if backend is not None else _build_default_backend()
+        self.max_messages_per_user = max_messages_per_user or settings.INBOX_MAX_MESSAGES_PER_USER
+        self.ttl_seconds = ttl_seconds or settings.INBOX_TTL_SECONDS
+
+    def store(self, user_id, event: str, payload: Dict) -> None:
+        message = {
+            "event": event,
+            "payload": payload,
+            "expires_at": time.time() + self.ttl_seconds,
+        }
+        self.backend.push(str(user_id), message, self.max_messages_per_user, self.ttl_seconds)
+
+    def drain(self, user_id) -> List[Dict]:
+        """Remove and return the user's pending {event, payload} messages, oldest first."""
+        return [
+            {"event": m["event"], "payload": m["payload"]}
+            for m in self.backend.drain(str(user_id))
+        ]
+
+
+offline_inbox = OfflineInbox()
@@ -0,0 +1,191 @@
+# app/services/location.py
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.geo import haversine_km
+
+
+def bearing_degrees(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Initial bearing from point 1 to point 2, 0-360 clockwise from north."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dlmb = math.radians(lon2 - lon1)
+    y = math.sin(dlmb) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlmb)
+    return (math.degrees(math.atan2(y, x)) + 360.0) % 360.0
+
+
+class LocationTrack:
+    """
+    Fixed-size ring buffer of recent fixes for one device, stored as parallel
+    float64 arrays (latitude, longitude, monotonic time, wall-clock time), so
+    a device costs the same memory however often it reports.
+    """
+
+    __slots__ = ("_lat", "_lon", "_mono", "_wall", "_next", "_count", "capacity")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        zeros = bytes(8 * capacity)
+        self._lat = array("d", zeros)
+        self._lon = array("d", zeros)
+        self._mono = array("d", zeros)
+        self._wall = array("d", zeros)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, latitude: float, longitude: float, monotonic_ts: float, wall_ts: float) -> None:
+        i = self._next
+        self._lat[i] = latitude
+        self._lon[i] = longitude
+        self._mono[i] = monotonic_ts
+        self._wall[i] = wall_ts
+        self._next = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _index(self, age: int) -> int:
+        """Buffer index of the fix `age` steps back (0 = newest)."""
+        return (self._next - 1 - age) % self.capacity
+
+    def fix(self, age: int = 0) -> Tuple[float, float, float, float]:
+        """(latitude, longitude, monotonic_ts, wall_ts) of the fix `age` steps back."""
+        if age >= self._count:
+            raise IndexError(age)
+        i = self._index(age)
+        return self._lat[i], self._lon[i], self._mono[i], self._wall[i]
+
+    def last_update(self) -> float:
+        return self._mono[self._index(0)] if self._count else 0.0
+
+    def fixes(self, limit: Optional[int] = None) -> List[Tuple[float, float, float, float]]:
+        """Recent fixes, oldest first."""
+        n = self._count if limit is None else min(limit, self._count)
+        return [self.fix(age) for age in range(n - 1, -1, -1)]
+
+
+def _fix_to_dict(fix: Tuple[float, float, float, float]) -> Dict:
+    latitude, longitude, _, wall_ts = fix
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "timestamp": datetime.fromtimestamp(wall_ts, tz=timezone.utc).isoformat(),
+    }
+
+
+class LocationStore:
+    """
+    Live positions of patients and ambulances, keyed by (kind, device_id).
+
+    Tracks are kept in last-update order; tracks idle for longer than
+    idle_ttl_seconds are evicted from the front on each update, so the store
+    only holds devices that are actually reporting.
+    """
+
+    def __init__(self, history_size: int, idle_ttl_seconds: float):
+        self.history_size = history_size
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._tracks: "OrderedDict[Tuple[str, str], LocationTrack]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_idle(self, now: float) -> None:
+        cutoff = now - self.idle_ttl_seconds
+        while self._tracks:
+            key, track = next(iter(self._tracks.items()))
+            if track.last_update() >= cutoff:
+                break
+            del self._tracks[key]
+
+    def update(self, kind: str, device_id, latitude: float, longitude: float) -> None:
+        now = time.monotonic()
+        key = (kind, str(device_id))
+        with self._lock:
+            track = self._tracks.pop(key, None)
+            if track is None:
+                track = LocationTrack(self.history_size)
+            track.append(float(latitude), float(longitude), now, time.time())
+            self._tracks[key] = track
+            self._evict_idle(now)
+
+    def is_redundant(self, kind: str, device_id, latitude: float, longitude: float,
+                     min_distance_m: float, min_interval_seconds: float) -> bool:
+        """
+        Whether a fix adds nothing over the previous one: it is within
+        min_distance_m of it AND less than min_interval_seconds after it.
+        A stationary device is therefore still recorded once per interval.
+        """
+        with self._lock:
+            track = self._tracks.get((kind, str(device_id)))
+            if not track:
+                return False
+            last_lat, last_lon, last_mono, _ = track.fix(0)
+        return (
+            time.monotonic() - last_mono < min_interval_seconds
+            and haversine_km(last_lat, last_lon, float(latitude), float(longitude)) * 1000 < min_distance_m
+        )
+
+    def latest(self, kind: str, device_id) -> Optional[Dict]:
+        """Last known position: {latitude, longitude, timestamp, age_seconds}."""
+        with self._lock:
+            track = self._tracks.get((kind, str(device_id)))
+            if not track:
+                return None
+            fix = track.fix(0)
+        return {**_fix_to_dict(fix), "age_seconds": round(time.monotonic() - fix[2], 3)}
+
+    def history(self, kind: str, device_id, limit: Optional[int] = None) -> List[Dict]:
+        """Recent positions, oldest first."""
+        with self._lock:
+            track = self._tracks.get((kind, str(device_id)))
+            fixes = track.fixes(limit) if track else []
+        return [_fix_to_dict(fix) for fix in fixes]
+
+    def motion(self, kind: str, device_id, window_seconds: float = 60.0) -> Optional[Dict]:
+        """
+        Speed and heading over the fixes of the last window_seconds (at least
+        the last two fixes). None until the device has reported twice.
+        """
+        with self._lock:
+            track = self._tracks.get((kind, str(device_id)))
+            if not track or len(track) < 2:
+                return None
+            newest = track.fix(0)
+            oldest = track.fix(1)
+            for age in range(2, len(track)):
+                candidate = track.fix(age)
+                if newest[2] - candidate[2] > window_seconds:
+                    break
+                oldest = candidate
+
+        elapsed = newest[2] - oldest[2]
+        distance_m = haversine_km(oldest[0], oldest[1], newest[0], newest[1]) * 1000
+        speed_mps = distance_m / elapsed if elapsed > 0 else 0.0
+        return {
+            "speed_mps": round(speed_mps, 3),
+            "speed_kmh": round(speed_mps * 3.6, 3),
+            # Heading is meaningless when the device hasn't moved
+            "heading_degrees": round(bearing_degrees(oldest[0], oldest[1], newest[0], newest[1]), 1) if distance_m > 0 else None,
+            "window_seconds": round(elapsed, 3),
+        }
+
+    def remove(self, kind: str, device_id) -> None:
+        with self._lock:
+            self._tracks.pop((kind, str(device_id)), None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tracks)
+
+
+location_store = LocationStore(
+    history_size=settings.LOCATION_HISTORY_SIZE,
+    idle_ttl_seconds=settings.LOCATION_IDLE_TTL_SECONDS,
+)
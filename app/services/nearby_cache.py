@@ -0,0 +1,164 @@
+# app/services/nearby_cache.py
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.geo import HospitalFilter, HospitalGeoIndex, haversine_km, haversine_km_many, hospital_geo_index
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_DECODE = {c: i for i, c in enumerate(_GEOHASH_ALPHABET)}
+
+
+def geohash_encode(lat: float, lon: float, precision: int) -> str:
+    """Standard base32 geohash of a point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        rng, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lon_min, lon_max) of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _GEOHASH_DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+class NearbyHospitalCache:
+    """
+    Cache for the public nearby-hospital searches, keyed by the geohash cell
+    of the caller's position, the radius and the attribute filter.
+
+    An entry holds the candidates for the whole cell: every matching hospital
+    within radius + (cell center to farthest corner) of the cell center, a
+    superset of the answer for any point in the cell. Each caller then only
+    refines exact distances over those candidates. Entries belong to one
+    index snapshot version and are dropped when hospitals change.
+    """
+
+    def __init__(
+        self,
+        index: HospitalGeoIndex,
+        max_entries: int,
+        precision_by_radius: Dict[float, int],
+        default_precision: int,
+    ):
+        self.index = index
+        self.max_entries = max_entries
+        self.precision_by_radius = precision_by_radius
+        self.default_precision = default_precision
+        self._entries: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def precision_for(self, radius_km: float) -> int:
+        return self.precision_by_radius.get(float(radius_km), self.default_precision)
+
+    def _cell_candidates(self, snapshot, geohash: str, radius_km: float,
+                         hospital_filter: Optional[HospitalFilter]) -> np.ndarray:
+        lat_min, lat_max, lon_min, lon_max = geohash_bounds(geohash)
+        center_lat, center_lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+        margin_km = max(
+            haversine_km(center_lat, center_lon, corner_lat, corner_lon)
+            for corner_lat in (lat_min, lat_max) for corner_lon in (lon_min, lon_max)
+        )
+        distances = snapshot.distances_km(center_lat, center_lon)
+        return snapshot.candidates(hospital_filter=hospital_filter, within=distances <= radius_km + margin_km)
+
+    def within_radius(self, db: Session, lat: float, lon: float, radius_km: float,
+                      hospital_filter: Optional[HospitalFilter] = None) -> List[Tuple[Dict, float]]:
+        """Same result as HospitalGeoIndex.within_radius: (row, distance_km), closest first."""
+        snapshot = self.index.snapshot(db)
+        geohash = geohash_encode(lat, lon, self.precision_for(radius_km))
+        key = (geohash, float(radius_km), hospital_filter.cache_key() if hospital_filter else None)
+
+        with self._lock:
+            if self._version != snapshot.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = snapshot.version
+            candidates = self._entries.get(key)
+            if candidates is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if candidates is None:
+            candidates = self._cell_candidates(snapshot, geohash, radius_km, hospital_filter)
+            with self._lock:
+                if self._version == snapshot.version:
+                    self._entries[key] = candidates
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+
+        if not candidates.shape[0]:
+            return []
+        distances = haversine_km_many(
+            lat, lon, snapshot.lat_rad[candidates], snapshot.lon_rad[candidates], snapshot.cos_lat[candidates]
+        )
+        inside = np.flatnonzero(distances <= radius_km)
+        order = inside[np.argsort(distances[inside], kind="stable")]
+        return [(snapshot.rows[candidates[i]], float(distances[i])) for i in order]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "snapshot_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "precision_by_radius": self.precision_by_radius,
+                "default_precision": self.default_precision,
+            }
+
+
+nearby_hospital_cache = NearbyHospitalCache(
+    hospital_geo_index,
+    max_entries=settings.NEARBY_CACHE_MAX_ENTRIES,
+    precision_by_radius=settings.NEARBY_CACHE_PRECISION_BY_RADIUS,
+    default_precision=settings.NEARBY_CACHE_DEFAULT_PRECISION,
+)
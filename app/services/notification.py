@@ -0,0 +1,124 @@
+# app/services/notification.py
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+import socketio
+
+logger = logging.getLogger(__name__)
+
+
+def user_room(user_id) -> str:
+    """Socket.IO room every connection of a user joins on connect."""
+    return f"user:{user_id}"
+
+
+class AckBatcher:
+    """
+    Folds per-message acknowledgements into one event per socket per
+    interval. Each socket's pending ack is a dict of counters plus the
+    latest fields passed to add(); flush() emits and resets them.
+    """
+
+    def __init__(self, sio: socketio.AsyncServer, event: str, interval_seconds: float):
+        self.sio = sio
+        self.event = event
+        self.interval_seconds = interval_seconds
+        # sid -> pending ack
+        self._pending: Dict[str, Dict] = {}
+
+    def add(self, sid: str, outcome: str, **latest) -> None:
+        """Count one message with the given outcome (e.g. "accepted", "deduplicated")."""
+        ack = self._pending.setdefault(sid, {"count": 0})
+        ack["count"] += 1
+        ack[outcome] = ack.get(outcome, 0) + 1
+        ack.update(latest)
+
+    def discard(self, sid: str) -> None:
+        self._pending.pop(sid, None)
+
+    async def flush(self) -> int:
+        pending, self._pending = self._pending, {}
+        if pending:
+            await asyncio.gather(
+                *(self.sio.emit(self.event, ack, to=sid) for sid, ack in pending.items()),
+                return_exceptions=True,
+            )
+        return len(pending)
+
+    async def run(self) -> None:
+        """Background ticker: one batched ack per socket per interval."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Error flushing batched %s acks: %s", self.event, e)
+
+
+class NotificationDispatcher:
+    """
+    Sends a set of socket notifications concurrently and reports, per target,
+    whether it was delivered.
+
+    A target is a dict: {event, payload, user_id?, sid?, role?}
+    - user_id: emitted to the user's room; skipped (not awaited) when the user
+      is not connected, or is connected with a different role than `role`
+    - sid: emitted to that socket directly (e.g. the requester's ack)
+    """
+
+    def __init__(self, sio: socketio.AsyncServer, connected_users: Dict[str, Dict]):
+        self.sio = sio
+        self.connected_users = connected_users
+
+    async def _emit(self, event: str, payload: Dict, room: str) -> Optional[str]:
+        try:
+            await self.sio.emit(event, payload, room=room)
+            return None
+        except Exception as e:
+            return str(e)
+
+    async def notify(self, targets: List[Dict]) -> List[Dict]:
+        """
+        Deliver all targets in one fan-out. Results are returned in target
+        order: {event, user_id, sid, delivered, error, latency_ms}.
+        """
+        results = []
+        pending = []
+        for target in targets:
+            user_id = target.get("user_id")
+            result = {
+                "event": target["event"],
+                "user_id": str(user_id) if user_id is not None else None,
+                "sid": target.get("sid"),
+                "delivered": False,
+                "error": None,
+                "latency_ms": None,
+            }
+            results.append(result)
+
+            if result["sid"]:
+                room = result["sid"]
+            elif user_id is not None:
+                user = self.connected_users.get(result["user_id"])
+                if not user:
+                    result["error"] = "not_connected"
+                    continue
+                if target.get("role") and user.get("role") != target["role"]:
+                    result["error"] = "role_mismatch"
+                    continue
+                room = user_room(result["user_id"])
+            else:
+                result["error"] = "no_target"
+                continue
+            pending.append((result, self._emit(target["event"], target["payload"], room)))
+
+        started = time.perf_counter()
+        errors = await asyncio.gather(*(emit for _, emit in pending))
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        for (result, _), error in zip(pending, errors):
+            result["delivered"] = error is None
+            result["error"] = error
+            result["latency_ms"] = latency_ms
+        return results
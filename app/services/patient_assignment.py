@@ -1,5 +1,9 @@
 # app/services/patient_assignment.py
-from sqlalchemy.orm import Session
+import base64
+import json
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, joinedload, contains_eager
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
@@ -14,28 +18,79 @@ from app.db.models.socket_log import SocketLog
 from app.schemas.patient_assignment import PatientAssignmentCreate, PatientAssignmentUpdate
 
 
-def create_patient_assignment(db: Session, assignment_data: PatientAssignmentCreate) -> PatientAssignment:
+def _assignment_query(db: Session):
     """
-    Create a new patient assignment
+    Base query for assignments returned as PatientAssignmentOut. The patient is
+    joined in up front because patient_name/age/gender read it for every row.
     """
-    # Validate assignment type
-    if assignment_data.assignment_type not in ["doctor", "ambulance", "both"]:
+    return db.query(PatientAssignment).options(joinedload(PatientAssignment.patient))
+
+
+def encode_assignment_cursor(assignment: PatientAssignment) -> str:
+    """
+    Opaque cursor pointing just after this assignment in (created_at, id) order.
+    """
+    payload = {"created_at": assignment.created_at.isoformat(), "id": assignment.id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_assignment_cursor(cursor: str) -> tuple:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid assignment type. Must be 'doctor', 'ambulance', or 'both'"
+            detail="Invalid cursor"
         )
+
+
+def _paginate(query, limit: int, offset: int, cursor: Optional[str]) -> List[PatientAssignment]:
+    """
+    Newest first, with id as tie-breaker so pages are stable. When a cursor
+    is given it replaces the offset (keyset pagination on the indexed
+    created_at column).
+    """
+    if cursor:
+        created_at, assignment_id = decode_assignment_cursor(cursor)
+        query = query.filter(
+            or_(
+                PatientAssignment.created_at < created_at,
+                and_(PatientAssignment.created_at == created_at, PatientAssignment.id < assignment_id)
+            )
+        )
+        offset = 0
+    query = query.order_by(PatientAssignment.created_at.desc(), PatientAssignment.id.desc())
+    return query.offset(offset).limit(limit).all()
+
+
+def assignment_field_error(assignment_data: PatientAssignmentCreate) -> Optional[str]:
+    """
+    Validation message for an invalid assignment type or a missing doctor /
+    ambulance ID, or None when the fields are consistent.
+    """
+    if assignment_data.assignment_type not in ["doctor", "ambulance", "both"]:
+        return "Invalid assignment type. Must be 'doctor', 'ambulance', or 'both'"
     
-    # Validate that required IDs are provided based on assignment type
     if assignment_data.assignment_type in ["doctor", "both"] and not assignment_data.doctor_id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Doctor ID is required for doctor assignments"
-        )
+        return "Doctor ID is required for doctor assignments"
     
     if assignment_data.assignment_type in ["ambulance", "both"] and not assignment_data.ambulance_id:
+        return "Ambulance ID is required for ambulance assignments"
+    
+    return None
+
+
+def create_patient_assignment(db: Session, assignment_data: PatientAssignmentCreate) -> PatientAssignment:
+    """
+    Create a new patient assignment
+    """
+    # Validate assignment type and the IDs it requires
+    field_error = assignment_field_error(assignment_data)
+    if field_error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Ambulance ID is required for ambulance assignments"
+            detail=field_error
         )
 
     # Ensure patient_id refers to an existing Patient row; if a credential_id was provided by mistake,
@@ -67,11 +122,109 @@ def create_patient_assignment(db: Session, assignment_data: PatientAssignmentCre
     return db_assignment
 
 
+def create_patient_assignments_batch(
+    db: Session,
+    hospital_id: int,
+    assignments: List[PatientAssignmentCreate]
+) -> List[Dict[str, Any]]:
+    """
+    Create many assignments for one hospital at once.
+    Referenced patients, SOS requests, doctors and ambulances are loaded with
+    one IN query each, and all valid items are inserted in one transaction.
+    Returns one result per item, in request order: {index, success,
+    assignment, error, doctor_credential_id, ambulance_credential_id}.
+    """
+    patient_ids = {a.patient_id for a in assignments}
+    sos_ids = {a.sos_request_id for a in assignments if a.sos_request_id is not None}
+    doctor_ids = {a.doctor_id for a in assignments if a.doctor_id}
+    ambulance_ids = {a.ambulance_id for a in assignments if a.ambulance_id}
+    
+    # patient_id may be a Patient.id or, by mistake, a credential_id (see create_patient_assignment)
+    patients = db.query(Patient).filter(
+        or_(Patient.id.in_(patient_ids), Patient.credential_id.in_(patient_ids))
+    ).all() if patient_ids else []
+    patients_by_id = {p.id: p for p in patients}
+    patients_by_credential = {p.credential_id: p for p in patients}
+    
+    known_sos_ids = {
+        row[0] for row in db.query(SocketLog.id).filter(SocketLog.id.in_(sos_ids)).all()
+    } if sos_ids else set()
+    doctors = {
+        d.id: d for d in db.query(Doctor).filter(Doctor.id.in_(doctor_ids)).all()
+    } if doctor_ids else {}
+    ambulances = {
+        a.id: a for a in db.query(Ambulance).filter(Ambulance.id.in_(ambulance_ids)).all()
+    } if ambulance_ids else {}
+    
+    results = []
+    for index, item in enumerate(assignments):
+        result = {
+            "index": index,
+            "success": False,
+            "assignment": None,
+            "error": None,
+            "doctor_credential_id": None,
+            "ambulance_credential_id": None,
+        }
+        results.append(result)
+        
+        error = assignment_field_error(item)
+        patient = patients_by_id.get(item.patient_id) or patients_by_credential.get(item.patient_id)
+        doctor = doctors.get(item.doctor_id) if item.doctor_id else None
+        ambulance = ambulances.get(item.ambulance_id) if item.ambulance_id else None
+        
+        if not error and item.hospital_id != hospital_id:
+            error = "Can only assign patients to your own hospital"
+        if not error and not patient:
+            error = "Patient not found. Provide a valid patient_id or a patient credential_id."
+        if not error and item.doctor_id and (not doctor or doctor.hospital_id != hospital_id):
+            error = "Doctor not found in this hospital"
+        if not error and item.ambulance_id and (not ambulance or ambulance.hospital_id != hospital_id):
+            error = "Ambulance not found in this hospital"
+        if error:
+            result["error"] = error
+            continue
+        
+        data = item.dict()
+        data["patient_id"] = patient.id
+        # Unknown SOS ids are dropped to avoid FK violations, as in create_patient_assignment
+        if data["sos_request_id"] not in known_sos_ids:
+            data["sos_request_id"] = None
+        
+        result["assignment"] = PatientAssignment(**data)
+        result["doctor_credential_id"] = doctor.credential_id if doctor else None
+        result["ambulance_credential_id"] = ambulance.credential_id if ambulance else None
+    
+    created = [r["assignment"] for r in results if r["assignment"] is not None]
+    if created:
+        try:
+            db.add_all(created)
+            db.flush()
+            created_ids = [a.id for a in created]
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        # One SELECT for the server-side defaults (timestamps) and patients
+        refreshed = {
+            a.id: a for a in _assignment_query(db)
+            .filter(PatientAssignment.id.in_(created_ids))
+            .all()
+        }
+        created_iter = iter(created_ids)
+        for result in results:
+            if result["assignment"] is not None:
+                result["assignment"] = refreshed[next(created_iter)]
+                result["success"] = True
+    
+    return results
+
+
 def get_patient_assignment_by_id(db: Session, assignment_id: int) -> Optional[PatientAssignment]:
     """
     Get patient assignment by ID
     """
-    return db.query(PatientAssignment).filter(PatientAssignment.id == assignment_id).first()
+    return _assignment_query(db).filter(PatientAssignment.id == assignment_id).first()
 
 
 def get_patient_assignments(
@@ -79,17 +232,31 @@ def get_patient_assignments(
     patient_id: int, 
     status: Optional[str] = None, 
     limit: int = 100, 
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    hospital_id: Optional[int] = None,
+    doctor_id: Optional[int] = None,
+    ambulance_id: Optional[int] = None
 ) -> List[PatientAssignment]:
     """
-    Get all assignments for a specific patient
+    Get all assignments for a specific patient, optionally restricted to a
+    hospital, doctor or ambulance
     """
-    query = db.query(PatientAssignment).filter(PatientAssignment.patient_id == patient_id)
+    query = _assignment_query(db).filter(PatientAssignment.patient_id == patient_id)
     
     if status:
         query = query.filter(PatientAssignment.status == status)
     
-    return query.offset(offset).limit(limit).all()
+    if hospital_id is not None:
+        query = query.filter(PatientAssignment.hospital_id == hospital_id)
+    
+    if doctor_id is not None:
+        query = query.filter(PatientAssignment.doctor_id == doctor_id)
+    
+    if ambulance_id is not None:
+        query = query.filter(PatientAssignment.ambulance_id == ambulance_id)
+    
+    return _paginate(query, limit, offset, cursor)
 
 
 def get_doctor_assignments(
@@ -97,17 +264,18 @@ def get_doctor_assignments(
     doctor_id: int, 
     status: Optional[str] = None, 
     limit: int = 100, 
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ) -> List[PatientAssignment]:
     """
     Get all assignments for a specific doctor
     """
-    query = db.query(PatientAssignment).filter(PatientAssignment.doctor_id == doctor_id)
+    query = _assignment_query(db).filter(PatientAssignment.doctor_id == doctor_id)
     
     if status:
         query = query.filter(PatientAssignment.status == status)
     
-    return query.offset(offset).limit(limit).all()
+    return _paginate(query, limit, offset, cursor)
 
 
 def get_ambulance_assignments(
@@ -115,17 +283,18 @@ def get_ambulance_assignments(
     ambulance_id: int, 
     status: Optional[str] = None, 
     limit: int = 100, 
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ) -> List[PatientAssignment]:
     """
     Get all assignments for a specific ambulance
     """
-    query = db.query(PatientAssignment).filter(PatientAssignment.ambulance_id == ambulance_id)
+    query = _assignment_query(db).filter(PatientAssignment.ambulance_id == ambulance_id)
     
     if status:
         query = query.filter(PatientAssignment.status == status)
     
-    return query.offset(offset).limit(limit).all()
+    return _paginate(query, limit, offset, cursor)
 
 
 def get_hospital_assignments(
@@ -133,34 +302,36 @@ def get_hospital_assignments(
     hospital_id: int, 
     status: Optional[str] = None, 
     limit: int = 100, 
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ) -> List[PatientAssignment]:
     """
     Get all assignments for a specific hospital
     """
-    query = db.query(PatientAssignment).filter(PatientAssignment.hospital_id == hospital_id)
+    query = _assignment_query(db).filter(PatientAssignment.hospital_id == hospital_id)
     
     if status:
         query = query.filter(PatientAssignment.status == status)
     
-    return query.offset(offset).limit(limit).all()
+    return _paginate(query, limit, offset, cursor)
 
 
 def get_active_assignments(
     db: Session, 
     hospital_id: Optional[int] = None, 
     limit: int = 100, 
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ) -> List[PatientAssignment]:
     """
     Get all active assignments
     """
-    query = db.query(PatientAssignment).filter(PatientAssignment.status == "active")
+    query = _assignment_query(db).filter(PatientAssignment.status == "active")
     
     if hospital_id:
         query = query.filter(PatientAssignment.hospital_id == hospital_id)
     
-    return query.offset(offset).limit(limit).all()
+    return _paginate(query, limit, offset, cursor)
 
 
 def update_assignment_status(
@@ -230,31 +401,26 @@ def get_assignment_with_context(db: Session, assignment_id: int) -> Dict[str, An
     """
     Get assignment with additional context information
     """
-    assignment = get_patient_assignment_by_id(db, assignment_id)
-    if not assignment:
+    # Everything the context needs in one joined query
+    row = (
+        db.query(PatientAssignment, Doctor, Ambulance, Hospital, MedicalRecord)
+        .outerjoin(PatientAssignment.patient)
+        .options(contains_eager(PatientAssignment.patient))
+        .outerjoin(Doctor, Doctor.id == PatientAssignment.doctor_id)
+        .outerjoin(Ambulance, Ambulance.id == PatientAssignment.ambulance_id)
+        .outerjoin(Hospital, Hospital.id == PatientAssignment.hospital_id)
+        .outerjoin(MedicalRecord, MedicalRecord.patient_id == PatientAssignment.patient_id)
+        .filter(PatientAssignment.id == assignment_id)
+        .first()
+    )
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Assignment not found"
         )
     
-    # Get patient information
-    patient = db.query(Patient).filter(Patient.id == assignment.patient_id).first()
-    
-    # Get doctor information
-    doctor = None
-    if assignment.doctor_id:
-        doctor = db.query(Doctor).filter(Doctor.id == assignment.doctor_id).first()
-    
-    # Get ambulance information
-    ambulance = None
-    if assignment.ambulance_id:
-        ambulance = db.query(Ambulance).filter(Ambulance.id == assignment.ambulance_id).first()
-    
-    # Get hospital information
-    hospital = db.query(Hospital).filter(Hospital.id == assignment.hospital_id).first()
-    
-    # Get medical record
-    medical_record = db.query(MedicalRecord).filter(MedicalRecord.patient_id == assignment.patient_id).first()
+    assignment, doctor, ambulance, hospital, medical_record = row
+    patient = assignment.patient
     
     # Build context
     context = {
@@ -281,61 +447,117 @@ def get_assignment_with_context(db: Session, assignment_id: int) -> Dict[str, An
         "medical_record": {
             "blood_group": medical_record.blood_group if medical_record else None,
             "allergies": medical_record.allergies if medical_record else None,
-            "chronic_conditions": medical_record.chronic_conditions if medical_record else None,
+            "chronic_conditions": medical_record.ongoing_illnesses if medical_record else None,
         } if medical_record else None,
     }
     
     return context
 
 
+STATISTICS_BUCKETS = ("hour", "day")
+
+
+def _created_at_bucket(db: Session, bucket: str):
+    """
+    SQL expression truncating created_at to the start of its hour/day.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(bucket, PatientAssignment.created_at)
+    # SQLite (local scripts/tests)
+    fmt = "%Y-%m-%d %H:00:00" if bucket == "hour" else "%Y-%m-%d 00:00:00"
+    return func.strftime(fmt, PatientAssignment.created_at)
+
+
 def get_assignment_statistics(
     db: Session, 
     hospital_id: Optional[int] = None, 
     start_date: Optional[datetime] = None, 
-    end_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None,
+    bucket: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    Get assignment statistics
+    Get assignment statistics.
+    All breakdowns come from one GROUP BY query, so only the (status, type,
+    priority) combinations are loaded, never the assignments themselves.
+    With bucket ("hour" or "day") a per-bucket series is added for charts.
     """
-    query = db.query(PatientAssignment)
+    if bucket is not None and bucket not in STATISTICS_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid bucket. Must be 'hour' or 'day'"
+        )
     
+    filters = []
     if hospital_id:
-        query = query.filter(PatientAssignment.hospital_id == hospital_id)
-    
+        filters.append(PatientAssignment.hospital_id == hospital_id)
     if start_date:
-        query = query.filter(PatientAssignment.created_at >= start_date)
-    
+        filters.append(PatientAssignment.created_at >= start_date)
     if end_date:
-        query = query.filter(PatientAssignment.created_at <= end_date)
-    
-    assignments = query.all()
-    
-    # Calculate statistics
-    total = len(assignments)
-    active = len([a for a in assignments if a.status == "active"])
-    completed = len([a for a in assignments if a.status == "completed"])
-    pending = len([a for a in assignments if a.status == "pending"])
-    
-    doctor_assignments = len([a for a in assignments if a.assignment_type == "doctor"])
-    ambulance_assignments = len([a for a in assignments if a.assignment_type == "ambulance"])
-    both_assignments = len([a for a in assignments if a.assignment_type == "both"])
+        filters.append(PatientAssignment.created_at <= end_date)
+    
+    rows = (
+        db.query(
+            PatientAssignment.status,
+            PatientAssignment.assignment_type,
+            PatientAssignment.priority_level,
+            func.count(PatientAssignment.id)
+        )
+        .filter(*filters)
+        .group_by(
+            PatientAssignment.status,
+            PatientAssignment.assignment_type,
+            PatientAssignment.priority_level
+        )
+        .all()
+    )
     
-    # Status breakdown
+    total = 0
     status_counts = {}
+    type_counts = {}
     priority_counts = {}
+    for assignment_status, assignment_type, priority_level, count in rows:
+        total += count
+        status_counts[assignment_status] = status_counts.get(assignment_status, 0) + count
+        type_counts[assignment_type] = type_counts.get(assignment_type, 0) + count
+        priority_counts[priority_level] = priority_counts.get(priority_level, 0) + count
     
-    for assignment in assignments:
-        status_counts[assignment.status] = status_counts.get(assignment.status, 0) + 1
-        priority_counts[assignment.priority_level] = priority_counts.get(assignment.priority_level, 0) + 1
-    
-    return {
+    result = {
         "total_assignments": total,
-        "active_assignments": active,
-        "completed_assignments": completed,
-        "pending_assignments": pending,
-        "doctor_assignments": doctor_assignments,
-        "ambulance_assignments": ambulance_assignments,
-        "both_assignments": both_assignments,
+        "active_assignments": status_counts.get("active", 0),
+        "completed_assignments": status_counts.get("completed", 0),
+        "pending_assignments": status_counts.get("pending", 0),
+        "doctor_assignments": type_counts.get("doctor", 0),
+        "ambulance_assignments": type_counts.get("ambulance", 0),
+        "both_assignments": type_counts.get("both", 0),
         "assignments_by_status": status_counts,
         "assignments_by_priority": priority_counts,
     }
+    
+    if bucket:
+        result["bucket"] = bucket
+        result["series"] = get_assignment_statistics_series(db, filters, bucket)
+    
+    return result
+
+
+def get_assignment_statistics_series(db: Session, filters: list, bucket: str) -> List[Dict[str, Any]]:
+    """
+    Assignment counts per time bucket and status, oldest bucket first.
+    """
+    bucket_start = _created_at_bucket(db, bucket).label("bucket_start")
+    rows = (
+        db.query(bucket_start, PatientAssignment.status, func.count(PatientAssignment.id))
+        .filter(PatientAssignment.created_at.isnot(None), *filters)
+        .group_by(bucket_start, PatientAssignment.status)
+        .order_by(bucket_start)
+        .all()
+    )
+    
+    series = {}
+    for start, assignment_status, count in rows:
+        if isinstance(start, str):
+            start = datetime.fromisoformat(start)
+        point = series.setdefault(start, {"bucket_start": start, "total": 0, "by_status": {}})
+        point["total"] += count
+        point["by_status"][assignment_status] = count
+    return list(series.values())
@@ -0,0 +1,81 @@
+# app/services/rate_limit.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to
+    `capacity`, so short bursts are allowed but the sustained rate is capped.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def allow(self, cost: float = 1.0) -> bool:
+        """Take `cost` tokens if available."""
+        self._refill(time.monotonic())
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def retry_after(self, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available."""
+        self._refill(time.monotonic())
+        missing = cost - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+
+class KeyedRateLimiter:
+    """
+    One token bucket per key (socket id, user id, IP...). Buckets are kept in
+    last-use order and the least recently used is dropped past max_keys, so
+    keys that go away without remove() can't grow the table unbounded.
+    """
+
+    def __init__(self, rate: float, capacity: float, max_keys: int = 100000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity)
+        self._buckets[key] = bucket
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return bucket
+
+    def allow(self, key, cost: float = 1.0) -> bool:
+        with self._lock:
+            return self._bucket(str(key)).allow(cost)
+
+    def retry_after(self, key, cost: float = 1.0) -> float:
+        with self._lock:
+            bucket: Optional[TokenBucket] = self._buckets.get(str(key))
+            return bucket.retry_after(cost) if bucket else 0.0
+
+    def remove(self, key) -> None:
+        with self._lock:
+            self._buckets.pop(str(key), None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buckets)
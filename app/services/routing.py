@@ -0,0 +1,250 @@
+# app/services/routing.py
+"""
+Road-network travel times from an offline graph file.
+
+The graph is a .npz file (an OSM extract converted offline, e.g. with
+RoadNetwork.from_edges(...).save(path)) holding:
+    node_lat, node_lon  float64[n]   node coordinates, degrees
+    indptr              int64[n + 1] CSR row pointers
+    indices             int32[m]     edge target nodes
+    weights             float32[m]   edge travel times, seconds
+
+Points are snapped to the nearest node; the short leg between a point and
+its node is costed at the fallback speed. When no graph is configured, or
+a point is too far from the network or unreachable within the search
+bound, the ETA falls back to crow-flies distance at the fallback speed.
+"""
+import heapq
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.geo import haversine_km, haversine_km_many
+
+logger = logging.getLogger(__name__)
+
+
+class RoadNetwork:
+    """Directed road graph in CSR form."""
+
+    def __init__(self, node_lat: np.ndarray, node_lon: np.ndarray, indptr: np.ndarray,
+                 indices: np.ndarray, weights: np.ndarray):
+        self.node_lat = np.ascontiguousarray(node_lat, dtype=np.float64)
+        self.node_lon = np.ascontiguousarray(node_lon, dtype=np.float64)
+        self.indptr = np.ascontiguousarray(indptr, dtype=np.int64)
+        self.indices = np.ascontiguousarray(indices, dtype=np.int32)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        if self.indptr.shape[0] != self.node_lat.shape[0] + 1 or self.indices.shape != self.weights.shape:
+            raise ValueError("Malformed road graph: array sizes don't match")
+        self._lat_rad = np.radians(self.node_lat)
+        self._lon_rad = np.radians(self.node_lon)
+        self._cos_lat = np.cos(self._lat_rad)
+        # memoryviews index as plain Python scalars, much faster than numpy in the Dijkstra loop
+        self._adjacency = (memoryview(self.indptr), memoryview(self.indices), memoryview(self.weights))
+
+    @classmethod
+    def load(cls, path: str) -> "RoadNetwork":
+        with np.load(path) as data:
+            return cls(data["node_lat"], data["node_lon"], data["indptr"], data["indices"], data["weights"])
+
+    @classmethod
+    def from_edges(cls, node_lat, node_lon, sources, targets, seconds) -> "RoadNetwork":
+        """Build the CSR arrays from an edge list (one entry per directed edge)."""
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind="stable")
+        counts = np.bincount(sources, minlength=len(node_lat))
+        indptr = np.zeros(len(node_lat) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(
+            np.asarray(node_lat), np.asarray(node_lon), indptr,
+            np.asarray(targets)[order], np.asarray(seconds)[order],
+        )
+
+    def reversed(self) -> "RoadNetwork":
+        """The same graph with every edge flipped (times *to* a node become times *from* it)."""
+        sources = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.indptr))
+        return RoadNetwork.from_edges(self.node_lat, self.node_lon, self.indices, sources, self.weights)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path, node_lat=self.node_lat, node_lon=self.node_lon,
+            indptr=self.indptr, indices=self.indices, weights=self.weights,
+        )
+
+    def __len__(self) -> int:
+        return self.node_lat.shape[0]
+
+    def snap(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Nearest node to a point, and its distance in km."""
+        distances = haversine_km_many(lat, lon, self._lat_rad, self._lon_rad, self._cos_lat)
+        node = int(np.argmin(distances))
+        return node, float(distances[node])
+
+    def shortest_times(self, source: int, max_seconds: float,
+                       targets: Optional[Iterable[int]] = None) -> Dict[int, float]:
+        """
+        Bounded Dijkstra: travel time from source to every node reachable within
+        max_seconds. With targets, only their times are returned and the search
+        stops as soon as all of them are settled.
+        """
+        indptr, indices, weights = self._adjacency
+        remaining = set(targets) if targets is not None else None
+        settled: Dict[int, float] = {}
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            seconds, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled[node] = seconds
+            if remaining is not None:
+                remaining.discard(node)
+                if not remaining:
+                    break
+            for edge in range(indptr[node], indptr[node + 1]):
+                target = indices[edge]
+                candidate = seconds + weights[edge]
+                if candidate <= max_seconds and candidate < best.get(target, math.inf) and target not in settled:
+                    best[target] = candidate
+                    heapq.heappush(heap, (candidate, target))
+        if targets is None:
+            return settled
+        return {node: settled[node] for node in targets if node in settled}
+
+
+class EtaEngine:
+    """
+    Travel-time estimates for dispatch ranking and the ETA shown to patients.
+
+    Ambulances drive from a hospital to the patient, so searches run on the
+    reversed graph from the patient's side: one bounded Dijkstra gives the
+    time from every candidate hospital at once, and stops when they are all
+    settled. Searches run once per patient cell (a grid of cell_degrees)
+    from the node nearest the cell's center; only the times to hospital
+    nodes are kept, in an LRU cache, so nearby requests reuse them and a
+    cache entry stays a handful of numbers. Hospital snaps are cached too.
+    """
+
+    def __init__(
+        self,
+        network: Optional[RoadNetwork],
+        fallback_speed_kmh: float,
+        max_seconds: float,
+        cell_degrees: float,
+        cache_size: int,
+        max_snap_km: float,
+    ):
+        self.network = network
+        self._reverse = network.reversed() if network is not None else None
+        self.fallback_speed_kmh = fallback_speed_kmh
+        self.max_seconds = max_seconds
+        self.cell_degrees = cell_degrees
+        self.cache_size = cache_size
+        self.max_snap_km = max_snap_km
+        # patient cell -> (root node, snap km, {hospital node: seconds to the root node, None if out of bound})
+        self._trees: "OrderedDict[Tuple[int, int], Tuple[int, float, Dict[int, Optional[float]]]]" = OrderedDict()
+        # rounded hospital position -> (node, snap km)
+        self._snaps: Dict[Tuple[float, float], Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _leg_seconds(self, km: float) -> float:
+        return km / self.fallback_speed_kmh * 3600.0
+
+    def fallback(self, lat: float, lon: float, dest_lat: float, dest_lon: float) -> Dict:
+        distance_km = haversine_km(lat, lon, dest_lat, dest_lon)
+        return {"seconds": self._leg_seconds(distance_km), "distance_km": distance_km, "source": "haversine"}
+
+    def _tree(self, lat: float, lon: float, nodes: List[int]) -> Tuple[int, float, Dict[int, Optional[float]]]:
+        cell = (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+        with self._lock:
+            tree = self._trees.get(cell)
+            if tree is not None:
+                self._trees.move_to_end(cell)
+                missing = [node for node in nodes if node not in tree[2]]
+                if not missing:
+                    self.hits += 1
+                    return tree
+            self.misses += 1
+
+        if tree is None:
+            center_lat = (cell[0] + 0.5) * self.cell_degrees
+            center_lon = (cell[1] + 0.5) * self.cell_degrees
+            root, snap_km = self.network.snap(center_lat, center_lon)
+            missing = nodes
+        else:
+            root, snap_km = tree[0], tree[1]
+        found = self._reverse.shortest_times(root, self.max_seconds, targets=missing)
+        with self._lock:
+            tree = self._trees.setdefault(cell, (root, snap_km, {}))
+            tree[2].update({node: found.get(node) for node in missing})
+            self._trees.move_to_end(cell)
+            while len(self._trees) > self.cache_size:
+                self._trees.popitem(last=False)
+        return tree
+
+    def _snap_origin(self, lat: float, lon: float) -> Tuple[int, float]:
+        key = (round(lat, 6), round(lon, 6))
+        snapped = self._snaps.get(key)
+        if snapped is None:
+            snapped = self.network.snap(lat, lon)
+            self._snaps[key] = snapped
+        return snapped
+
+    def times_to(self, lat: float, lon: float, origins: List[Tuple[float, float]]) -> List[Dict]:
+        """
+        ETA from each origin (hospital) to a point (patient):
+        {seconds, distance_km, source} where source is "road" or "haversine" (fallback).
+        """
+        if self.network is None or not len(self.network):
+            return [self.fallback(o_lat, o_lon, lat, lon) for o_lat, o_lon in origins]
+
+        snapped = [self._snap_origin(o_lat, o_lon) for o_lat, o_lon in origins]
+        root, _, times = self._tree(lat, lon, [node for node, _ in snapped])
+        # The patient may sit anywhere in the cell: cost the leg from the tree's root node
+        target_leg_km = haversine_km(
+            float(self.network.node_lat[root]), float(self.network.node_lon[root]), lat, lon
+        )
+        results = []
+        for (o_lat, o_lon), (node, snap_km) in zip(origins, snapped):
+            road_seconds = times.get(node)
+            if target_leg_km > self.max_snap_km or snap_km > self.max_snap_km or road_seconds is None:
+                results.append(self.fallback(o_lat, o_lon, lat, lon))
+                continue
+            results.append({
+                "seconds": road_seconds + self._leg_seconds(snap_km + target_leg_km),
+                "distance_km": haversine_km(o_lat, o_lon, lat, lon),
+                "source": "road",
+            })
+        return results
+
+    def eta(self, from_lat: float, from_lon: float, to_lat: float, to_lon: float) -> Dict:
+        return self.times_to(to_lat, to_lon, [(from_lat, from_lon)])[0]
+
+
+def _load_network(path: Optional[str]) -> Optional[RoadNetwork]:
+    if not path:
+        return None
+    try:
+        network = RoadNetwork.load(path)
+        logger.info("Road graph loaded: %d nodes, %d edges", len(network), network.indices.shape[0])
+        return network
+    except Exception as e:
+        logger.error("Error loading road graph %s, using straight-line ETAs: %s", path, e)
+        return None
+
+
+eta_engine = EtaEngine(
+    _load_network(settings.ROAD_GRAPH_PATH),
+    fallback_speed_kmh=settings.ROUTING_FALLBACK_SPEED_KMH,
+    max_seconds=settings.ROUTING_MAX_SECONDS,
+    cell_degrees=settings.ROUTING_CELL_DEGREES,
+    cache_size=settings.ROUTING_CACHE_SIZE,
+    max_snap_km=settings.ROUTING_MAX_SNAP_KM,
+)
@@ -1,176 +1,202 @@
 import socketio
+import asyncio
+import logging
 import math
 from typing import Dict, List, Optional
 import urllib.parse
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.services.hospital import get_all_hospitals
+from app.db.session import SessionLocal, session_scope
+from app.services.geo import HospitalFilter, hospital_geo_index
+from app.services.routing import eta_engine
 from app.services.patient import get_patient_by_credential_id
-from app.utils.jwt import verify_token
+from app.utils.jwt import DecodedTokenCache
 from app.services.socket_log import create_socket_log, update_socket_log
+from app.services.sos_queue import pending_sos_queue
+from app.services.notification import AckBatcher, NotificationDispatcher, user_room
+from app.services.delivery import ReliableDelivery
+from app.services.inbox import offline_inbox
+from app.services.location import location_store
+from app.services.tracking import AmbulanceTracker, assignment_room, can_follow_assignment
+from app.services.rate_limit import KeyedRateLimiter
+from app.services.admission import ConnectionAdmission, client_ip
+from app.core.config import settings
 from app.db.models.socket_log import SocketLog
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # mgr = socketio.AsyncRedisManager(url="redis://localhost:6379/0") 
 sio = socketio.AsyncServer(
     async_mode="asgi", 
     cors_allowed_origins="*",
-    logger=True,
-    engineio_logger=True
+    logger=False,
+    engineio_logger=False
 )
 
 # Store connected users: {user_id: {socket_id: str, role: str}}
 connected_users: Dict[str, Dict] = {}
 
-# Store patient locations: {patient_id: {latitude: float, longitude: float, timestamp: str}}
-patient_locations: Dict[str, Dict] = {}
+# Concurrent fan-out to users' rooms (user:{user_id})
+notifier = NotificationDispatcher(sio, connected_users)
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """
-    Calculate distance between two points using Haversine formula
-    Returns distance in kilometers
-    """
-    R = 6371  # Earth's radius in kilometers
-    
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-    
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-    
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    distance = R * c
-    
-    return distance
+# Acked, retried delivery for critical events (AMBULANCE_ALERT, ambulance_accepted, doctor_ambulance_assigned)
+reliable_delivery = ReliableDelivery(
+    sio,
+    connected_users,
+    ack_timeout_seconds=settings.SOCKET_ACK_TIMEOUT_SECONDS,
+    max_attempts=settings.SOCKET_DELIVERY_MAX_ATTEMPTS,
+    backoff_seconds=settings.SOCKET_DELIVERY_BACKOFF_SECONDS,
+    max_backoff_seconds=settings.SOCKET_DELIVERY_MAX_BACKOFF_SECONDS,
+    ttl_seconds=settings.SOCKET_DELIVERY_TTL_SECONDS,
+)
+
+# Coalesced live ambulance positions, broadcast to assignment:{id} rooms (ticker started in main.py)
+ambulance_tracker = AmbulanceTracker(
+    sio,
+    location_store,
+    tick_seconds=settings.AMBULANCE_TRACKING_TICK_SECONDS,
+    persist_interval_seconds=settings.AMBULANCE_TRACKING_PERSIST_INTERVAL_SECONDS,
+    persist_min_distance_m=settings.AMBULANCE_TRACKING_PERSIST_MIN_DISTANCE_M,
+    default_speed_kmh=settings.AMBULANCE_DEFAULT_SPEED_KMH,
+    assignment_cache_seconds=settings.AMBULANCE_ASSIGNMENT_CACHE_SECONDS,
+)
+
+# Per-socket budget for location pings (update_location, ambulance_location)
+location_rate_limiter = KeyedRateLimiter(
+    rate=settings.LOCATION_RATE_PER_SECOND,
+    capacity=settings.LOCATION_RATE_BURST,
+)
+
+# Reconnect storms: per-IP/per-user connect budgets and a cap on concurrent handshakes
+connection_admission = ConnectionAdmission(
+    ip_rate=settings.SOCKET_CONNECT_RATE_PER_IP,
+    ip_burst=settings.SOCKET_CONNECT_BURST_PER_IP,
+    user_rate=settings.SOCKET_CONNECT_RATE_PER_USER,
+    user_burst=settings.SOCKET_CONNECT_BURST_PER_USER,
+    max_concurrent=settings.SOCKET_MAX_CONCURRENT_HANDSHAKES,
+    busy_retry_seconds=settings.SOCKET_BUSY_RETRY_SECONDS,
+)
+
+# Decoded connect tokens, so reconnects skip JWT verification
+token_cache = DecodedTokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    max_ttl_seconds=settings.TOKEN_CACHE_MAX_TTL_SECONDS,
+)
+
+# "location_updated" acks for clients that send {"ack": "batch"} (ticker started in main.py)
+location_ack_batcher = AckBatcher(sio, "location_updated", settings.LOCATION_ACK_BATCH_SECONDS)
 
 def update_patient_location(patient_id: str, latitude: float, longitude: float):
     """
     Update patient's current location
     """
-    from datetime import datetime
-    patient_locations[patient_id] = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "timestamp": datetime.utcnow().isoformat()
-    }
-    print(f"📍 Updated location for patient {patient_id}: {latitude}, {longitude}")
+    location_store.update("patient", patient_id, latitude, longitude)
+    logger.debug(
+        "Updated location for patient %s: %s, %s", patient_id, latitude, longitude,
+        extra={"event": "location_update"}
+    )
 
 def get_patient_location(patient_id: str) -> Optional[Dict]:
     """
-    Get patient's current location
+    Get patient's last known location: {latitude, longitude, timestamp, age_seconds}
     """
-    return patient_locations.get(patient_id)
+    return location_store.latest("patient", patient_id)
+
+def _nearest_hospital_dict(row: Dict, distance: float) -> Dict:
+    return {
+        'id': row['id'],
+        'credential_id': row['credential_id'],
+        'name': row['name'],
+        'address': row['address'],
+        'latitude': row['latitude'],
+        'longitude': row['longitude'],
+        'phone': row['phone'],
+        'distance': distance,
+    }
 
-def find_nearest_hospital(patient_lat: float, patient_lon: float, db: Session) -> Optional[Dict]:
+def find_nearest_hospital(patient_lat: float, patient_lon: float, db: Session,
+                          hospital_filter: Optional[HospitalFilter] = None) -> Optional[Dict]:
     """
     Find the nearest hospital with available capacity
     """
     try:
-        hospitals = get_all_hospitals(db)
-        
-        if not hospitals:
+        nearest = hospital_geo_index.nearest(db, patient_lat, patient_lon, k=1, hospital_filter=hospital_filter)
+        if not nearest:
             return None
-        
-        # Filter hospitals with coordinates and calculate distances
-        hospitals_with_distance = []
-        for hospital in hospitals:
-            if hospital.latitude is not None and hospital.longitude is not None:
-                distance = calculate_distance(
-                    patient_lat, patient_lon, 
-                    hospital.latitude, hospital.longitude
-                )
-                hospitals_with_distance.append({
-                    'id': hospital.id,
-                    'credential_id': hospital.credential_id,
-                    'name': hospital.name,
-                    'address': hospital.address,
-                    'latitude': hospital.latitude,
-                    'longitude': hospital.longitude,
-                    'phone': hospital.phone,
-                    'distance': distance
-                })
-        
-        if not hospitals_with_distance:
-            return None
-        
-        # Sort by distance and return the nearest
-        nearest_hospital = min(hospitals_with_distance, key=lambda x: x['distance'])
-        return nearest_hospital
-        
+        return _nearest_hospital_dict(*nearest[0])
+
     except Exception as e:
-        print(f"Error finding nearest hospital: {e}")
+        logger.error("Error finding nearest hospital: %s", e)
         return None
 
-def find_nearest_connected_hospital(patient_lat: float, patient_lon: float, db: Session) -> Optional[Dict]:
+async def find_nearest_connected_hospital(patient_lat: float, patient_lon: float, db: Session,
+                                          hospital_filter: Optional[HospitalFilter] = None) -> Optional[Dict]:
     """
-    Find the nearest hospital that is currently socket-connected (role == 'hospital').
+    Find the socket-connected hospital (role == 'hospital') with the shortest travel time,
+    among those matching hospital_filter (departments, emergency_available, ...)
     """
     try:
-        hospitals = get_all_hospitals(db)
-
-        if not hospitals:
-            return None
-
-        hospitals_with_distance: List[Dict] = []
-        for hospital in hospitals:
-            if hospital.latitude is None or hospital.longitude is None:
+        connected_hospitals = {}
+        for user_id, user_data in list(connected_users.items()):
+            if user_data.get("role") != "hospital":
                 continue
-
-            connected_key = str(hospital.credential_id) if hospital.credential_id is not None else None
-            if not connected_key:
-                continue
-
-            # Handle both string and legacy int keys gracefully
-            user_data = connected_users.get(connected_key)
-            if not user_data:
-                try:
-                    legacy_key = int(connected_key)
-                except Exception:
-                    legacy_key = None
-                if legacy_key is not None:
-                    user_data = connected_users.get(str(legacy_key)) or connected_users.get(legacy_key)  # in case old int key exists
-            if not user_data or user_data.get("role") != "hospital":
+            try:
+                connected_hospitals[int(user_id)] = user_data
+            except (TypeError, ValueError):
                 continue
+        if not connected_hospitals:
+            return None
 
-            distance = calculate_distance(
-                patient_lat,
-                patient_lon,
-                float(hospital.latitude),
-                float(hospital.longitude),
-            )
-
-            hospitals_with_distance.append({
-                'id': hospital.id,
-                'credential_id': hospital.credential_id,
-                'name': hospital.name,
-                'address': hospital.address,
-                'latitude': hospital.latitude,
-                'longitude': hospital.longitude,
-                'phone': hospital.phone,
-                'distance': distance,
-                'socket_id': user_data.get('socket_id'),
-            })
-
-        if not hospitals_with_distance:
+        # Shortlist by straight-line distance, then rank the shortlist by road travel time
+        candidates = hospital_geo_index.nearest(
+            db, patient_lat, patient_lon, k=settings.ROUTING_CANDIDATE_HOSPITALS,
+            credential_ids=connected_hospitals.keys(), hospital_filter=hospital_filter
+        )
+        if not candidates:
             return None
 
-        return min(hospitals_with_distance, key=lambda x: x['distance'])
+        # A cache miss runs a road-graph search; keep it off the event loop
+        etas = await asyncio.to_thread(
+            eta_engine.times_to,
+            patient_lat, patient_lon, [(row['latitude'], row['longitude']) for row, _ in candidates]
+        )
+        (row, distance), eta = min(zip(candidates, etas), key=lambda pair: pair[1]['seconds'])
+        hospital = _nearest_hospital_dict(row, distance)
+        hospital['socket_id'] = connected_hospitals[row['credential_id']].get('socket_id')
+        hospital['eta_seconds'] = int(eta['seconds'])
+        hospital['eta_source'] = eta['source']
+        return hospital
 
     except Exception as e:
-        print(f"Error finding nearest connected hospital: {e}")
+        logger.error("Error finding nearest connected hospital: %s", e)
         return None
 
+def _refuse_connection(sid: str, reason: str, retry_after: float):
+    logger.info(
+        "Refused connection %s (%s); retry after %.1fs", sid, reason, retry_after,
+        extra={"event": "connect_refused"}
+    )
+    # Sent to the client as connect_error {message, data}
+    raise socketio.exceptions.ConnectionRefusedError(
+        "Too many connections, retry later",
+        {"reason": reason, "retry_after_seconds": round(retry_after, 1)},
+    )
+
 @sio.event
 async def connect(sid, environ):
+    # Admission checks come first, so refused handshakes cost as little as possible
+    retry_after = connection_admission.check_ip(client_ip(environ, settings.SOCKET_TRUSTED_PROXY_HOPS))
+    if retry_after is not None:
+        _refuse_connection(sid, "ip_rate", retry_after)
+    retry_after = connection_admission.acquire()
+    if retry_after is not None:
+        _refuse_connection(sid, "busy", retry_after)
+
+    admitted = False
     try:
         # Extract user_id and role from token or query parameters
         # For now, we'll assume they're passed in the query string
-        # print(f"✅ Client connected: {sid}") 
         query_params = environ.get("QUERY_STRING", "")
-        print(f"✅ Query params: {query_params}")
         params = {}
         # Parse query params robustly (handle both & and ? in the string)
 
@@ -188,15 +214,21 @@ async def connect(sid, environ):
         user_id = None
         if token:
             try:
-                # Decode JWT manually to extract user_id
-                payload = verify_token(token)
-                print(f"✅ Token payload: {payload}")
+                # Decode JWT manually to extract user_id (cached per token)
+                payload = token_cache.verify(token)
+                logger.debug("Token payload for socket %s: %s", sid, payload)
                 user_id = payload.get("user_id")
             except Exception as e:
-                print(f"❌ Error decoding token: {e}")
+                logger.warning("Error decoding token for socket %s: %s", sid, e)
                 user_id = None
 
-        print(f"✅ Client connected: {sid} with token {token} and role {role} and user_id {user_id}")
+        if user_id:
+            retry_after = connection_admission.check_user(user_id)
+            if retry_after is not None:
+                _refuse_connection(sid, "user_rate", retry_after)
+
+        logger.info("Client connected: %s with role %s and user_id %s", sid, role, user_id)
+        admitted = True
         
         if user_id and role:
             user_id_str = str(user_id)
@@ -204,8 +236,18 @@ async def connect(sid, environ):
                 "socket_id": sid,
                 "role": role
             }
-            print(f"✅ User {user_id_str} ({role}) connected with socket {sid}")
-            print(f"✅ Connected users: {connected_users}")
+            await sio.save_session(sid, {"user_id": user_id_str, "role": role})
+            await sio.enter_room(sid, user_room(user_id_str))
+            reliable_delivery.redeliver(user_id_str)
+
+            # Flush events queued while the user was offline, in order (Redis I/O off the event loop)
+            for message in await asyncio.to_thread(offline_inbox.drain, user_id_str):
+                await sio.emit(message["event"], message["payload"], to=sid)
+                logger.info("Delivered queued %s to user %s", message["event"], user_id_str)
+            logger.info(
+                "User %s (%s) connected with socket %s; %d users connected",
+                user_id_str, role, sid, len(connected_users)
+            )
             
             # Log connection event
             # try:
@@ -220,16 +262,22 @@ async def connect(sid, environ):
             #         status="success"
             #     )
             # except Exception as e:
-            #     print(f"❌ Error logging connection: {e}")
+            #     logger.error("Error logging connection: %s", e)
         else:
-            print(f"⚠️ Missing userId or role for socket {sid}")
+            logger.warning("Missing userId or role for socket %s", sid)
             
+    except socketio.exceptions.ConnectionRefusedError:
+        raise
     except Exception as e:
-        print(f"❌ Error in connect: {e}")
+        logger.error("Error in connect: %s", e)
+    finally:
+        connection_admission.release(admitted)
 
 @sio.event
 async def disconnect(sid):
-    print(f"❌ Client disconnected: {sid}")
+    logger.info("Client disconnected: %s", sid)
+    location_rate_limiter.remove(sid)
+    location_ack_batcher.discard(sid)
     
     # Find user and log disconnect
     disconnected_user = None
@@ -237,7 +285,7 @@ async def disconnect(sid):
         if user_data["socket_id"] == sid:
             disconnected_user = {"user_id": user_id, "role": user_data["role"]}
             del connected_users[user_id]
-            print(f"✅ Removed user {user_id} from connected users")
+            logger.info("Removed user %s from connected users", user_id)
             break
     
     # Log disconnect event
@@ -254,58 +302,167 @@ async def disconnect(sid):
     #             status="success"
     #         )
     #     except Exception as e:
-    #         print(f"❌ Error logging disconnect: {e}")
+    #         logger.error("Error logging disconnect: %s", e)
+
+def _log_location_update(sid: str, patient_id: str, data: Dict, latitude, longitude):
+    with session_scope() as db:
+        create_socket_log(
+            db=db,
+            event_type="update_location",
+            socket_id=sid,
+            user_id=patient_id,
+            user_role="patient",
+            event_data=data,
+            patient_latitude=str(latitude),
+            patient_longitude=str(longitude),
+            status="success"
+        )
 
 @sio.event
 async def update_location(sid, data):
     """
     Update patient's current location
-    data should contain: {patient_id, latitude, longitude}
+    data should contain: {patient_id, latitude, longitude, ack?}
+    ack: "each" (default) acks every ping, "batch" sends one "location_updated"
+    with counters every LOCATION_ACK_BATCH_SECONDS, "none" never acks.
+    Fixes that barely differ from the previous one are acked but not stored or logged.
     """
     try:
         patient_id = data.get("patient_id")
         latitude = data.get("latitude")
         longitude = data.get("longitude")
-        
-        if patient_id and latitude is not None and longitude is not None:
-            update_patient_location(str(patient_id), latitude, longitude)
-            await sio.emit("location_updated", {"message": "Location updated successfully"}, to=sid)
-            print(f"📍 Location updated for patient {patient_id}")
-            
-            # Log location update
-            try:
-                db = next(get_db())
-                create_socket_log(
-                    db=db,
-                    event_type="update_location",
-                    socket_id=sid,
-                    user_id=str(patient_id),
-                    user_role="patient",
-                    event_data=data,
-                    patient_latitude=str(latitude),
-                    patient_longitude=str(longitude),
-                    status="success"
-                )
-            except Exception as e:
-                print(f"❌ Error logging location update: {e}")
-        else:
+        ack_mode = data.get("ack", "each")
+
+        if not patient_id or latitude is None or longitude is None:
             await sio.emit("location_error", {"error": "Missing location data"}, to=sid)
-            
+            return
+
+        if not location_rate_limiter.allow(sid):
+            if ack_mode == "batch":
+                location_ack_batcher.add(sid, "rate_limited")
+            elif ack_mode != "none":
+                await sio.emit("location_error", {
+                    "error": "Too many location updates",
+                    "retry_after_seconds": round(location_rate_limiter.retry_after(sid), 3),
+                }, to=sid)
+            return
+
+        patient_id = str(patient_id)
+        duplicate = location_store.is_redundant(
+            "patient", patient_id, latitude, longitude,
+            min_distance_m=settings.LOCATION_DEDUP_DISTANCE_M,
+            min_interval_seconds=settings.LOCATION_DEDUP_INTERVAL_SECONDS,
+        )
+        status = "deduplicated" if duplicate else "accepted"
+        if not duplicate:
+            update_patient_location(patient_id, latitude, longitude)
+
+        if ack_mode == "batch":
+            location_ack_batcher.add(sid, status, latitude=latitude, longitude=longitude)
+        elif ack_mode != "none":
+            await sio.emit("location_updated", {"message": "Location updated successfully", "status": status}, to=sid)
+
+        if duplicate:
+            return
+
+        # Log location update
+        try:
+            await asyncio.to_thread(_log_location_update, sid, patient_id, data, latitude, longitude)
+        except Exception as e:
+            logger.error("Error logging location update: %s", e)
+
     except Exception as e:
-        print(f"❌ Error updating location: {e}")
+        logger.error("Error updating location: %s", e)
         await sio.emit("location_error", {"error": "Failed to update location"}, to=sid)
 
+@sio.event
+async def track_assignment(sid, data):
+    """
+    Follow an assignment's live ambulance position ("ambulance_location" events)
+    data should contain: {assignment_id}
+    """
+    try:
+        session = await sio.get_session(sid)
+        assignment_id = data.get("assignment_id")
+        if not assignment_id or not session.get("user_id"):
+            await sio.emit("tracking_error", {"error": "Missing assignment_id or not authenticated"}, to=sid)
+            return
+
+        allowed = await asyncio.to_thread(
+            can_follow_assignment, int(assignment_id), session["user_id"], session.get("role")
+        )
+        if not allowed:
+            await sio.emit("tracking_error", {"error": "Not allowed to track this assignment"}, to=sid)
+            return
+
+        await sio.enter_room(sid, assignment_room(assignment_id))
+        await sio.emit("tracking_started", {"assignment_id": assignment_id}, to=sid)
+        logger.info("Socket %s is tracking assignment %s", sid, assignment_id)
+
+    except Exception as e:
+        logger.error("Error starting tracking: %s", e)
+        await sio.emit("tracking_error", {"error": "Internal server error"}, to=sid)
+
+@sio.event
+async def untrack_assignment(sid, data):
+    assignment_id = data.get("assignment_id")
+    if assignment_id:
+        await sio.leave_room(sid, assignment_room(assignment_id))
+
+@sio.event
+async def ambulance_location(sid, data):
+    """
+    GPS stream from an ambulance on an assignment
+    data should contain: {ambulance_id, latitude, longitude, assignment_id?}
+    Broadcasts are coalesced by ambulance_tracker; pings are not acknowledged.
+    """
+    try:
+        session = await sio.get_session(sid)
+        ambulance_id = data.get("ambulance_id")
+        latitude = data.get("latitude")
+        longitude = data.get("longitude")
+
+        if session.get("role") != "ambulance":
+            await sio.emit("tracking_error", {"error": "Only ambulances can send locations"}, to=sid)
+            return
+        if not ambulance_id or latitude is None or longitude is None:
+            await sio.emit("tracking_error", {"error": "Missing location data"}, to=sid)
+            return
+
+        if not location_rate_limiter.allow(sid):
+            return
+
+        ambulance_id = int(ambulance_id)
+        assignment_id = data.get("assignment_id")
+        info = await ambulance_tracker.assignment_for(
+            ambulance_id, session["user_id"], int(assignment_id) if assignment_id else None
+        )
+        if not info:
+            await sio.emit("tracking_error", {"error": "No active assignment for this ambulance"}, to=sid)
+            return
+
+        ambulance_tracker.record(ambulance_id, sid, float(latitude), float(longitude))
+        logger.debug(
+            "Location for ambulance %s: %s, %s", ambulance_id, latitude, longitude,
+            extra={"event": "ambulance_location"}
+        )
+
+    except Exception as e:
+        logger.error("Error handling ambulance location: %s", e)
+        await sio.emit("tracking_error", {"error": "Failed to update location"}, to=sid)
+
 @sio.event
 async def ambulance_request(sid, data):
     """
     Handle ambulance request from patient
-    data should contain: {patient_id, latitude, longitude, emergency_details}
+    data should contain: {patient_id, latitude, longitude, emergency_details, hospital_filter?}
+    hospital_filter: e.g. {"departments": ["cardiology"], "emergency_available": true, "approved": true}
     """
     start_time = datetime.utcnow()
     log_id = None
     
     try:
-        print(f"🚑 Ambulance request received from {sid}: {data}")
+        logger.info("Ambulance request received from %s: %s", sid, data)
         
         patient_id = data.get("patient_id")
         patient_lat = data.get("latitude")
@@ -313,12 +470,12 @@ async def ambulance_request(sid, data):
         emergency_details = data.get("emergency_details", {})
         
         if not patient_id:
-            print("❌ Missing patient_id in ambulance request")
+            logger.warning("Missing patient_id in ambulance request from %s", sid)
             await sio.emit("ambulance_request_error", {"error": "Missing patient_id"}, to=sid)
             return
         
         # Get database session
-        db = next(get_db())
+        db = SessionLocal()
         
         # Log ambulance request
         try:
@@ -336,12 +493,12 @@ async def ambulance_request(sid, data):
             )
             log_id = socket_log.id
         except Exception as e:
-            print(f"❌ Error logging ambulance request: {e}")
+            logger.error("Error logging ambulance request: %s", e)
         
         try:
             # Get patient details
             patient = get_patient_by_credential_id(db, int(patient_id))
-            print(f"📋 Patient found: {patient.full_name}")
+            logger.debug("Patient found: %s", patient.id)
             
             # Get patient location - first from request, then from stored location, then default
             if patient_lat is None or patient_lon is None:
@@ -349,18 +506,21 @@ async def ambulance_request(sid, data):
                 if stored_location:
                     patient_lat = stored_location["latitude"]
                     patient_lon = stored_location["longitude"]
-                    print(f"📍 Using stored location for patient: {patient_lat}, {patient_lon}")
+                    logger.debug("Using stored location for patient %s: %s, %s", patient_id, patient_lat, patient_lon)
                 else:
                     # Default to a central location (you can modify this)
                     patient_lat = 12.9716  # Default latitude (e.g., Bangalore)
                     patient_lon = 77.5946  # Default longitude
-                    print(f"⚠️ Using default coordinates for patient: {patient_lat}, {patient_lon}")
+                    logger.warning("Using default coordinates for patient %s: %s, %s", patient_id, patient_lat, patient_lon)
             
             # Find nearest connected hospital
-            nearest_hospital = find_nearest_connected_hospital(float(patient_lat), float(patient_lon), db)
+            nearest_hospital = await find_nearest_connected_hospital(
+                float(patient_lat), float(patient_lon), db,
+                hospital_filter=HospitalFilter.from_dict(data.get("hospital_filter"))
+            )
             
             if not nearest_hospital:
-                print("❌ No connected hospitals found")
+                logger.warning("No connected hospitals found for patient %s", patient_id)
                 await sio.emit("ambulance_request_error", {"error": "No connected hospitals available"}, to=sid)
                 
                 # Update log with error
@@ -368,16 +528,17 @@ async def ambulance_request(sid, data):
                     update_socket_log(db, log_id, status="failed", error_message="No connected hospitals available")
                 return
             
-            print(f"🏥 Nearest hospital: {nearest_hospital['name']} ({nearest_hospital['distance']:.2f} km)")
+            logger.info(
+                "Nearest hospital: %s (%.2f km, %ss by %s)", nearest_hospital['name'],
+                nearest_hospital['distance'], nearest_hospital['eta_seconds'], nearest_hospital['eta_source']
+            )
             
-            # Add this debug code temporarily
-            print(f"🔍 DEBUG: nearest_hospital data: {nearest_hospital}")
-            print(f"🔍 DEBUG: connected_users: {connected_users}")
+            logger.debug("Nearest hospital data: %s", nearest_hospital)
             # We already filtered to connected hospitals; get socket data safely
             hospital_user_id_str = str(nearest_hospital['credential_id'])
             hospital_socket_data = connected_users.get(hospital_user_id_str)
             if not hospital_socket_data:
-                print(f"⚠️ Connected hospital disappeared from map: {nearest_hospital['name']}")
+                logger.warning("Connected hospital disappeared from map: %s", nearest_hospital['name'])
                 await sio.emit("ambulance_request_error", {"error": "Hospital connection lost"}, to=sid)
                 if log_id:
                     update_socket_log(db, log_id, status="failed", error_message="Hospital connection lost")
@@ -397,20 +558,22 @@ async def ambulance_request(sid, data):
                 "hospital_id": nearest_hospital['id'],
                 "hospital_name": nearest_hospital['name'],
                 "distance_km": round(nearest_hospital['distance'], 2),
+                "eta_seconds": nearest_hospital['eta_seconds'],
                 "emergency_details": emergency_details,
                 "request_timestamp": data.get("timestamp")
             }
             
-            # Send ambulance alert to hospital
-            await sio.emit("AMBULANCE_ALERT", ambulance_alert_data, to=hospital_socket_data["socket_id"])
-            print(f"✅ Ambulance alert sent to hospital {nearest_hospital['name']}")
+            # Send ambulance alert to hospital (acked; retried and redelivered on reconnect)
+            reliable_delivery.send(hospital_user_id_str, "AMBULANCE_ALERT", ambulance_alert_data, socket_log_id=log_id)
+            logger.info("Ambulance alert sent to hospital %s", nearest_hospital['name'])
             
             # Send confirmation to patient
             await sio.emit("ambulance_request_confirmed", {
                 "message": f"Ambulance request sent to {nearest_hospital['name']}",
                 "hospital_name": nearest_hospital['name'],
                 "distance_km": round(nearest_hospital['distance'], 2),
-                "estimated_time": f"{int(nearest_hospital['distance'] * 2)} minutes"
+                "eta_seconds": nearest_hospital['eta_seconds'],
+                "estimated_time": f"{max(1, math.ceil(nearest_hospital['eta_seconds'] / 60))} minutes"
             }, to=sid)
             
             # Update log with success and hospital information
@@ -432,24 +595,25 @@ async def ambulance_request(sid, data):
                         log_entry.hospital_name = nearest_hospital['name']
                         log_entry.sos_status = "pending"  # Set SOS status for dashboard filtering
                         db.commit()
-                        print(f"✅ Updated log entry {log_id} with hospital info")
+                        pending_sos_queue.sync(log_entry)
+                        logger.debug("Updated log entry %s with hospital info", log_id)
                 except Exception as e:
-                    print(f"❌ Error updating log with hospital info: {e}")
+                    logger.error("Error updating log with hospital info: %s", e)
             
         finally:
             db.close()
             
     except Exception as e:
-        print(f"❌ Error processing ambulance request: {e}")
+        logger.error("Error processing ambulance request: %s", e)
         await sio.emit("ambulance_request_error", {"error": "Internal server error"}, to=sid)
         
         # Update log with error
         if log_id:
             try:
-                db = next(get_db())
-                update_socket_log(db, log_id, status="failed", error_message=str(e))
+                with session_scope() as db:
+                    update_socket_log(db, log_id, status="failed", error_message=str(e))
             except Exception as log_error:
-                print(f"❌ Error updating log: {log_error}")
+                logger.error("Error updating log: %s", log_error)
 
 @sio.event
 async def hospital_response(sid, data):
@@ -461,7 +625,7 @@ async def hospital_response(sid, data):
     log_id = None
     
     try:
-        print(f"🏥 Hospital response received from {sid}: {data}")
+        logger.info("Hospital response received from %s: %s", sid, data)
         
         patient_id = data.get("patient_id")
         hospital_id = data.get("hospital_id")
@@ -469,11 +633,11 @@ async def hospital_response(sid, data):
         details = data.get("details", {})
         
         if not patient_id or not response:
-            print("❌ Missing patient_id or response in hospital response")
+            logger.warning("Missing patient_id or response in hospital response from %s", sid)
             return
         
         # Get database session and log hospital response
-        db = next(get_db())
+        db = SessionLocal()
         try:
             socket_log = create_socket_log(
                 db=db,
@@ -488,60 +652,71 @@ async def hospital_response(sid, data):
             )
             log_id = socket_log.id
         except Exception as e:
-            print(f"❌ Error logging hospital response: {e}")
+            logger.error("Error logging hospital response: %s", e)
         
-        # Find patient's socket
-        patient_user_id = str(patient_id)
-        if patient_user_id not in connected_users:
-            print(f"⚠️ Patient {patient_id} is not connected")
+        try:
+            if response == "accepted":
+                patient_event = "ambulance_accepted"
+                patient_payload = {
+                    "message": "Ambulance request accepted! Help is on the way.",
+                    "details": details
+                }
+            else:
+                patient_event = "ambulance_rejected"
+                patient_payload = {
+                    "message": "Ambulance request could not be fulfilled.",
+                    "details": details
+                }
             
-            # Update log with error
-            if log_id:
-                update_socket_log(db, log_id, status="failed", error_message="Patient not connected")
-            return
+            # Find patient's socket
+            patient_user_id = str(patient_id)
+            if patient_user_id not in connected_users:
+                logger.warning("Patient %s is not connected; queued %s in offline inbox", patient_id, patient_event)
+                await asyncio.to_thread(offline_inbox.store, patient_user_id, patient_event, patient_payload)
+            
+                # Update log: delivered when the patient reconnects
+                if log_id:
+                    update_socket_log(db, log_id, status="queued", error_message="Patient not connected")
+                return
         
-        patient_socket_data = connected_users[patient_user_id]
-        if patient_socket_data["role"] != "patient":
-            print(f"⚠️ User {patient_id} is not a patient")
+            patient_socket_data = connected_users[patient_user_id]
+            if patient_socket_data["role"] != "patient":
+                logger.warning("User %s is not a patient", patient_id)
             
-            # Update log with error
-            if log_id:
-                update_socket_log(db, log_id, status="failed", error_message="User is not a patient")
-            return
+                # Update log with error
+                if log_id:
+                    update_socket_log(db, log_id, status="failed", error_message="User is not a patient")
+                return
         
-        # Send response to patient
-        if response == "accepted":
-            await sio.emit("ambulance_accepted", {
-                "message": "Ambulance request accepted! Help is on the way.",
-                "details": details
-            }, to=patient_socket_data["socket_id"])
-            print(f"✅ Ambulance accepted notification sent to patient {patient_id}")
-        else:
-            await sio.emit("ambulance_rejected", {
-                "message": "Ambulance request could not be fulfilled.",
-                "details": details
-            }, to=patient_socket_data["socket_id"])
-            print(f"❌ Ambulance rejected notification sent to patient {patient_id}")
+            # Send response to patient
+            if response == "accepted":
+                reliable_delivery.send(patient_user_id, patient_event, patient_payload, socket_log_id=log_id)
+                logger.info("Ambulance accepted notification sent to patient %s", patient_id)
+            else:
+                await sio.emit(patient_event, patient_payload, to=patient_socket_data["socket_id"])
+                logger.info("Ambulance rejected notification sent to patient %s", patient_id)
         
-        # Update log with success
-        if log_id:
-            response_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-            update_socket_log(
-                db, log_id, 
-                status="success", 
-                response_time_ms=response_time
-            )
+            # Update log with success
+            if log_id:
+                response_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+                update_socket_log(
+                    db, log_id, 
+                    status="success", 
+                    response_time_ms=response_time
+                )
+        finally:
+            db.close()
             
     except Exception as e:
-        print(f"❌ Error processing hospital response: {e}")
+        logger.error("Error processing hospital response: %s", e)
         
         # Update log with error
         if log_id:
             try:
-                db = next(get_db())
-                update_socket_log(db, log_id, status="failed", error_message=str(e))
+                with session_scope() as db:
+                    update_socket_log(db, log_id, status="failed", error_message=str(e))
             except Exception as log_error:
-                print(f"❌ Error updating log: {log_error}")
+                logger.error("Error updating log: %s", log_error)
 
 @sio.event
 async def assign_doctor_and_ambulance(sid, data):
@@ -558,7 +733,7 @@ async def assign_doctor_and_ambulance(sid, data):
     }
     """
     try:
-        print(f"🧑‍⚕️🚑 Assignment request from {sid}: {data}")
+        logger.info("Assignment request from %s: %s", sid, data)
         patient_id = data.get("patient_id")
         hospital_id = data.get("hospital_id")
         doctor_id = data.get("doctor_id")
@@ -587,9 +762,9 @@ async def assign_doctor_and_ambulance(sid, data):
             doctor_socket = connected_users.get(doctor_key)
             if doctor_socket and doctor_socket.get("role") == "doctor":
                 await sio.emit("DOCTOR_ASSIGNMENT", assignment, to=doctor_socket["socket_id"])
-                print(f"✅ Notified doctor credential {doctor_key} of assignment")
+                logger.info("Notified doctor credential %s of assignment", doctor_key)
             else:
-                print(f"⚠️ Doctor credential {doctor_key} not connected or wrong role")
+                logger.warning("Doctor credential %s not connected or wrong role", doctor_key)
 
         # Notify ambulance if connected
         if ambulance_cred is not None:
@@ -597,43 +772,86 @@ async def assign_doctor_and_ambulance(sid, data):
             ambulance_socket = connected_users.get(ambulance_key)
             if ambulance_socket and ambulance_socket.get("role") == "ambulance":
                 await sio.emit("AMBULANCE_ASSIGNMENT", assignment, to=ambulance_socket["socket_id"])
-                print(f"✅ Notified ambulance credential {ambulance_key} of assignment")
+                logger.info("Notified ambulance credential %s of assignment", ambulance_key)
             else:
-                print(f"⚠️ Ambulance credential {ambulance_key} not connected or wrong role")
+                logger.warning("Ambulance credential %s not connected or wrong role", ambulance_key)
 
         # Acknowledge to hospital
         await sio.emit("assignment_success", assignment, to=sid)
 
         # Log the assignment
         try:
-            db = next(get_db())
-            create_socket_log(
-                db=db,
-                event_type="assignment",
-                socket_id=sid,
-                user_id=str(hospital_id),
-                user_role="hospital",
-                event_data=data,
-                response_data=assignment,
-                status="success"
-            )
+            with session_scope() as db:
+                create_socket_log(
+                    db=db,
+                    event_type="assignment",
+                    socket_id=sid,
+                    user_id=str(hospital_id),
+                    user_role="hospital",
+                    event_data=data,
+                    response_data=assignment,
+                    status="success"
+                )
         except Exception as e:
-            print(f"❌ Error logging assignment: {e}")
-        finally:
-            try:
-                db.close()
-            except Exception:
-                pass
+            logger.error("Error logging assignment: %s", e)
 
     except Exception as e:
-        print(f"❌ Error handling assignment: {e}")
+        logger.error("Error handling assignment: %s", e)
         await sio.emit("assignment_error", {"error": "Internal server error"}, to=sid)
 
+async def notify_batch_assignments(notifications: List[Dict]):
+    """
+    Send DOCTOR_ASSIGNMENT / AMBULANCE_ASSIGNMENT for a batch of assignments
+    in one concurrent fan-out.
+    notifications: [{assignment: Dict, doctor_credential_id?: int, ambulance_credential_id?: int}]
+    """
+    targets = []
+    for notification in notifications:
+        assignment = notification["assignment"]
+        if notification.get("doctor_credential_id") is not None:
+            targets.append({"event": "DOCTOR_ASSIGNMENT", "payload": assignment,
+                            "user_id": notification["doctor_credential_id"], "role": "doctor"})
+        if notification.get("ambulance_credential_id") is not None:
+            targets.append({"event": "AMBULANCE_ASSIGNMENT", "payload": assignment,
+                            "user_id": notification["ambulance_credential_id"], "role": "ambulance"})
+
+    results = await notifier.notify(targets)
+    delivered = sum(1 for r in results if r["delivered"])
+    logger.info("Batch assignment notifications sent: %d/%d delivered", delivered, len(results))
+    return results
+
 @sio.event
 async def my_event(sid, data):
-    print(f"📦 Received data from {sid}: {data}")
+    logger.debug("Received data from %s: %s", sid, data, extra={"event": "socket_data"})
     await sio.emit("response", {"data": "Message received!"}, to=sid)
 
+@sio.event
+async def get_pending_sos(sid, data):
+    """
+    Get pending SOS requests for a hospital from the in-memory queue
+    data should contain: {hospital_id, limit?}
+    """
+    try:
+        hospital_id = data.get("hospital_id")
+        if not hospital_id:
+            await sio.emit("pending_sos_error", {"error": "Missing hospital_id"}, to=sid)
+            return
+        
+        limit = min(int(data.get("limit", 50)), 200)
+        from app.services.socket_log import get_pending_sos_requests
+        # The session only connects when the pending queue hasn't been loaded yet
+        with session_scope() as db:
+            pending = get_pending_sos_requests(db, int(hospital_id), limit)
+        
+        await sio.emit("pending_sos", {
+            "hospital_id": hospital_id,
+            "requests": pending
+        }, to=sid)
+        
+    except Exception as e:
+        logger.error("Error getting pending SOS requests: %s", e)
+        await sio.emit("pending_sos_error", {"error": str(e)}, to=sid)
+
 @sio.event
 async def get_available_doctors(sid, data):
     """
@@ -641,21 +859,21 @@ async def get_available_doctors(sid, data):
     data should contain: {hospital_id}
     """
     try:
-        print(f"👨‍⚕️ Get available doctors request from {sid}: {data}")
+        logger.info("Get available doctors request from %s: %s", sid, data)
         
         hospital_id = data.get("hospital_id")
         if not hospital_id:
             await sio.emit("available_doctors_error", {"error": "Missing hospital_id"}, to=sid)
             return
         
-        # Get database session
-        db = next(get_db())
-        
         # Get available doctors for the hospital
         from app.services.doctor import get_doctors_by_hospital
-        doctors = get_doctors_by_hospital(db, hospital_id)
+        from app.services.availability import get_busy_doctors
+        with session_scope() as db:
+            doctors = get_doctors_by_hospital(db, hospital_id)
+            busy = get_busy_doctors(db, hospital_id)
         
-        # Filter only available doctors (you might want to add availability status to doctor model)
+        # Availability comes from the hospital's busy map (one query for all doctors)
         available_doctors = []
         for doctor in doctors:
             available_doctors.append({
@@ -665,7 +883,8 @@ async def get_available_doctors(sid, data):
                 "specialization": doctor.specialization,
                 "phone": doctor.phone_number,
                 "email": doctor.email,
-                "is_available": True  # You can add availability logic here
+                "is_available": doctor.id not in busy,
+                "active_assignment_id": busy.get(doctor.id)
             })
         
         await sio.emit("available_doctors", {
@@ -673,10 +892,10 @@ async def get_available_doctors(sid, data):
             "doctors": available_doctors
         }, to=sid)
         
-        print(f"✅ Sent {len(available_doctors)} available doctors to {sid}")
+        logger.info("Sent %d available doctors to %s", len(available_doctors), sid)
         
     except Exception as e:
-        print(f"❌ Error getting available doctors: {e}")
+        logger.error("Error getting available doctors: %s", e)
         await sio.emit("available_doctors_error", {"error": str(e)}, to=sid)
 
 @sio.event
@@ -686,21 +905,21 @@ async def get_available_ambulances(sid, data):
     data should contain: {hospital_id}
     """
     try:
-        print(f"🚑 Get available ambulances request from {sid}: {data}")
+        logger.info("Get available ambulances request from %s: %s", sid, data)
         
         hospital_id = data.get("hospital_id")
         if not hospital_id:
             await sio.emit("available_ambulances_error", {"error": "Missing hospital_id"}, to=sid)
             return
         
-        # Get database session
-        db = next(get_db())
-        
         # Get available ambulances for the hospital
         from app.services.ambulance import get_ambulances_by_hospital
-        ambulances = get_ambulances_by_hospital(db, hospital_id)
+        from app.services.availability import get_busy_ambulances
+        with session_scope() as db:
+            ambulances = get_ambulances_by_hospital(db, hospital_id)
+            busy = get_busy_ambulances(db, hospital_id)
         
-        # Filter only available ambulances (you might want to add availability status to ambulance model)
+        # Availability comes from the hospital's busy map (one query for all ambulances)
         available_ambulances = []
         for ambulance in ambulances:
             available_ambulances.append({
@@ -710,7 +929,8 @@ async def get_available_ambulances(sid, data):
                 "driver_name": ambulance.driver_name,
                 "driver_phone": ambulance.driver_phone,
                 "vehicle_type": ambulance.vehicle_type,
-                "is_available": True  # You can add availability logic here
+                "is_available": ambulance.id not in busy,
+                "active_assignment_id": busy.get(ambulance.id)
             })
         
         await sio.emit("available_ambulances", {
@@ -718,10 +938,10 @@ async def get_available_ambulances(sid, data):
             "ambulances": available_ambulances
         }, to=sid)
         
-        print(f"✅ Sent {len(available_ambulances)} available ambulances to {sid}")
+        logger.info("Sent %d available ambulances to %s", len(available_ambulances), sid)
         
     except Exception as e:
-        print(f"❌ Error getting available ambulances: {e}")
+        logger.error("Error getting available ambulances: %s", e)
         await sio.emit("available_ambulances_error", {"error": str(e)}, to=sid)
 
 @sio.event
@@ -734,7 +954,7 @@ async def assign_doctor_and_ambulance(sid, data):
     log_id = None
     
     try:
-        print(f"👨‍⚕️🚑 Assign doctor and ambulance request from {sid}: {data}")
+        logger.info("Assign doctor and ambulance request from %s: %s", sid, data)
         
         patient_id = data.get("patient_id")
         hospital_id = data.get("hospital_id")
@@ -749,7 +969,7 @@ async def assign_doctor_and_ambulance(sid, data):
             return
         
         # Get database session
-        db = next(get_db())
+        db = SessionLocal()
         
         # Log the assignment
         try:
@@ -766,193 +986,148 @@ async def assign_doctor_and_ambulance(sid, data):
             )
             log_id = socket_log.id
         except Exception as e:
-            print(f"❌ Error logging assignment: {e}")
-        
-        # Get doctor and ambulance details
-        from app.services.doctor import get_doctor_by_id
-        from app.services.ambulance import get_ambulance_by_id
-        
-        doctor = get_doctor_by_id(db, doctor_id)
-        ambulance = get_ambulance_by_id(db, ambulance_id)
+            logger.error("Error logging assignment: %s", e)
         
-        # Verify credential IDs match
-        if not doctor or not ambulance:
-            await sio.emit("assignment_error", {"error": "Doctor or ambulance not found"}, to=sid)
-            return
+        try:
+            # Get doctor and ambulance details
+            from app.services.doctor import get_doctor_by_id
+            from app.services.ambulance import get_ambulance_by_id
         
-        if doctor.credential_id != doctor_credential_id:
-            await sio.emit("assignment_error", {"error": "Doctor credential ID mismatch"}, to=sid)
-            return
+            doctor = get_doctor_by_id(db, doctor_id)
+            ambulance = get_ambulance_by_id(db, ambulance_id)
         
-        if ambulance.credential_id != ambulance_credential_id:
-            await sio.emit("assignment_error", {"error": "Ambulance credential ID mismatch"}, to=sid)
-            return
-        
-        # Find patient's socket (accept either credential_id or patient table id) and be tolerant of int/str keys
-        candidate_keys = []
-        # Original value
-        candidate_keys.append(patient_id)
-        # String form
-        try:
-            candidate_keys.append(str(patient_id))
-        except Exception:
-            pass
-        # Int form
-        try:
-            candidate_keys.append(int(patient_id))
-        except Exception:
-            pass
-
-        # Attempt to map patient DB id -> credential_id
-        mapped_user_id = None
-        try:
-            from app.db.models.patient import Patient as PatientModel
-            maybe_int_id = int(patient_id)
-            patient_row = db.query(PatientModel).filter(PatientModel.id == maybe_int_id).first()
-            if patient_row:
-                mapped_user_id = patient_row.credential_id
-        except Exception:
-            pass
-        if mapped_user_id is not None:
-            candidate_keys.extend([mapped_user_id])
-            try:
-                candidate_keys.append(str(mapped_user_id))
-            except Exception:
-                pass
-
-        # Resolve the first matching key
-        resolved_key = None
-        for key in candidate_keys:
-            if key in connected_users:
-                resolved_key = key
-                break
-
-        if resolved_key is None:
-            print(f"⚠️ Patient {patient_id} is not connected")
-            await sio.emit("assignment_error", {"error": "Patient not connected"}, to=sid)
-            return
-
-        patient_socket_data = connected_users[resolved_key]
+            # Verify credential IDs match
+            if not doctor or not ambulance:
+                await sio.emit("assignment_error", {"error": "Doctor or ambulance not found"}, to=sid)
+                return
         
-        # Send assignment confirmation to patient
-        assignment_data = {
-            "message": "Doctor and ambulance have been assigned to your case!",
-            "doctor": {
-                "id": doctor.id,
-                "name": doctor.name,
-                "specialization": doctor.specialization,
-                "phone": doctor.phone_number
-            },
-            "ambulance": {
-                "id": ambulance.id,
-                "ambulance_number": ambulance.ambulance_number,
-                "driver_name": ambulance.driver_name,
-                "driver_phone": ambulance.driver_phone,
-                "vehicle_type": ambulance.vehicle_type
-            },
-            "estimated_arrival": case_details.get("estimated_arrival"),
-            "case_details": case_details
-        }
+            if doctor.credential_id != doctor_credential_id:
+                await sio.emit("assignment_error", {"error": "Doctor credential ID mismatch"}, to=sid)
+                return
         
-        await sio.emit("doctor_ambulance_assigned", assignment_data, to=patient_socket_data["socket_id"])
-        print(f"✅ Doctor and ambulance assignment sent to patient {patient_id}")
+            if ambulance.credential_id != ambulance_credential_id:
+                await sio.emit("assignment_error", {"error": "Ambulance credential ID mismatch"}, to=sid)
+                return
         
-        # Also notify doctor and ambulance in real-time if they are connected
-        try:
-            # Resolve doctor socket across possible key types (int/str)
-            doctor_candidate_keys = []
-            doctor_candidate_keys.append(doctor_credential_id)
+            # Find patient's socket (accept either credential_id or patient table id) and be tolerant of int/str keys
+            candidate_keys = []
+            # Original value
+            candidate_keys.append(patient_id)
+            # String form
             try:
-                doctor_candidate_keys.append(str(doctor_credential_id))
+                candidate_keys.append(str(patient_id))
             except Exception:
                 pass
+            # Int form
             try:
-                doctor_candidate_keys.append(int(doctor_credential_id))
+                candidate_keys.append(int(patient_id))
             except Exception:
                 pass
 
-            doctor_socket = None
-            for key in doctor_candidate_keys:
-                socket_data = connected_users.get(key)
-                if socket_data:
-                    doctor_socket = socket_data
-                    break
-
-            if doctor_socket and doctor_socket.get("role") == "doctor":
-                await sio.emit("doctor_case_assigned", {
-                    "message": "You have been assigned a new SOS case.",
-                    "patient_id": patient_id,
-                    "hospital_id": hospital_id,
-                    "case_details": case_details
-                }, to=doctor_socket["socket_id"]) 
-                print(f"✅ Assignment notification sent to doctor {doctor.id}")
-            else:
-                print(f"ℹ️ Doctor credential {doctor_credential_id} is not connected; skipped realtime notify")
-        except Exception as e:
-            print(f"❌ Error notifying doctor: {e}")
-
-        try:
-            # Resolve ambulance socket across possible key types (int/str)
-            ambulance_candidate_keys = []
-            ambulance_candidate_keys.append(ambulance_credential_id)
+            # Attempt to map patient DB id -> credential_id
+            mapped_user_id = None
             try:
-                ambulance_candidate_keys.append(str(ambulance_credential_id))
-            except Exception:
-                pass
-            try:
-                ambulance_candidate_keys.append(int(ambulance_credential_id))
+                from app.db.models.patient import Patient as PatientModel
+                maybe_int_id = int(patient_id)
+                patient_row = db.query(PatientModel).filter(PatientModel.id == maybe_int_id).first()
+                if patient_row:
+                    mapped_user_id = patient_row.credential_id
             except Exception:
                 pass
+            if mapped_user_id is not None:
+                candidate_keys.extend([mapped_user_id])
+                try:
+                    candidate_keys.append(str(mapped_user_id))
+                except Exception:
+                    pass
 
-            ambulance_socket = None
-            for key in ambulance_candidate_keys:
-                socket_data = connected_users.get(key)
-                if socket_data:
-                    ambulance_socket = socket_data
+            # Resolve the first matching key
+            resolved_key = None
+            for key in candidate_keys:
+                if key in connected_users:
+                    resolved_key = key
                     break
 
-            if ambulance_socket and ambulance_socket.get("role") == "ambulance":
-                await sio.emit("ambulance_case_assigned", {
-                    "message": "You have been assigned a new SOS case.",
-                    "patient_id": patient_id,
-                    "hospital_id": hospital_id,
-                    "case_details": case_details
-                }, to=ambulance_socket["socket_id"]) 
-                print(f"✅ Assignment notification sent to ambulance {ambulance.id}")
+            patient_connected = resolved_key is not None
+            if not patient_connected:
+                # Queued for the patient's next connect (keyed by credential id, like connected_users)
+                resolved_key = str(mapped_user_id if mapped_user_id is not None else patient_id)
+                logger.warning("Patient %s is not connected; assignment queued in offline inbox", patient_id)
+
+            # The patient's confirmation is acked and retried; the rest is built up front
+            # and delivered in one concurrent fan-out where offline targets are skipped
+            assignment_data = {
+                "message": "Doctor and ambulance have been assigned to your case!",
+                "doctor": {
+                    "id": doctor.id,
+                    "name": doctor.name,
+                    "specialization": doctor.specialization,
+                    "phone": doctor.phone_number
+                },
+                "ambulance": {
+                    "id": ambulance.id,
+                    "ambulance_number": ambulance.ambulance_number,
+                    "driver_name": ambulance.driver_name,
+                    "driver_phone": ambulance.driver_phone,
+                    "vehicle_type": ambulance.vehicle_type
+                },
+                "estimated_arrival": case_details.get("estimated_arrival"),
+                "case_details": case_details
+            }
+            case_assigned = {
+                "message": "You have been assigned a new SOS case.",
+                "patient_id": patient_id,
+                "hospital_id": hospital_id,
+                "case_details": case_details
+            }
+            if patient_connected:
+                reliable_delivery.send(resolved_key, "doctor_ambulance_assigned", assignment_data, socket_log_id=log_id)
             else:
-                print(f"ℹ️ Ambulance credential {ambulance_credential_id} is not connected; skipped realtime notify")
-        except Exception as e:
-            print(f"❌ Error notifying ambulance: {e}")
-        
-        # Update log with success
-        if log_id:
-            response_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-            update_socket_log(
-                db, log_id, 
-                status="success", 
-                response_time_ms=response_time,
-                response_data=assignment_data
-            )
+                await asyncio.to_thread(offline_inbox.store, resolved_key, "doctor_ambulance_assigned", assignment_data)
+            targets = [
+                {"event": "doctor_case_assigned", "payload": case_assigned,
+                 "user_id": doctor_credential_id, "role": "doctor"},
+                {"event": "ambulance_case_assigned", "payload": case_assigned,
+                 "user_id": ambulance_credential_id, "role": "ambulance"},
+                # Ack to hospital
+                {"event": "assignment_success", "payload": {
+                    "message": "Doctor and ambulance assigned successfully",
+                    "patient_id": patient_id,
+                    "doctor_id": doctor_id,
+                    "doctor_credential_id": doctor_credential_id,
+                    "ambulance_id": ambulance_id,
+                    "ambulance_credential_id": ambulance_credential_id,
+                    "patient_connected": patient_connected
+                }, "sid": sid},
+            ]
+            delivery = await notifier.notify(targets)
+            for result in delivery:
+                if result["delivered"]:
+                    logger.info("%s sent to %s", result['event'], result['user_id'] or result['sid'])
+                else:
+                    logger.info("%s not delivered to %s: %s", result['event'], result['user_id'] or result['sid'], result['error'])
         
-        # Send success response to hospital
-        await sio.emit("assignment_success", {
-            "message": "Doctor and ambulance assigned successfully",
-            "patient_id": patient_id,
-            "doctor_id": doctor_id,
-            "doctor_credential_id": doctor_credential_id,
-            "ambulance_id": ambulance_id,
-            "ambulance_credential_id": ambulance_credential_id
-        }, to=sid)
+            # Update log with success
+            if log_id:
+                response_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+                update_socket_log(
+                    db, log_id, 
+                    status="success", 
+                    response_time_ms=response_time,
+                    response_data={**assignment_data, "delivery": delivery}
+                )
+        finally:
+            db.close()
         
     except Exception as e:
-        print(f"❌ Error assigning doctor and ambulance: {e}")
+        logger.error("Error assigning doctor and ambulance: %s", e)
         
         # Update log with error
         if log_id:
             try:
-                db = next(get_db())
-                update_socket_log(db, log_id, status="failed", error_message=str(e))
+                with session_scope() as db:
+                    update_socket_log(db, log_id, status="failed", error_message=str(e))
             except Exception as log_error:
-                print(f"❌ Error updating log: {log_error}")
+                logger.error("Error updating log: %s", log_error)
         
         await sio.emit("assignment_error", {"error": str(e)}, to=sid)
\ No newline at end of file
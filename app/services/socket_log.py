@@ -1,9 +1,44 @@
 # app/services/socket_log.py
-from sqlalchemy.orm import Session
+import heapq
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Query, Session, load_only
 from sqlalchemy import desc, and_, or_, func
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+from app.core.serialization import dump_list, parse_fields, projection_model
+from app.db.session import read_session_scope
 from app.db.models.socket_log import SocketLog
+from app.schemas.socket_log import SocketLogOut
+from app.services.sos_queue import pending_sos_condition, pending_sos_queue, sos_queue_key
+
+# Full JSON payloads; list queries only load them when a response asks for them
+PAYLOAD_FIELDS = ("event_data", "request_data", "response_data")
+
+
+def select_socket_log_fields(
+    fields: Optional[str] = None,
+    exclude_payloads: bool = False
+) -> Optional[Tuple[str, ...]]:
+    """
+    SocketLogOut fields for a sparse response (?fields= and/or
+    ?exclude_payloads=true), or None for every field
+    """
+    selected = parse_fields(fields, SocketLogOut)
+    if exclude_payloads:
+        selected = tuple(f for f in (selected or SocketLogOut.model_fields) if f not in PAYLOAD_FIELDS)
+        if not selected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No fields left after excluding payloads"
+            )
+    return selected
+
+
+def _only(query: Query, fields: Optional[Tuple[str, ...]]) -> Query:
+    """Select only these columns (plus the primary key) in SQL; the rest stay deferred."""
+    if fields:
+        query = query.options(load_only(*(getattr(SocketLog, f) for f in fields)))
+    return query
 
 
 def create_socket_log(
@@ -123,6 +158,8 @@ def update_socket_log(
     
     db.commit()
     db.refresh(socket_log)
+    if sos_status:
+        pending_sos_queue.sync(socket_log)
     return socket_log
 
 
@@ -130,26 +167,30 @@ def get_socket_logs_by_user(
     db: Session,
     user_id: str,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None,
+    event_type: Optional[str] = None
 ) -> List[SocketLog]:
     """
     Get socket logs for a specific user
     """
-    return db.query(SocketLog).filter(
-        SocketLog.user_id == user_id
-    ).order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
+    query = db.query(SocketLog).filter(SocketLog.user_id == user_id)
+    if event_type:
+        query = query.filter(SocketLog.event_type == event_type)
+    return _only(query, fields).order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
 
 
 def get_socket_logs_by_event_type(
     db: Session,
     event_type: str,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> List[SocketLog]:
     """
     Get socket logs by event type
     """
-    return db.query(SocketLog).filter(
+    return _only(db.query(SocketLog), fields).filter(
         SocketLog.event_type == event_type
     ).order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
 
@@ -161,7 +202,8 @@ def get_ambulance_requests(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> List[SocketLog]:
     """
     Get ambulance request logs with optional filtering
@@ -177,7 +219,7 @@ def get_ambulance_requests(
     if end_date:
         query = query.filter(SocketLog.created_at <= end_date)
     
-    return query.order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
+    return _only(query, fields).order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
 
 
 def get_hospital_responses(
@@ -187,7 +229,8 @@ def get_hospital_responses(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> List[SocketLog]:
     """
     Get hospital response logs with optional filtering
@@ -203,7 +246,7 @@ def get_hospital_responses(
     if end_date:
         query = query.filter(SocketLog.created_at <= end_date)
     
-    return query.order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
+    return _only(query, fields).order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
 
 
 def get_socket_logs_by_time_range(
@@ -213,7 +256,8 @@ def get_socket_logs_by_time_range(
     event_types: Optional[List[str]] = None,
     user_roles: Optional[List[str]] = None,
     limit: int = 1000,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> List[SocketLog]:
     """
     Get socket logs within a time range with optional filtering
@@ -230,7 +274,45 @@ def get_socket_logs_by_time_range(
     if user_roles:
         query = query.filter(SocketLog.user_role.in_(user_roles))
     
-    return query.order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
+    return _only(query, fields).order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
+
+
+def iter_socket_logs_ndjson(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    event_types: Optional[List[str]] = None,
+    user_roles: Optional[List[str]] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+    batch_size: int = 1000
+) -> Iterator[bytes]:
+    """
+    Socket logs as NDJSON, oldest first, one chunk per batch of rows.
+    Uses its own session (the request's is closed before streaming starts)
+    and keyset batches on id, so memory stays bounded for any export size.
+    """
+    schema = projection_model(SocketLogOut, fields) if fields else SocketLogOut
+    with read_session_scope() as db:
+        query = _only(db.query(SocketLog), fields)
+        if start_date:
+            query = query.filter(SocketLog.created_at >= start_date)
+        if end_date:
+            query = query.filter(SocketLog.created_at <= end_date)
+        if event_types:
+            query = query.filter(SocketLog.event_type.in_(event_types))
+        if user_roles:
+            query = query.filter(SocketLog.user_role.in_(user_roles))
+
+        last_id = 0
+        while True:
+            logs = query.filter(SocketLog.id > last_id).order_by(SocketLog.id).limit(batch_size).all()
+            if not logs:
+                return
+            last_id = logs[-1].id
+            yield b"".join(
+                schema.model_validate(log, from_attributes=True).model_dump_json().encode() + b"\n"
+                for log in logs
+            )
+            db.expunge_all()
 
 
 def get_socket_statistics(
@@ -371,6 +453,7 @@ def accept_sos_request(
     
     db.commit()
     db.refresh(socket_log)
+    pending_sos_queue.remove(socket_log.id)
     return socket_log
 
 
@@ -407,6 +490,7 @@ def reject_sos_request(
     
     db.commit()
     db.refresh(socket_log)
+    pending_sos_queue.remove(socket_log.id)
     return socket_log
 
 
@@ -432,6 +516,7 @@ def expire_sos_request(
     
     db.commit()
     db.refresh(socket_log)
+    pending_sos_queue.remove(socket_log.id)
     return socket_log
 
 
@@ -442,7 +527,8 @@ def get_sos_requests_by_status(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> List[SocketLog]:
     """
     Get SOS requests filtered by status
@@ -461,7 +547,7 @@ def get_sos_requests_by_status(
     if end_date:
         query = query.filter(SocketLog.created_at <= end_date)
     
-    return query.order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
+    return _only(query, fields).order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
 
 
 def get_sos_statistics(
@@ -663,7 +749,8 @@ def get_sos_requests_by_hospital(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> List[SocketLog]:
     """
     Get SOS requests for a specific hospital
@@ -682,25 +769,32 @@ def get_sos_requests_by_hospital(
     if end_date:
         query = query.filter(SocketLog.created_at <= end_date)
     
-    return query.order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
+    return _only(query, fields).order_by(desc(SocketLog.created_at)).offset(offset).limit(limit).all()
 
 
 def get_pending_sos_requests(
     db: Session,
     hospital_id: Optional[int] = None,
-    limit: int = 50
-) -> List[SocketLog]:
-    """
-    Get pending SOS requests that need attention
-    """
-    query = db.query(SocketLog).filter(
-        and_(
-            SocketLog.event_type == "ambulance_request",
-            SocketLog.sos_status == "pending"
-        )
-    )
-    
-    if hospital_id:
+    limit: int = 50,
+    fields: Optional[Tuple[str, ...]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get pending SOS requests that need attention, as SocketLogOut dicts
+    (only `fields` when given). Served from the in-memory pending queue once
+    it has been loaded at startup, from the database before that.
+    """
+    if pending_sos_queue.loaded:
+        rows = pending_sos_queue.get_pending(hospital_id, limit)
+        # Queue entries are SocketLogOut dicts already
+        return rows if not fields else dump_list(SocketLogOut, rows, fields)
+    
+    # Same rows and (priority, created_at, id) order as the queue; the
+    # priority lives in request_data, so rows are ranked here, not in SQL
+    query = db.query(SocketLog).filter(pending_sos_condition())
+    if hospital_id is not None:
         query = query.filter(SocketLog.hospital_id == hospital_id)
-    
-    return query.order_by(SocketLog.created_at).limit(limit).all() 
\ No newline at end of file
+    if fields:
+        fields_and_key = tuple(dict.fromkeys(fields + ("created_at", "request_data")))
+        query = _only(query, fields_and_key)
+    rows = heapq.nsmallest(limit, query.all(), key=sos_queue_key)
+    return dump_list(SocketLogOut, rows, fields) 
\ No newline at end of file
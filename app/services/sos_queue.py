@@ -0,0 +1,198 @@
+# app/services/sos_queue.py
+import asyncio
+import heapq
+import logging
+import threading
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app.db.models.socket_log import SocketLog
+from app.db.session import session_scope
+from app.schemas.socket_log import SocketLogOut
+
+logger = logging.getLogger(__name__)
+
+# Lower rank is served first
+PRIORITY_RANKS = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+DEFAULT_PRIORITY = "medium"
+
+QueueKey = Tuple[int, float, int]
+
+
+def get_sos_priority(socket_log: SocketLog) -> str:
+    """
+    Priority sent by the patient app in emergency_details, if any.
+    """
+    details = socket_log.request_data or {}
+    priority = str(details.get("priority") or details.get("priority_level") or DEFAULT_PRIORITY).lower()
+    return priority if priority in PRIORITY_RANKS else DEFAULT_PRIORITY
+
+
+def pending_sos_condition():
+    """SQL filter for the rows the queue holds: pending SOS requests routed to a hospital."""
+    return and_(
+        SocketLog.event_type == "ambulance_request",
+        SocketLog.sos_status == "pending",
+        SocketLog.hospital_id.isnot(None)
+    )
+
+
+def sos_queue_key(socket_log: SocketLog) -> QueueKey:
+    """Queue order of a pending SOS row: (priority rank, created_at, id)."""
+    created_at = socket_log.created_at.timestamp() if socket_log.created_at else 0.0
+    return PRIORITY_RANKS[get_sos_priority(socket_log)], created_at, socket_log.id
+
+
+class PendingSOSQueue:
+    """
+    In-memory view of pending SOS requests (socket_logs rows with
+    sos_status='pending'), kept per hospital in (priority, created_at, id)
+    order so the pending endpoints can read the first k in O(k) without
+    touching the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # hospital_id -> sorted list of queue keys
+        self._by_hospital: Dict[int, List[QueueKey]] = {}
+        # socket_log_id -> (hospital_id, key, serialized row)
+        self._entries: Dict[int, Tuple[int, QueueKey, Dict[str, Any]]] = {}
+        # Hook updates made while a reload query is in flight; they are newer
+        # than the rows the reload reads and are re-applied on top of them
+        self._changes_during_reload: Optional[Dict[int, Optional[Tuple[int, QueueKey, Dict[str, Any]]]]] = None
+        self.loaded = False
+
+    @staticmethod
+    def _is_pending(socket_log: SocketLog) -> bool:
+        return (
+            socket_log.event_type == "ambulance_request"
+            and socket_log.sos_status == "pending"
+            and socket_log.hospital_id is not None
+        )
+
+    @staticmethod
+    def _make_entry(socket_log: SocketLog) -> Tuple[int, QueueKey, Dict[str, Any]]:
+        key = sos_queue_key(socket_log)
+        snapshot = SocketLogOut.model_validate(socket_log).model_dump(mode="json")
+        return socket_log.hospital_id, key, snapshot
+
+    def _remove_locked(self, socket_log_id: int) -> bool:
+        entry = self._entries.pop(socket_log_id, None)
+        if entry is None:
+            return False
+        hospital_id, key, _ = entry
+        keys = self._by_hospital.get(hospital_id, [])
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
+        if not keys:
+            self._by_hospital.pop(hospital_id, None)
+        return True
+
+    def _insert_locked(self, entry: Tuple[int, QueueKey, Dict[str, Any]]) -> None:
+        hospital_id, key, _ = entry
+        self._entries[key[2]] = entry
+        insort(self._by_hospital.setdefault(hospital_id, []), key)
+
+    def sync(self, socket_log: SocketLog) -> None:
+        """
+        Apply the current state of a socket log row: queue it if it is a
+        pending SOS, drop it otherwise.
+        """
+        entry = self._make_entry(socket_log) if self._is_pending(socket_log) else None
+        with self._lock:
+            self._remove_locked(socket_log.id)
+            if entry is not None:
+                self._insert_locked(entry)
+            if self._changes_during_reload is not None:
+                self._changes_during_reload[socket_log.id] = entry
+
+    def remove(self, socket_log_id: int) -> bool:
+        with self._lock:
+            if self._changes_during_reload is not None:
+                self._changes_during_reload[socket_log_id] = None
+            return self._remove_locked(socket_log_id)
+
+    def get_pending(self, hospital_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Pending SOS rows in queue order. Reads the first `limit` keys of the
+        hospital's list, or lazily merges all hospitals when hospital_id is None.
+        """
+        with self._lock:
+            if hospital_id is not None:
+                keys = self._by_hospital.get(hospital_id, [])[:limit]
+            else:
+                keys = list(islice(heapq.merge(*self._by_hospital.values()), limit))
+            return [self._entries[key[2]][2] for key in keys]
+
+    def count(self, hospital_id: Optional[int] = None) -> int:
+        with self._lock:
+            if hospital_id is not None:
+                return len(self._by_hospital.get(hospital_id, []))
+            return len(self._entries)
+
+    def begin_reload(self) -> None:
+        """Call before reading the rows passed to replace_all()."""
+        with self._lock:
+            self._changes_during_reload = {}
+
+    def replace_all(self, socket_logs: Iterable[SocketLog]) -> Dict[str, int]:
+        """
+        Rebuild the queue from authoritative rows and report how far the
+        in-memory state had drifted.
+        """
+        entries = {entry[1][2]: entry for entry in (
+            self._make_entry(log) for log in socket_logs if self._is_pending(log)
+        )}
+        with self._lock:
+            for socket_log_id, entry in (self._changes_during_reload or {}).items():
+                if entry is None:
+                    entries.pop(socket_log_id, None)
+                else:
+                    entries[socket_log_id] = entry
+            self._changes_during_reload = None
+
+            stale_ids = set(self._entries) - set(entries)
+            missing_ids = set(entries) - set(self._entries)
+            self._by_hospital = {}
+            self._entries = {}
+            for entry in entries.values():
+                self._insert_locked(entry)
+            self.loaded = True
+        return {"pending": len(entries), "added": len(missing_ids), "removed": len(stale_ids)}
+
+
+pending_sos_queue = PendingSOSQueue()
+
+
+def load_pending_sos_queue(db: Session) -> Dict[str, int]:
+    """
+    (Re)load the queue from socket_logs.
+    """
+    pending_sos_queue.begin_reload()
+    rows = db.query(SocketLog).filter(pending_sos_condition()).all()
+    return pending_sos_queue.replace_all(rows)
+
+
+def _reconcile_pending_sos_queue() -> Dict[str, int]:
+    with session_scope() as db:
+        return load_pending_sos_queue(db)
+
+
+async def run_pending_sos_reconciliation(interval_seconds: float):
+    """
+    Background job: periodically rebuild the queue from the database to fix
+    drift (changes made by other workers, direct DB edits, missed hooks).
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            drift = await asyncio.to_thread(_reconcile_pending_sos_queue)
+            if drift["added"] or drift["removed"]:
+                logger.info("Pending SOS queue reconciled: %s", drift)
+        except Exception as e:
+            logger.error("Error reconciling pending SOS queue: %s", e)
@@ -0,0 +1,230 @@
+# app/services/tracking.py
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+import socketio
+
+from app.db.models.ambulance import Ambulance
+from app.db.models.doctor import Doctor
+from app.db.models.hospital import Hospital
+from app.db.models.patient import Patient
+from app.db.models.patient_assignment import PatientAssignment
+from app.db.models.socket_log import SocketLog
+from app.db.session import session_scope
+from app.services.availability import ambulance_busy_conditions
+from app.services.geo import haversine_km
+from app.services.location import LocationStore
+from app.services.socket_log import create_socket_log
+
+logger = logging.getLogger(__name__)
+
+
+def assignment_room(assignment_id) -> str:
+    """Socket.IO room of everyone following an assignment (patient, hospital)."""
+    return f"assignment:{assignment_id}"
+
+
+def _resolve_assignment(ambulance_id: int, credential_id: str, assignment_id: Optional[int]) -> Optional[Dict]:
+    """
+    The assignment an ambulance is reporting for, with what the ETA needs:
+    the patient's user id (live location) and the SOS coordinates (fallback).
+    None when the ambulance doesn't belong to the caller or has no assignment.
+    """
+    with session_scope() as db:
+        ambulance = db.query(Ambulance).filter(Ambulance.id == ambulance_id).first()
+        if not ambulance or str(ambulance.credential_id) != str(credential_id):
+            return None
+
+        query = db.query(PatientAssignment).filter(PatientAssignment.ambulance_id == ambulance_id)
+        if assignment_id is not None:
+            query = query.filter(PatientAssignment.id == assignment_id)
+        else:
+            query = query.filter(*ambulance_busy_conditions())
+        assignment = query.order_by(PatientAssignment.created_at.desc()).first()
+        if not assignment:
+            return None
+
+        patient = db.query(Patient).filter(Patient.id == assignment.patient_id).first()
+        sos = None
+        if assignment.sos_request_id:
+            sos = db.query(SocketLog).filter(SocketLog.id == assignment.sos_request_id).first()
+
+        def _coordinate(value):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+
+        return {
+            "assignment_id": assignment.id,
+            "ambulance_credential_id": str(ambulance.credential_id),
+            "patient_user_id": str(patient.credential_id) if patient and patient.credential_id else None,
+            "sos_latitude": _coordinate(sos.patient_latitude) if sos else None,
+            "sos_longitude": _coordinate(sos.patient_longitude) if sos else None,
+        }
+
+
+def can_follow_assignment(assignment_id: int, user_id: str, role: str) -> bool:
+    """
+    Whether a connected user may join an assignment's tracking room: its
+    patient, its hospital, or its doctor/ambulance.
+    """
+    with session_scope() as db:
+        assignment = db.query(PatientAssignment).filter(PatientAssignment.id == assignment_id).first()
+        if not assignment:
+            return False
+        owners = {
+            "patient": (Patient, assignment.patient_id),
+            "hospital": (Hospital, assignment.hospital_id),
+            "doctor": (Doctor, assignment.doctor_id),
+            "ambulance": (Ambulance, assignment.ambulance_id),
+        }
+        if role not in owners or owners[role][1] is None:
+            return False
+        model, owner_id = owners[role]
+        credential_id = db.query(model.credential_id).filter(model.id == owner_id).scalar()
+        return credential_id is not None and str(credential_id) == str(user_id)
+
+
+def _persist_points(points: List[Dict]) -> None:
+    with session_scope() as db:
+        for point in points:
+            create_socket_log(
+                db=db,
+                event_type="ambulance_location",
+                socket_id=point["sid"],
+                user_id=point["ambulance_credential_id"],
+                user_role="ambulance",
+                event_data=point["event"],
+                status="success",
+            )
+
+
+class AmbulanceTracker:
+    """
+    Live ambulance positions for the patient and hospital of an assignment.
+
+    Every ping is recorded in the location store, but broadcasts are
+    coalesced: a background ticker sends only the latest position of each
+    ambulance that moved since the last tick, to its assignment room, so the
+    broadcast rate per assignment is capped at one per tick. Points are
+    persisted (as socket logs) at most once per persist interval and only
+    after moving persist_min_distance_m.
+    """
+
+    def __init__(
+        self,
+        sio: socketio.AsyncServer,
+        store: LocationStore,
+        tick_seconds: float,
+        persist_interval_seconds: float,
+        persist_min_distance_m: float,
+        default_speed_kmh: float,
+        assignment_cache_seconds: float,
+    ):
+        self.sio = sio
+        self.store = store
+        self.tick_seconds = tick_seconds
+        self.persist_interval_seconds = persist_interval_seconds
+        self.persist_min_distance_m = persist_min_distance_m
+        self.default_speed_mps = default_speed_kmh / 3.6
+        self.assignment_cache_seconds = assignment_cache_seconds
+        # ambulance_id -> latest unbroadcast ping {sid, latitude, longitude}
+        self._dirty: Dict[int, Dict] = {}
+        # ambulance_id -> (resolved_at, assignment info)
+        self._assignments: Dict[int, tuple] = {}
+        # ambulance_id -> (persisted_at, latitude, longitude)
+        self._persisted: Dict[int, tuple] = {}
+
+    async def assignment_for(self, ambulance_id: int, credential_id: str, assignment_id: Optional[int] = None) -> Optional[Dict]:
+        cached = self._assignments.get(ambulance_id)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.assignment_cache_seconds and (
+            assignment_id is None or cached[1]["assignment_id"] == assignment_id
+        ):
+            return cached[1]
+        info = await asyncio.to_thread(_resolve_assignment, ambulance_id, credential_id, assignment_id)
+        if info is None:
+            self._assignments.pop(ambulance_id, None)
+            return None
+        self._assignments[ambulance_id] = (now, info)
+        return info
+
+    def record(self, ambulance_id: int, sid: str, latitude: float, longitude: float) -> None:
+        """Store a ping; it replaces any ping not yet broadcast."""
+        self.store.update("ambulance", ambulance_id, latitude, longitude)
+        self._dirty[ambulance_id] = {"sid": sid, "latitude": latitude, "longitude": longitude}
+
+    def _eta(self, info: Dict, latitude: float, longitude: float, motion: Optional[Dict]) -> Dict:
+        target = self.store.latest("patient", info["patient_user_id"]) if info["patient_user_id"] else None
+        if target:
+            target_lat, target_lon = target["latitude"], target["longitude"]
+        elif info["sos_latitude"] is not None and info["sos_longitude"] is not None:
+            target_lat, target_lon = info["sos_latitude"], info["sos_longitude"]
+        else:
+            return {"distance_m": None, "eta_seconds": None}
+
+        distance_m = haversine_km(latitude, longitude, target_lat, target_lon) * 1000
+        # Rolling speed over the recent fixes; the default covers stops and cold starts
+        speed_mps = motion["speed_mps"] if motion and motion["speed_mps"] >= 1.0 else self.default_speed_mps
+        return {"distance_m": round(distance_m, 1), "eta_seconds": int(distance_m / speed_mps)}
+
+    def _should_persist(self, ambulance_id: int, latitude: float, longitude: float, now: float) -> bool:
+        last = self._persisted.get(ambulance_id)
+        if last is None:
+            return True
+        persisted_at, last_lat, last_lon = last
+        return (
+            now - persisted_at >= self.persist_interval_seconds
+            and haversine_km(last_lat, last_lon, latitude, longitude) * 1000 >= self.persist_min_distance_m
+        )
+
+    async def flush(self) -> int:
+        """Broadcast the latest ping of every ambulance updated since the last tick."""
+        dirty, self._dirty = self._dirty, {}
+        now = time.monotonic()
+        emits = []
+        to_persist = []
+        for ambulance_id, ping in dirty.items():
+            cached = self._assignments.get(ambulance_id)
+            if not cached:
+                continue
+            info = cached[1]
+            motion = self.store.motion("ambulance", ambulance_id)
+            event = {
+                "assignment_id": info["assignment_id"],
+                "ambulance_id": ambulance_id,
+                "latitude": ping["latitude"],
+                "longitude": ping["longitude"],
+                "speed_kmh": motion["speed_kmh"] if motion else None,
+                "heading_degrees": motion["heading_degrees"] if motion else None,
+                **self._eta(info, ping["latitude"], ping["longitude"], motion),
+            }
+            emits.append(self.sio.emit("ambulance_location", event, room=assignment_room(info["assignment_id"])))
+            if self._should_persist(ambulance_id, ping["latitude"], ping["longitude"], now):
+                self._persisted[ambulance_id] = (now, ping["latitude"], ping["longitude"])
+                to_persist.append({
+                    "sid": ping["sid"],
+                    "ambulance_credential_id": info["ambulance_credential_id"],
+                    "event": event,
+                })
+
+        if emits:
+            await asyncio.gather(*emits, return_exceptions=True)
+        if to_persist:
+            try:
+                await asyncio.to_thread(_persist_points, to_persist)
+            except Exception as e:
+                logger.error("Error persisting ambulance locations: %s", e)
+        return len(emits)
+
+    async def run(self) -> None:
+        """Background ticker: one coalesced broadcast round per tick."""
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Error broadcasting ambulance locations: %s", e)
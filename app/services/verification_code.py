@@ -0,0 +1,146 @@
+# app/services/verification_code.py
+import heapq
+import json
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+class VerificationCodeBackend(ABC):
+    """
+    Storage interface for short-lived verification codes.
+    Implementations must expire entries on their own after ttl_seconds.
+    """
+
+    @abstractmethod
+    def set(self, key: str, data: Dict, ttl_seconds: int) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class InMemoryVerificationCodeBackend(VerificationCodeBackend):
+    """
+    Process-local backend. Expiry is driven by a min-heap of deadlines so every
+    operation only pops entries that are already due (amortized O(1) per entry).
+    Only suitable for single-worker deployments.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, Dict]] = {}
+        self._deadlines: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float) -> None:
+        while self._deadlines and self._deadlines[0][0] <= now:
+            expires_at, key = heapq.heappop(self._deadlines)
+            entry = self._entries.get(key)
+            # Skip stale heap nodes left behind by overwrites or deletes
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[key]
+
+    def set(self, key: str, data: Dict, ttl_seconds: int) -> None:
+        now = time.time()
+        expires_at = now + ttl_seconds
+        with self._lock:
+            self._evict_expired(now)
+            self._entries[key] = (expires_at, data)
+            heapq.heappush(self._deadlines, (expires_at, key))
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            return dict(entry[1]) if entry else None
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict_expired(time.time())
+            return len(self._entries)
+
+
+class RedisVerificationCodeBackend(VerificationCodeBackend):
+    """
+    Redis backend shared by all workers. Expiry is delegated to Redis (SETEX).
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def set(self, key: str, data: Dict, ttl_seconds: int) -> None:
+        self._client.setex(key, ttl_seconds, json.dumps(data))
+
+    def get(self, key: str) -> Optional[Dict]:
+        raw = self._client.get(key)
+        return json.loads(raw) if raw else None
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+
+def _build_default_backend() -> VerificationCodeBackend:
+    if settings.REDIS_URL:
+        return RedisVerificationCodeBackend(settings.REDIS_URL)
+    return InMemoryVerificationCodeBackend()
+
+
+default_backend = _build_default_backend()
+
+
+class VerificationCodeStore:
+    """
+    Verification codes for one account type (e.g. "doctor", "ambulance"),
+    keyed by email and stored in the shared backend.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        backend: Optional[VerificationCodeBackend] = None,
+        ttl_seconds: Optional[int] = None
+    ):
+        self.namespace = namespace
+        self.backend = backend if backend is not None else default_backend
+        self.ttl_seconds = ttl_seconds or settings.VERIFICATION_CODE_TTL_SECONDS
+
+    def _key(self, email: str) -> str:
+        return f"verification_code:{self.namespace}:{email}"
+
+    def store(self, email: str, code: str, new_password_hash: Optional[str] = None) -> None:
+        """Store a code, replacing any previous one for the email."""
+        data = {"code": code}
+        if new_password_hash:
+            data["new_password"] = new_password_hash
+        self.backend.set(self._key(email), data, self.ttl_seconds)
+
+    def get(self, email: str) -> Optional[Dict]:
+        """Return the stored data for the email, or None if missing or expired."""
+        return self.backend.get(self._key(email))
+
+    def verify(self, email: str, code: str) -> bool:
+        """Check the provided code without consuming it."""
+        stored_data = self.get(email)
+        if not stored_data:
+            return False
+        # compare_digest only accepts ASCII str; user input may not be
+        return secrets.compare_digest(str(stored_data["code"]).encode(), str(code).encode())
+
+    def discard(self, email: str) -> None:
+        self.backend.delete(self._key(email))
@@ -1,8 +1,11 @@
+import logging
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 # Configuration - replace with your SMTP server details or load from environment/config
 SMTP_SERVER = 'smtp.gmail.com'
 SMTP_PORT = 587
@@ -29,4 +32,4 @@ def send_email(to_email: str, subject: str, body: str, html: Optional[str] = Non
             server.login(SMTP_USERNAME, SMTP_PASSWORD)
             server.sendmail(SENDER_EMAIL, to_email, msg.as_string())
     except Exception as e:
-        print(f"Failed to send email: {e}")
+        logger.error("Failed to send email: %s", e)
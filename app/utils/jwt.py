@@ -1,5 +1,9 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 
 # Secret key and algorithm — store securely in env vars in production
@@ -13,13 +17,68 @@ def create_access_token(user_id: int, role: str, expires_delta: Optional[timedel
     to_encode["exp"] = int(expire.timestamp())  # UNIX timestamp
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(token: str) -> dict:
+def _decode(token: str) -> Tuple[dict, Optional[float]]:
+    """Verified {user_id, role} and the token's exp (UNIX time), if any."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("user_id")
         role = payload.get("role")
         if user_id is None or role is None:
             raise JWTError("user_id or role missing in token")
-        return {"user_id": user_id, "role": role}
-    except JWTError:
+        exp = payload.get("exp")
+        return {"user_id": user_id, "role": role}, float(exp) if exp is not None else None
+    except (JWTError, TypeError, ValueError):
         raise JWTError("Invalid token")
+
+def verify_token(token: str) -> dict:
+    return _decode(token)[0]
+
+
+class DecodedTokenCache:
+    """
+    verify_token() results keyed by the SHA-256 of the token, so clients
+    reconnecting with the same token skip decoding and signature checks.
+    An entry expires with the token's exp (capped at max_ttl_seconds);
+    invalid tokens are never cached.
+    """
+
+    def __init__(self, max_entries: int, max_ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_ttl_seconds = max_ttl_seconds
+        # sha256 digest -> (payload, expires_at)
+        self._entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> dict:
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry[0])
+                del self._entries[key]
+            self.misses += 1
+
+        payload, exp = _decode(token)
+        expires_at = now + self.max_ttl_seconds if exp is None else min(exp, now + self.max_ttl_seconds)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return dict(payload)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
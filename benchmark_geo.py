@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-hospital Python Haversine loop (the old nearby/nearest
+code path) vs the vectorized kernel in app/services/geo.py.
+
+Uses synthetic hospitals around Bangalore, no database:
+    python benchmark_geo.py [n_hospitals ...]
+"""
+import math
+import os
+import random
+import sys
+import time
+
+# Settings are required at import time; the benchmark never touches this database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+for name in ("db_user", "db_password", "db_host", "db_name"):
+    os.environ.setdefault(name, "benchmark")
+os.environ.setdefault("db_port", "5432")
+
+from app.services.geo import HospitalGeoSnapshot, top_k
+
+CENTER = (12.9716, 77.5946)
+RADIUS_KM = 10.0
+K = 5
+
+
+def make_rows(n, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i + 1,
+            "credential_id": i + 1,
+            "name": f"Hospital {i + 1}",
+            "latitude": CENTER[0] + rng.uniform(-0.5, 0.5),
+            "longitude": CENTER[1] + rng.uniform(-0.5, 0.5),
+            "emergency_available": rng.random() < 0.7,
+            "available_24_7": rng.random() < 0.5,
+            "approved": rng.random() < 0.9,
+            "hospital_type": rng.choice(("government", "private")),
+            "departments": ",".join(rng.sample(("Cardiology", "Neurology", "Orthopedics", "Pediatrics", "Trauma"), 2)),
+        }
+        for i in range(n)
+    ]
+
+
+def loop_distance(lat1, lon1, lat2, lon2):
+    # Same formula as the old calculate_distance
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(a))
+
+
+def loop_radius(rows, lat, lon):
+    found = []
+    for row in rows:
+        d = loop_distance(lat, lon, row["latitude"], row["longitude"])
+        if d <= RADIUS_KM:
+            found.append((row, d))
+    found.sort(key=lambda x: x[1])
+    return found
+
+
+def loop_top_k(rows, lat, lon):
+    scored = [(row, loop_distance(lat, lon, row["latitude"], row["longitude"])) for row in rows]
+    scored.sort(key=lambda x: x[1])
+    return scored[:K]
+
+
+def kernel_radius(snapshot, lat, lon):
+    d = snapshot.distances_km(lat, lon)
+    candidates = (d <= RADIUS_KM).nonzero()[0]
+    return [(snapshot.rows[i], float(d[i])) for i in top_k(d, candidates.shape[0], candidates)]
+
+
+def kernel_top_k(snapshot, lat, lon):
+    d = snapshot.distances_km(lat, lon)
+    return [(snapshot.rows[i], float(d[i])) for i in top_k(d, K)]
+
+
+def bench(fn, *args, repeat=None):
+    repeat = repeat or max(5, int(200000 / max(1, len(args[0]))))
+    fn(*args)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(sizes):
+    print(f"{'hospitals':>10} {'query':>8} {'loop µs':>12} {'kernel µs':>12} {'speedup':>8}")
+    for n in sizes:
+        rows = make_rows(n)
+        snapshot = HospitalGeoSnapshot(rows, version=1)
+        lat, lon = CENTER
+
+        # Same hospitals, same order (up to float rounding)
+        for loop_fn, kernel_fn in ((loop_radius, kernel_radius), (loop_top_k, kernel_top_k)):
+            expected = [r["id"] for r, _ in loop_fn(rows, lat, lon)]
+            actual = [r["id"] for r, _ in kernel_fn(snapshot, lat, lon)]
+            assert expected == actual, f"{kernel_fn.__name__} differs from {loop_fn.__name__} for n={n}"
+
+        for label, loop_fn, kernel_fn, loop_args, kernel_args in (
+            ("radius", loop_radius, kernel_radius, (rows, lat, lon), (snapshot, lat, lon)),
+            (f"top-{K}", loop_top_k, kernel_top_k, (rows, lat, lon), (snapshot, lat, lon)),
+        ):
+            loop_us = bench(loop_fn, *loop_args)
+            kernel_us = bench(kernel_fn, *kernel_args, repeat=max(5, int(2000000 / n)))
+            print(f"{n:>10} {label:>8} {loop_us:>12.1f} {kernel_us:>12.1f} {loop_us / kernel_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1000, 10000, 100000])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: FastAPI's default response_model serialization (validate,
+jsonable_encoder, json.dumps) vs the cached TypeAdapter path used by the
+socket-log and assignment list endpoints (app/core/serialization.py).
+
+Uses unsaved SocketLog ORM objects with nested JSON payloads, no database:
+    python benchmark_serialization.py [n_rows ...]
+"""
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+# Settings are required at import time; the benchmark never touches this database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+for name in ("db_user", "db_password", "db_host", "db_name"):
+    os.environ.setdefault(name, "benchmark")
+os.environ.setdefault("db_port", "5432")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+import app.db.base  # noqa: F401  (registers every mapper)
+from app.core.serialization import model_list_response
+from app.db.models.socket_log import SocketLog
+from app.schemas.socket_log import SocketLogOut
+
+STARTED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_logs(n, seed=42):
+    rng = random.Random(seed)
+    logs = []
+    for i in range(n):
+        lat, lon = 12.9716 + rng.uniform(-0.5, 0.5), 77.5946 + rng.uniform(-0.5, 0.5)
+        created_at = STARTED_AT + timedelta(seconds=i * 7)
+        payload = {
+            "latitude": lat,
+            "longitude": lon,
+            "patient": {"id": rng.randint(1, 10000), "name": f"Patient {i}", "phone": "9876543210"},
+            "hospital_filter": {"departments": ["Cardiology", "Trauma"], "emergency_available": True},
+            "history": [{"t": k, "lat": lat + k * 1e-4, "lon": lon - k * 1e-4} for k in range(5)],
+        }
+        logs.append(SocketLog(
+            id=i + 1,
+            event_type=rng.choice(("ambulance_request", "hospital_response", "sos_request")),
+            socket_id=f"sid-{i}",
+            user_id=str(rng.randint(1, 5000)),
+            user_role="patient",
+            event_data=payload,
+            request_data={"latitude": lat, "longitude": lon},
+            response_data={"hospital_id": rng.randint(1, 500), "eta_seconds": rng.randint(60, 3600)},
+            patient_latitude=str(lat),
+            patient_longitude=str(lon),
+            hospital_id=rng.randint(1, 500),
+            hospital_name=f"Hospital {rng.randint(1, 500)}",
+            distance_km=f"{rng.uniform(0, 20):.2f}",
+            status="success",
+            processed=True,
+            sos_status=rng.choice(("pending", "accepted", "rejected", None)),
+            sos_acceptance_date=created_at + timedelta(seconds=30),
+            created_at=created_at,
+            processed_at=created_at + timedelta(seconds=1),
+            response_time_ms=rng.randint(5, 500),
+        ))
+    return logs
+
+
+# FastAPI builds this once per route from response_model
+RESPONSE_FIELD = TypeAdapter(List[SocketLogOut])
+
+
+def old_path(logs):
+    # What FastAPI does for response_model=List[SocketLogOut] with JSONResponse
+    value = RESPONSE_FIELD.validate_python(logs, from_attributes=True)
+    content = jsonable_encoder(RESPONSE_FIELD.dump_python(value, mode="json"))
+    return JSONResponse(content).body
+
+
+def default_orjson_path(logs):
+    # Same, with ORJSONResponse as the default response class
+    value = RESPONSE_FIELD.validate_python(logs, from_attributes=True)
+    content = jsonable_encoder(RESPONSE_FIELD.dump_python(value, mode="json"))
+    return ORJSONResponse(content).body
+
+
+def new_path(logs):
+    return model_list_response(SocketLogOut, logs).body
+
+
+def bench(fn, logs, repeat):
+    fn(logs)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(logs)
+    return (time.perf_counter() - started) / repeat * 1e3
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'path':>16} {'ms':>10} {'KiB':>8} {'speedup':>8}")
+    for n in sizes:
+        logs = make_logs(n)
+        expected = json.loads(old_path(logs))
+        for fn in (default_orjson_path, new_path):
+            assert json.loads(fn(logs)) == expected, f"{fn.__name__} differs from old_path for n={n}"
+
+        repeat = max(3, int(20000 / n))
+        baseline = None
+        for label, fn in (("response_model", old_path), ("orjson default", default_orjson_path),
+                          ("type adapter", new_path)):
+            ms = bench(fn, logs, repeat)
+            baseline = baseline or ms
+            print(f"{n:>8} {label:>16} {ms:>10.2f} {len(fn(logs)) / 1024:>8.0f} {baseline / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1000, 5000])
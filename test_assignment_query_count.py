@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Query-count regression test for the patient assignment services.
+Listing assignments (and serializing them with PatientAssignmentOut) must run
+the same number of queries whatever the page size, and the assignment context
+must be a single query.
+
+Runs against an in-memory SQLite database:
+    python -m pytest test_assignment_query_count.py
+"""
+import os
+from datetime import date
+
+# Settings are required at import time; the test never touches this database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+for name in ("db_user", "db_password", "db_host", "db_name"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("db_port", "5432")
+
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import base  # noqa: F401  (registers all models)
+from app.db.base_class import Base
+from app.db.models.ambulance import Ambulance
+from app.db.models.credential import Credential
+from app.db.models.doctor import Doctor
+from app.db.models.hospital import Hospital
+from app.db.models.medical_records import MedicalRecord
+from app.db.models.patient import Patient
+from app.db.models.patient_assignment import PatientAssignment
+from app.schemas.patient_assignment import PatientAssignmentOut
+from app.services.patient_assignment import (
+    get_active_assignments,
+    get_ambulance_assignments,
+    get_assignment_with_context,
+    get_doctor_assignments,
+    get_hospital_assignments,
+    get_patient_assignments,
+)
+
+ROWS = 60
+
+
+def make_session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+@contextmanager
+def count_queries(engine):
+    counter = {"count": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed(db):
+    hospital = Hospital(name="City Hospital", address="1 Main St")
+    db.add(hospital)
+    db.flush()
+
+    doctor_credential = Credential(email="doctor@test.com", password="x", role="doctor")
+    ambulance_credential = Credential(email="ambulance@test.com", password="x", role="ambulance")
+    db.add_all([doctor_credential, ambulance_credential])
+    db.flush()
+
+    doctor = Doctor(
+        credential_id=doctor_credential.id, hospital_id=hospital.id,
+        name="Dr. Test", phone_number="100", email="doctor@test.com"
+    )
+    ambulance = Ambulance(
+        credential_id=ambulance_credential.id, hospital_id=hospital.id,
+        ambulance_number="AMB-1", driver_name="Driver", driver_phone="200",
+        driver_email="ambulance@test.com", vehicle_type="basic"
+    )
+    db.add_all([doctor, ambulance])
+    db.flush()
+
+    patients = []
+    for i in range(ROWS):
+        credential = Credential(email=f"patient{i}@test.com", password="x", role="patient")
+        db.add(credential)
+        db.flush()
+        patient = Patient(
+            credential_id=credential.id, full_name=f"Patient {i}",
+            email=f"patient{i}@test.com", age=30, gender="female"
+        )
+        db.add(patient)
+        patients.append(patient)
+    db.flush()
+
+    db.add(MedicalRecord(patient_id=patients[0].id, date_of_birth=date(1990, 1, 1), blood_group="O+"))
+    for patient in patients:
+        db.add(PatientAssignment(
+            patient_id=patient.id, doctor_id=doctor.id, ambulance_id=ambulance.id,
+            hospital_id=hospital.id, assignment_type="both", priority_level="high"
+        ))
+    db.commit()
+    return hospital.id, doctor.id, ambulance.id, [patient.id for patient in patients]
+
+
+def list_query_count(engine, db, list_assignments, limit):
+    db.expunge_all()
+    with count_queries(engine) as counter:
+        assignments = list_assignments(limit)
+        [PatientAssignmentOut.model_validate(a) for a in assignments]
+    return counter["count"], len(assignments)
+
+
+def test_list_endpoints_query_count_independent_of_page_size():
+    engine, db = make_session()
+    hospital_id, doctor_id, ambulance_id, patient_ids = seed(db)
+
+    listings = {
+        "hospital": lambda limit: get_hospital_assignments(db, hospital_id, limit=limit),
+        "doctor": lambda limit: get_doctor_assignments(db, doctor_id, limit=limit),
+        "ambulance": lambda limit: get_ambulance_assignments(db, ambulance_id, limit=limit),
+        "active": lambda limit: get_active_assignments(db, hospital_id, limit=limit),
+        "patient": lambda limit: get_patient_assignments(db, patient_ids[0], limit=limit),
+    }
+    for name, list_assignments in listings.items():
+        small_count, _ = list_query_count(engine, db, list_assignments, 1)
+        large_count, rows = list_query_count(engine, db, list_assignments, ROWS)
+        assert rows >= 1, name
+        assert small_count == large_count == 1, (name, small_count, large_count)
+
+
+def test_assignment_context_is_single_query():
+    engine, db = make_session()
+    hospital_id, doctor_id, ambulance_id, patient_ids = seed(db)
+    assignment_id = db.query(PatientAssignment.id).filter(
+        PatientAssignment.patient_id == patient_ids[0]
+    ).scalar()
+    db.expunge_all()
+
+    with count_queries(engine) as counter:
+        context = get_assignment_with_context(db, assignment_id)
+        PatientAssignmentOut.model_validate(context["assignment"])
+
+    assert counter["count"] == 1, counter["count"]
+    assert context["patient"]["name"] == "Patient 0"
+    assert context["doctor"]["name"] == "Dr. Test"
+    assert context["ambulance"]["ambulance_number"] == "AMB-1"
+    assert context["hospital"]["name"] == "City Hospital"
+    assert context["medical_record"] is not None
+
+
+if __name__ == "__main__":
+    test_list_endpoints_query_count_independent_of_page_size()
+    test_assignment_context_is_single_query()
+    print("✅ Assignment query counts OK")
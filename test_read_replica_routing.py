@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Read/write routing test for the read-replica sessions (app/db/session.py).
+Writes must go to the primary, get_read_db reads to the replica when it is
+healthy, and reads must fall back to the primary when the replica is down.
+
+Binds primary and replica to two SQLite files in a temporary directory:
+    python -m pytest test_read_replica_routing.py
+"""
+import os
+import tempfile
+
+# Settings are required at import time; the test swaps in its own engines
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+for name in ("db_user", "db_password", "db_host", "db_name"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("db_port", "5432")
+
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+
+from app.db import base  # noqa: F401  (registers all models)
+from app.db import session as db_session
+from app.db.base_class import Base
+from app.db.models.credential import Credential
+
+
+def make_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def emails(engine):
+    with engine.connect() as conn:
+        return {row.email for row in conn.execute(Credential.__table__.select())}
+
+
+@contextmanager
+def routed_to(primary, replica):
+    """Point the session module at these engines (replica health re-checked on every read)."""
+    saved = db_session.engine, db_session.replica_engine, db_session.replica_health
+    db_session.engine = primary
+    db_session.replica_engine = replica
+    db_session.replica_health = db_session.ReplicaHealth(replica, max_lag_seconds=5.0, check_interval_seconds=0)
+    try:
+        yield
+    finally:
+        db_session.engine, db_session.replica_engine, db_session.replica_health = saved
+
+
+def read_emails():
+    reader = db_session.get_read_db()
+    db = next(reader)
+    try:
+        return {credential.email for credential in db.query(Credential).all()}
+    finally:
+        reader.close()
+
+
+def test_writes_go_to_primary():
+    with tempfile.TemporaryDirectory() as tmp:
+        primary = make_engine(os.path.join(tmp, "primary.db"))
+        replica = make_engine(os.path.join(tmp, "replica.db"))
+        with routed_to(primary, replica):
+            # Even a session opened for replica reads flushes to the primary
+            db = db_session.ReadSessionLocal(info={"use_replica": True})
+            try:
+                db.add(Credential(email="written@test.com", password="x", role="patient"))
+                db.commit()
+            finally:
+                db.close()
+        assert emails(primary) == {"written@test.com"}
+        assert emails(replica) == set()
+
+
+def test_reads_come_from_replica():
+    with tempfile.TemporaryDirectory() as tmp:
+        primary = make_engine(os.path.join(tmp, "primary.db"))
+        replica = make_engine(os.path.join(tmp, "replica.db"))
+        with primary.begin() as conn:
+            conn.execute(Credential.__table__.insert(), {"email": "primary@test.com", "password": "x", "role": "patient"})
+        with replica.begin() as conn:
+            conn.execute(Credential.__table__.insert(), {"email": "replica@test.com", "password": "x", "role": "patient"})
+
+        with routed_to(primary, replica):
+            assert read_emails() == {"replica@test.com"}
+
+
+def test_reads_fall_back_to_primary_when_replica_unavailable():
+    with tempfile.TemporaryDirectory() as tmp:
+        primary = make_engine(os.path.join(tmp, "primary.db"))
+        with primary.begin() as conn:
+            conn.execute(Credential.__table__.insert(), {"email": "primary@test.com", "password": "x", "role": "patient"})
+        # The replica's directory doesn't exist, so connecting to it fails
+        replica = create_engine(f"sqlite:///{os.path.join(tmp, 'missing', 'replica.db')}")
+
+        with routed_to(primary, replica):
+            assert read_emails() == {"primary@test.com"}
+            assert db_session.replica_health.last_lag_seconds is None
+
+
+if __name__ == "__main__":
+    test_writes_go_to_primary()
+    test_reads_come_from_replica()
+    test_reads_fall_back_to_primary_when_replica_unavailable()
+    print("✅ Read replica routing OK")